@@ -1,46 +1,71 @@
 from agent_graph.state import AgentState
-from agent_graph.tools.model_tools import ModelManager, predict_pathologies, generate_clip_report
-from PIL import Image
+from agent_graph.tools.model_tools import (ModelManager, predict_pathologies_batched, clip_label_scores, format_clip_report,
+                                           model_versions, DEFAULT_CANDIDATE_LABELS, CHEXNET_LABELS)
+from agent_graph.result_cache import PipelineResultCache, file_sha256, make_key
 import os
 
+def analysis_cache_key(image_sha256, candidate_labels=DEFAULT_CANDIDATE_LABELS):
+    return make_key(image=image_sha256, models=model_versions(),
+                    chexnet_labels=CHEXNET_LABELS, clip_labels=list(candidate_labels))
+
 def analyzer_agent(state: AgentState) -> AgentState:
     print("--- Analyzer Agent ---")
     image_path = state.get("xray_image_path")
-    
+
     if not image_path or not os.path.exists(image_path):
         return {"error": f"Image not found at {image_path}"}
-    
+
     try:
-        image = Image.open(image_path).convert('RGB')
-        
-        # Load models
-        manager = ModelManager()
-        chexnet = manager.load_chexnet()
-        preprocess, clip_model, tokenizer = manager.load_clip()
-        
-        # Predict pathologies
-        pathologies = predict_pathologies(image, chexnet)
-        
-        # Generate text report
         # Using a default set of labels for now, similar to what might be in cap.py or standard chest x-ray labels
-        candidate_labels = [
-            "normal chest x-ray", "pneumonia", "pleural effusion", "atelectasis", 
-            "cardiomegaly", "pulmonary edema", "fracture", "nodule"
-        ]
-        report = generate_clip_report(image, preprocess, clip_model, tokenizer, candidate_labels)
-        
+        candidate_labels = DEFAULT_CANDIDATE_LABELS
+
+        # Same film, models and labels as an earlier run: reuse its scores
+        cache = PipelineResultCache()
+        cache_key = analysis_cache_key(state.get("image_sha256") or file_sha256(image_path), candidate_labels)
+        cached = cache.get("analysis", cache_key)
+        if cached is not None:
+            pathologies, clip_scores = cached[0]["pathologies"], cached[0]["clip_scores"]
+        else:
+            # Load models
+            manager = ModelManager()
+            prepared = manager.get_prepared_image(state.get("image_handle"), image_path)
+            image = prepared['image']
+            chexnet_engine = manager.get_chexnet_engine()
+            preprocess, clip_model, tokenizer = manager.load_clip()
+
+            # Predict pathologies (micro-batched with concurrent scans)
+            pathologies, features = predict_pathologies_batched(image, chexnet_engine, return_features=True,
+                                                                image_tensor=prepared['chexnet_tensor'])
+            if features is not None:
+                # Keep the feature map so the visualizer can build CAMs without another forward pass
+                manager.store_activations(image_path, features)
+
+            # Zero-shot CLIP scores for the text report
+            text_features = manager.get_clip_text_features(candidate_labels)
+            try:
+                clip_scores = clip_label_scores(image, preprocess, clip_model, tokenizer, candidate_labels,
+                                                text_features, image_tensor=prepared['clip_tensor'])
+            except Exception as e:
+                print(f"Error generating CLIP report: {e}")
+                clip_scores = None
+            # Failed stages are not cached
+            if pathologies and clip_scores is not None:
+                cache.set("analysis", cache_key, {"pathologies": pathologies, "clip_scores": clip_scores})
+
+        report = format_clip_report(clip_scores) if clip_scores is not None else "Failed to generate report."
+
         # Enhance report with ChexNet findings
         detected = [p for p, d in pathologies.items() if d['detected']]
         if detected:
             report += f"\n\n**ChexNet Detections:** {', '.join(detected)}"
         else:
             report += "\n\n**ChexNet Detections:** No significant pathologies detected."
-            
+
         return {
             "current_report": report,
             "pathologies": pathologies
         }
-        
+
     except Exception as e:
         print(f"Analyzer Error: {e}")
         return {"error": str(e)}
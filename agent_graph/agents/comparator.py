@@ -1,19 +1,45 @@
+import hashlib
+
 from agent_graph.state import AgentState
-from agent_graph.tools.llm_tools import compare_reports
+from agent_graph.tools.llm_tools import compare_reports, LLM_MODEL, LLM_ERROR_MESSAGES
+from agent_graph.result_cache import PipelineResultCache, make_key
+from agent_graph.real_database import is_empty_history
+
+NO_HISTORY_COMPARISON = "No prior reports to compare against; this is the patient's first study on record."
 
 def comparator_agent(state: AgentState) -> AgentState:
     print("--- Comparator Agent ---")
+    # Runs alongside visualizer and NER, so this is the analyzer's report (without the region text)
     current_report = state.get("current_report")
     patient_history = state.get("patient_history")
-    
+
     if not current_report or not patient_history:
         print("Skipping comparison: missing report or history.")
         return {"comparison_result": "Comparison skipped due to missing data."}
-    
+
+    # New patients and patients without prior reports: nothing for the LLM to compare
+    if is_empty_history(patient_history):
+        print("Skipping comparison: no prior history.")
+        return {"comparison_result": NO_HISTORY_COMPARISON}
+
     try:
+        # Same report against the same history (e.g. a re-run scan): reuse the earlier comparison
+        cache = PipelineResultCache()
+        cache_key = make_key(
+            history=hashlib.sha256(patient_history.encode('utf-8')).hexdigest(),
+            report=hashlib.sha256(current_report.encode('utf-8')).hexdigest(),
+            model=LLM_MODEL,
+        )
+        cached = cache.get("comparison", cache_key)
+        if cached is not None:
+            return {"comparison_result": cached[0]["comparison"]}
+
         comparison = compare_reports(current_report, patient_history)
+        if comparison not in LLM_ERROR_MESSAGES:
+            cache.set("comparison", cache_key, {"comparison": comparison})
         return {"comparison_result": comparison}
-        
+
     except Exception as e:
+        # Not state["error"]: the comparison is optional and a parallel branch may set that key
         print(f"Comparator Error: {e}")
-        return {"error": str(e)}
+        return {"comparison_result": f"Comparison failed: {e}"}
@@ -0,0 +1,12 @@
+from agent_graph.state import AgentState
+
+def join_agent(state: AgentState) -> AgentState:
+    print("--- Join Agent ---")
+    # Runs once visualizer, NER and comparator have all finished, so the draft is
+    # assembled in the same order whichever branch completed last
+    current_report = state.get("current_report")
+    region_report = state.get("region_report")
+
+    if current_report and region_report:
+        return {"current_report": current_report + "\n\n" + region_report}
+    return {}
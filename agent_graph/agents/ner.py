@@ -1,18 +1,30 @@
 from agent_graph.state import AgentState
-from agent_graph.tools.ner_tools import NERManager, extract_ner_entities
+from agent_graph.tools.ner_tools import NERManager, extract_ner_entities, NER_MODEL_ID, NER_CONFIG
+from agent_graph.result_cache import PipelineResultCache, make_key
 
 def ner_agent(state: AgentState) -> AgentState:
     print("--- NER Agent ---")
+    # Runs alongside the visualizer: tags the analyzer's report, whose region text
+    # is already structured (pathology + lung zone) and is added later by the join node
     current_report = state.get("current_report")
     
     if not current_report:
         return {"error": "No report to analyze for NER."}
     
     try:
-        manager = NERManager()
-        pipeline = manager.load_pipeline()
-        
-        entities = extract_ner_entities(current_report, pipeline)
+        cache = PipelineResultCache()
+        cache_key = make_key(text=current_report, model=NER_MODEL_ID, config=NER_CONFIG)
+        cached = cache.get("ner", cache_key)
+        if cached is not None:
+            entities = cached[0]["entities"]
+        else:
+            manager = NERManager()
+            pipeline = manager.load_pipeline()
+
+            entities = extract_ner_entities(current_report, pipeline)
+            # An empty list is also what a failed run returns, so only real results are cached
+            if entities:
+                cache.set("ner", cache_key, {"entities": entities})
         
         # Format entities for display/storage
         entities_summary = ", ".join([f"{e['text']} ({e['label']})" for e in entities])
@@ -1,6 +1,6 @@
 from agent_graph.state import AgentState
 from agent_graph.tools.pdf_tools import generate_pdf_report
-from agent_graph.real_database import get_patient_details, store_report
+from agent_graph.real_database import get_pipeline_data, close_pipeline_data
 import os
 
 def pdf_agent(state: AgentState) -> AgentState:
@@ -12,8 +12,11 @@ def pdf_agent(state: AgentState) -> AgentState:
     if not patient_id or not current_report:
         return {"error": "Missing data for PDF generation."}
     
+    data_handle = state.get("data_handle")
     try:
-        details = get_patient_details(patient_id)
+        # Reuses the patient resolved by the retriever for this run
+        data = get_pipeline_data(data_handle, patient_id)
+        details = data.get_details()
         
         output_dir = "d:/MUMBAI_HACKS/reports"
         os.makedirs(output_dir, exist_ok=True)
@@ -25,10 +28,13 @@ def pdf_agent(state: AgentState) -> AgentState:
         
         # Store in database
         if xray_path:
-             store_report(patient_id, current_report, xray_path)
+             data.store_report(current_report, xray_path)
+        print(f"Database round trips for this run: {data.round_trips}")
              
         return {"pdf_path": output_path}
         
     except Exception as e:
         print(f"PDF Agent Error: {e}")
         return {"error": str(e)}
+    finally:
+        close_pipeline_data(data_handle, release=True)
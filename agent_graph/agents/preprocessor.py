@@ -0,0 +1,22 @@
+from agent_graph.state import AgentState
+from agent_graph.tools.model_tools import ModelManager
+from agent_graph.result_cache import file_sha256
+import os
+
+def preprocessor_agent(state: AgentState) -> AgentState:
+    print("--- Preprocessor Agent ---")
+    image_path = state.get("xray_image_path")
+    
+    if not image_path or not os.path.exists(image_path):
+        return {"error": f"Image not found at {image_path}"}
+    
+    try:
+        # Decode once and build the ChexNet and CLIP inputs for downstream nodes
+        manager = ModelManager()
+        handle = manager.prepare_image(image_path)
+        # Content hash keys the cached results of every image stage
+        return {"image_handle": handle, "image_sha256": file_sha256(image_path)}
+        
+    except Exception as e:
+        print(f"Preprocessor Error: {e}")
+        return {"error": str(e)}
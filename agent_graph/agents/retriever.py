@@ -1,5 +1,5 @@
 from agent_graph.state import AgentState
-from agent_graph.real_database import fetch_patient_history, get_patient_details
+from agent_graph.real_database import open_pipeline_data, get_pipeline_data
 
 def retriever_agent(state: AgentState) -> AgentState:
     print("--- Retriever Agent ---")
@@ -9,13 +9,16 @@ def retriever_agent(state: AgentState) -> AgentState:
         return {"error": "No patient ID provided"}
     
     try:
-        # Fetch details and history
-        details = get_patient_details(patient_id)
-        history = fetch_patient_history(patient_id)
+        # One data access object per run: the patient is resolved once and
+        # details + history come back from a single joined query
+        handle = open_pipeline_data(patient_id)
+        data = get_pipeline_data(handle, patient_id)
+        details = data.get_details()
+        history = data.get_history()
         
         summary = f"Patient: {details['name']} (Age: {details['age']}, Gender: {details['gender']})\nHistory: {history}"
         
-        return {"patient_history": summary}
+        return {"patient_history": summary, "data_handle": handle}
         
     except Exception as e:
         print(f"Retriever Error: {e}")
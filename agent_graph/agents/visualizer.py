@@ -1,7 +1,7 @@
 from agent_graph.state import AgentState
-from agent_graph.tools.model_tools import ModelManager, preprocess_image_for_chexnet, CHEXNET_LABELS
-from agent_graph.tools.viz_tools import GradCAM, analyze_pathology_regions, create_labeled_overlay_visualization, generate_region_report, create_overlay_image
-from PIL import Image
+from agent_graph.tools.model_tools import ModelManager, CHEXNET_LABELS, model_versions, full_resolution_image
+from agent_graph.result_cache import PipelineResultCache, file_sha256, make_key
+from agent_graph.tools.viz_tools import analyze_pathology_regions, create_labeled_overlay_visualization, generate_region_report, create_overlay_image
 import cv2
 import numpy as np
 import os
@@ -15,33 +15,51 @@ def visualizer_agent(state: AgentState) -> AgentState:
         return {"error": "Missing image or pathologies for visualization."}
     
     try:
-        image = Image.open(image_path).convert('RGB')
-        img_array = np.array(image)
-        original_size = img_array.shape[:2][::-1] # (width, height)
-        
-        # Load model and GradCAM
+        # Reuse the image decoded by the preprocessor node
         manager = ModelManager()
-        model = manager.load_chexnet()
-        target_layer = manager.get_chexnet_target_layer()
-        grad_cam = GradCAM(model, target_layer)
+        prepared = manager.get_prepared_image(state.get("image_handle"), image_path)
         
-        # Generate segmentation maps for detected pathologies
-        image_tensor = preprocess_image_for_chexnet(image)
+        # Generate segmentation maps for all detected pathologies in one pass,
+        # reusing the analyzer's feature map when it is still cached
+        detected = [p for p, data in pathologies.items() if p in CHEXNET_LABELS and data['detected']]
+        class_indices = [CHEXNET_LABELS.index(p) for p in detected]
         segmentation_maps = {}
         
-        for pathology, data in pathologies.items():
-            if data['detected']:
-                class_idx = CHEXNET_LABELS.index(pathology)
-                cam = grad_cam.generate_cam(image_tensor, class_idx)
-                cam_resized = cv2.resize(cam, original_size)
-                segmentation_maps[pathology] = cam_resized
-        
-        if not segmentation_maps:
+        if not class_indices:
             print("No pathologies detected for visualization.")
-            return {"visualization_report": "No significant pathologies to visualize."}
+            return {"region_report": None}
 
-        # Analyze regions
-        region_analysis = analyze_pathology_regions(segmentation_maps, img_array.shape[:2])
+        # Overlay and region sizes at the film's own resolution, not the downscaled model input
+        image = full_resolution_image(prepared, image_path)
+        img_array = np.array(image)
+        original_size = img_array.shape[:2][::-1] # (width, height)
+
+        # CAMs (at feature-map resolution) and region analysis of an identical earlier run
+        cache = PipelineResultCache()
+        cache_key = make_key(image=state.get("image_sha256") or file_sha256(image_path),
+                             models=model_versions(), detected=detected, regions_at="original_size")
+        cached = cache.get("regions", cache_key)
+        if cached is not None:
+            # Drop the analyzer's feature map; it is not needed
+            manager.take_activations(image_path)
+            region_meta, cams = cached
+            for pathology in detected:
+                segmentation_maps[pathology] = cv2.resize(cams[pathology], original_size)
+            region_analysis = {pathology: {'regions': regions} for pathology, regions in region_meta.items()}
+        else:
+            # Shared, hook-free CAM extractor owned by the ModelManager
+            grad_cam = manager.get_cam_extractor()
+            features = manager.take_activations(image_path)
+            image_tensor = prepared['chexnet_tensor'] if features is None else None
+            cams = grad_cam.generate_cams(class_indices, input_image=image_tensor, features=features)
+            for pathology, class_idx in zip(detected, class_indices):
+                segmentation_maps[pathology] = cv2.resize(cams[class_idx], original_size)
+
+            # Analyze regions
+            region_analysis = analyze_pathology_regions(segmentation_maps, img_array.shape[:2])
+            cache.set("regions", cache_key,
+                      {pathology: analysis['regions'] for pathology, analysis in region_analysis.items()},
+                      {pathology: cams[class_idx] for pathology, class_idx in zip(detected, class_indices)})
         
         # Create overlay
         # overlay_image = create_labeled_overlay_visualization(image, segmentation_maps, region_analysis)
@@ -57,15 +75,11 @@ def visualizer_agent(state: AgentState) -> AgentState:
             overlay_image.save(overlay_path)
             print(f"Overlay saved to {overlay_path}")
         
-        # Generate region report
+        # Generate region report; the join node appends it to the analyzer's report
         region_report = generate_region_report(region_analysis)
         
-        # Append region report to current report
-        current_report = state.get("current_report", "")
-        updated_report = current_report + "\n\n" + region_report
-        
         return {
-            "current_report": updated_report,
+            "region_report": region_report,
             "visualization_path": f"/reports/visualizations/overlay_{patient_id}.png"
         }
         
@@ -1,3 +1,4 @@
+import time
 from langgraph.graph import StateGraph, END
 from agent_graph.state import AgentState
 from agent_graph.agents.analyzer import analyzer_agent
@@ -6,28 +7,57 @@ from agent_graph.agents.comparator import comparator_agent
 from agent_graph.agents.ner import ner_agent
 from agent_graph.agents.pdf_generator import pdf_agent
 from agent_graph.agents.visualizer import visualizer_agent
+from agent_graph.agents.preprocessor import preprocessor_agent
+from agent_graph.agents.join import join_agent
 from langgraph.checkpoint.memory import MemorySaver
 
+def timed_node(name, node):
+    """
+    Wraps a node so its update carries its own run time as stage_timings[name].
+    With parallel branches the gap between stream events is no longer a node's duration.
+    """
+    def run(state: AgentState) -> AgentState:
+        started = time.perf_counter()
+        update = node(state) or {}
+        return {**update, "stage_timings": {name: round(time.perf_counter() - started, 3)}}
+    return run
+
 def create_graph():
     workflow = StateGraph(AgentState)
     checkpointer = MemorySaver()
 
     # Add nodes
-    workflow.add_node("retriever", retriever_agent)
-    workflow.add_node("analyzer", analyzer_agent)
-    workflow.add_node("visualizer", visualizer_agent)
-    workflow.add_node("comparator", comparator_agent)
-    workflow.add_node("ner", ner_agent)
-    workflow.add_node("pdf_generator", pdf_agent)
+    nodes = {
+        "retriever": retriever_agent,
+        "preprocessor": preprocessor_agent,
+        "analyzer": analyzer_agent,
+        "visualizer": visualizer_agent,
+        "comparator": comparator_agent,
+        "ner": ner_agent,
+        "join": join_agent,
+        "pdf_generator": pdf_agent,
+    }
+    for name, node in nodes.items():
+        workflow.add_node(name, timed_node(name, node))
 
     # Define edges
-    # Flow: Retriever -> Analyzer -> Visualizer -> Comparator -> NER -> (Interrupt) -> PDF -> End
-    workflow.set_entry_point("retriever")
-    workflow.add_edge("retriever", "analyzer")
+    # Flow: Preprocessor -+-> Analyzer (ChexNet + CLIP) -+-> Visualizer (CAM) --+
+    #                     |                             +-> NER ---------------+-> Join -> (Interrupt) -> PDF -> End
+    #                     +-> Retriever (DB) -----------+-> Comparator (LLM) --+
+    # Nodes in one branch level run concurrently and the next level starts when the
+    # slowest finishes, so the retriever doesn't depend on the preprocessor but is
+    # scheduled next to the analyzer to hide its DB I/O behind inference. A scan takes
+    # preprocessor + analyzer + slowest of visualizer/NER/comparator instead of the
+    # sum of all stages. Keys several nodes write have reducers in state.py; the join
+    # assembles the draft so the review interrupt sees one finished report.
+    workflow.set_entry_point("preprocessor")
+    workflow.add_edge("preprocessor", "analyzer")
+    workflow.add_edge("preprocessor", "retriever")
     workflow.add_edge("analyzer", "visualizer")
-    workflow.add_edge("visualizer", "comparator")
-    workflow.add_edge("comparator", "ner")
-    workflow.add_edge("ner", "pdf_generator")
+    workflow.add_edge("analyzer", "ner")
+    workflow.add_edge(["retriever", "analyzer"], "comparator")
+    workflow.add_edge(["visualizer", "ner", "comparator"], "join")
+    workflow.add_edge("join", "pdf_generator")
     workflow.add_edge("pdf_generator", END)
 
     # Compile with interrupt before PDF generation and checkpointer
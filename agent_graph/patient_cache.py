@@ -0,0 +1,188 @@
+"""
+Read-through cache for the patient context used by the agent pipeline
+(demographics + latest report impressions). In-process TTL+LRU by default;
+set PATIENT_CACHE_REDIS_URL to share it between the API and worker processes.
+Writers (store_report, update_report, create_patient, ...) invalidate by patient;
+since an in-process cache only sees its own process's invalidations, readers
+also validate entries against patients.context_version (is_current), at most
+once per PATIENT_CACHE_VALIDATE_SECONDS so warm hits stay off the database.
+"""
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Iterable, Callable
+from dotenv import load_dotenv
+
+# PATIENT_CACHE_* are read at import, possibly before backend.database loads .env
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
+
+CACHE_CONFIG = {
+    'ttl_seconds': float(os.getenv('PATIENT_CACHE_TTL_SECONDS', '300')),
+    'max_size': int(os.getenv('PATIENT_CACHE_MAX_SIZE', '1024')),
+    'redis_url': os.getenv('PATIENT_CACHE_REDIS_URL', ''),
+    # How long a validated entry is served without re-checking context_version; bounds how
+    # long another process's write can go unseen (0 = check on every hit)
+    'validate_seconds': float(os.getenv('PATIENT_CACHE_VALIDATE_SECONDS', '5')),
+}
+
+KEY_PREFIX = "patient_ctx:"
+
+
+class LocalTTLCache:
+    """Thread-safe in-process TTL+LRU store; also the local stand-in for Redis."""
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisTTLCache:
+    """Same interface as LocalTTLCache on top of Redis (LRU via the server's maxmemory policy)."""
+    def __init__(self, url: str, ttl_seconds: float, key_prefix: str = KEY_PREFIX):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str):
+        self.client.setex(key, int(self.ttl_seconds), value)
+
+    def delete(self, keys: Iterable[str]):
+        keys = list(keys)
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(f"{self.key_prefix}*"))
+
+
+class PatientContextCache:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PatientContextCache, cls).__new__(cls)
+            cls._instance.backend = cls._create_backend()
+            cls._instance.hits = 0
+            cls._instance.misses = 0
+            cls._instance.stale = 0
+            cls._instance.invalidations = 0
+            cls._instance.stats_lock = threading.Lock()
+        return cls._instance
+
+    @staticmethod
+    def _create_backend():
+        if CACHE_CONFIG['redis_url']:
+            try:
+                backend = RedisTTLCache(CACHE_CONFIG['redis_url'], CACHE_CONFIG['ttl_seconds'])
+                backend.client.ping()
+                print("Patient context cache: Redis")
+                return backend
+            except Exception as e:
+                print(f"Redis unavailable for patient cache ({e}), using in-process cache")
+        return LocalTTLCache(CACHE_CONFIG['max_size'], CACHE_CONFIG['ttl_seconds'])
+
+    def _count(self, name: str):
+        with self.stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, patient_id: str, is_current: Optional[Callable[[dict], bool]] = None) -> Optional[dict]:
+        """
+        Cached context, or None. Entries not validated within validate_seconds are
+        passed to is_current; rejected ones are dropped and counted as stale.
+        """
+        try:
+            value = self.backend.get(KEY_PREFIX + str(patient_id))
+        except Exception as e:
+            print(f"Patient cache read failed: {e}")
+            value = None
+        context = json.loads(value) if value is not None else None
+        if context is not None and is_current is not None and \
+                time.time() - context.get("validated_at", 0) >= CACHE_CONFIG['validate_seconds']:
+            if is_current(context):
+                self.set(patient_id, context)
+            else:
+                self._count("stale")
+                try:
+                    self.backend.delete([KEY_PREFIX + str(patient_id)])
+                except Exception as e:
+                    print(f"Patient cache invalidation failed: {e}")
+                context = None
+        self._count("hits" if context is not None else "misses")
+        return context
+
+    def set(self, patient_id: str, context: dict):
+        """Store context read from (or just checked against) the database"""
+        context = {**context, "validated_at": time.time()}
+        try:
+            self.backend.set(KEY_PREFIX + str(patient_id), json.dumps(context))
+        except Exception as e:
+            print(f"Patient cache write failed: {e}")
+
+    def invalidate(self, *identifiers):
+        """Drop cached context for a patient under every identifier it may be looked up by (id, MRN)."""
+        keys = {KEY_PREFIX + str(identifier) for identifier in identifiers if identifier is not None}
+        try:
+            self.backend.delete(keys)
+        except Exception as e:
+            print(f"Patient cache invalidation failed: {e}")
+        self._count("invalidations")
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "ttl_seconds": CACHE_CONFIG['ttl_seconds'],
+                "validate_seconds": CACHE_CONFIG['validate_seconds'],
+            }
+        try:
+            stats["size"] = self.backend.size()
+        except Exception:
+            stats["size"] = None
+        return stats
+
+
+def invalidate_patient(*identifiers):
+    PatientContextCache().invalidate(*identifiers)
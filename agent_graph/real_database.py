@@ -1,154 +1,363 @@
-import sys
 import os
-from pathlib import Path
-from sqlalchemy import desc
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from sqlalchemy import select, func, and_, or_, case, event
+from sqlalchemy.engine import Engine
 
 # Imports from backend (assuming running from repo root)
 try:
     from backend.database import get_db_session
     from backend.models import Patient, Scan, Report
+    # Registers the flush hook that bumps patients.context_version on writes
+    import backend.context_version
 except ImportError as e:
     print(f"Error importing backend modules: {e}")
     raise e
 
-def get_patient_details(patient_id: str) -> dict:
+from agent_graph.patient_cache import PatientContextCache, invalidate_patient
+
+# Past reports included in the patient history
+HISTORY_LIMIT = int(os.getenv("PATIENT_HISTORY_LIMIT", "3"))
+# Pipeline runs whose data access objects are kept between nodes
+PIPELINE_DATA_CACHE_SIZE = 64
+
+# get_history() results that carry no prior findings to compare against
+NEW_PATIENT_HISTORY = "No previous medical history available (New Patient)."
+NO_REPORTS_HISTORY = "No previous reports found."
+HISTORY_ERROR = "Error fetching history."
+EMPTY_HISTORIES = (NEW_PATIENT_HISTORY, NO_REPORTS_HISTORY, HISTORY_ERROR)
+
+def is_empty_history(history: str) -> bool:
+    """True for a missing history or one (or the retriever's summary ending in one) of EMPTY_HISTORIES"""
+    history = (history or "").strip()
+    return not history or history.endswith(EMPTY_HISTORIES)
+
+# Round-trip accounting: statements and commits issued while a PipelineData is active
+_active_pipeline_data = ContextVar("active_pipeline_data", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    data = _active_pipeline_data.get()
+    if data is not None:
+        data.round_trips += 1
+
+@event.listens_for(Engine, "commit")
+def _count_commit(conn):
+    data = _active_pipeline_data.get()
+    if data is not None:
+        data.round_trips += 1
+
+
+def extract_impression(report_text: str) -> str:
+    impression = "See full report."
+    for marker in ("Impression", "IMPRESSION"):
+        if marker in report_text:
+            parts = report_text.split(marker)
+            if len(parts) > 1:
+                # Take the part after "Impression"
+                impression = parts[1].split("\n\n")[0].strip(": \n")
+            break
+    return impression
+
+
+class PipelineData:
     """
-    Fetch patient details from the database.
+    Data access for one pipeline run.
+    Resolves the patient (id, then MRN) once, loads details and the last N reports
+    in a single joined query, and reuses one session across the graph nodes.
+    round_trips counts the SQL statements and commits issued through it.
     """
-    session = get_db_session()
-    try:
-        # Try finding by ID first (if integer), then MRN
-        patient = None
-        if patient_id.isdigit():
-             patient = session.query(Patient).filter(Patient.id == int(patient_id)).first()
-        
-        if not patient:
-            patient = session.query(Patient).filter(Patient.mrn == patient_id).first()
-
-        if patient:
-            return {
-                "id": str(patient.id),
-                "mrn": patient.mrn,
-                "name": patient.name,
-                "age": patient.age,
-                "gender": patient.gender
-            }
-        else:
-            # Fallback if patient doesn't exist (e.g. new upload with random ID)
+    def __init__(self, patient_id: str, session_factory=get_db_session, history_limit: int = HISTORY_LIMIT):
+        self.patient_id = str(patient_id)
+        self.history_limit = history_limit
+        self.round_trips = 0
+        self.cache_hit = False
+        self.patient = None  # dict once resolved, None for unknown patients
+        self.history = []  # [(scan_date, impression)], newest first
+        self._session_factory = session_factory
+        self._session = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    @contextmanager
+    def _counting(self):
+        token = _active_pipeline_data.set(self)
+        try:
+            yield
+        finally:
+            _active_pipeline_data.reset(token)
+
+    def _identity_filter(self):
+        conditions = [Patient.mrn == self.patient_id]
+        if self.patient_id.isdigit():
+            conditions.append(Patient.id == int(self.patient_id))
+        return or_(*conditions)
+
+    def _id_match_first(self) -> list:
+        # An id match wins over an MRN match, as in the old two-step lookup
+        return [case((Patient.id == int(self.patient_id), 0), else_=1)] if self.patient_id.isdigit() else []
+
+    def _is_current(self, context: dict) -> bool:
+        """
+        Whether cached context still matches patients.context_version. Writers in any
+        process bump the version (backend/context_version.py), so this catches changes
+        whose invalidation only reached another process's cache. The cache calls it at
+        most once per PATIENT_CACHE_VALIDATE_SECONDS per entry.
+        """
+        statement = select(Patient.id, Patient.context_version).where(
+            self._identity_filter()
+        ).order_by(*self._id_match_first()).limit(1)
+        with self._counting():
+            row = self.session.execute(statement).first()
+        cached_patient = context.get("patient")
+        if row is None:
+            return cached_patient is None
+        return (cached_patient is not None and cached_patient["id"] == str(row.id)
+                and context.get("version") == row.context_version)
+
+    def _apply_cached(self, context: dict):
+        self.patient = context["patient"]
+        self.history = [(datetime.fromisoformat(date), impression) for date, impression in context["history"]]
+        self._loaded = True
+
+    def load(self):
+        """The patient plus its latest reports: from the context cache, else one round trip"""
+        with self._lock:
+            if self._loaded:
+                return
+            cache = PatientContextCache()
+            cached = cache.get(self.patient_id, is_current=self._is_current)
+            if cached is not None:
+                self.cache_hit = True
+                self._apply_cached(cached)
+                return
+
+            ranked = select(
+                Scan.patient_id.label("patient_id"),
+                Scan.scan_date.label("scan_date"),
+                Report.impression.label("impression"),
+                func.row_number().over(
+                    partition_by=Scan.patient_id,
+                    order_by=Scan.scan_date.desc()
+                ).label("rn")
+            ).join(Report, Report.scan_id == Scan.id).where(
+                Scan.patient_id.in_(select(Patient.id).where(self._identity_filter()))
+            ).subquery("ranked")
+
+            order = [*self._id_match_first(), ranked.c.rn]
+
+            statement = select(
+                Patient.id, Patient.mrn, Patient.name, Patient.age, Patient.gender, Patient.context_version,
+                ranked.c.scan_date, ranked.c.impression
+            ).outerjoin(
+                ranked, and_(ranked.c.patient_id == Patient.id, ranked.c.rn <= self.history_limit)
+            ).where(self._identity_filter()).order_by(*order)
+
+            with self._counting():
+                rows = self.session.execute(statement).all()
+
+            version = None
+            if rows:
+                first = rows[0]
+                version = first.context_version
+                self.patient = {
+                    "id": str(first.id),
+                    "mrn": first.mrn,
+                    "name": first.name,
+                    "age": first.age,
+                    "gender": first.gender
+                }
+                self.history = [(row.scan_date, row.impression) for row in rows
+                                if row.id == first.id and row.scan_date is not None]
+            self._loaded = True
+            cache.set(self.patient_id, {
+                "version": version,
+                "patient": self.patient,
+                "history": [(date.isoformat(), impression) for date, impression in self.history]
+            })
+
+    def get_details(self) -> dict:
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Error fetching patient details: {e}")
             return {
-                "id": patient_id,
-                "name": "New Patient",
-                "age": 30, # Default/Placeholder
+                "id": self.patient_id,
+                "name": "Error Fetching Patient",
+                "age": 0,
                 "gender": "Unknown"
             }
-    except Exception as e:
-        print(f"Error fetching patient details: {e}")
+        if self.patient:
+            return dict(self.patient)
+        # Fallback if patient doesn't exist (e.g. new upload with random ID)
         return {
-            "id": patient_id,
-            "name": "Error Fetching Patient",
-            "age": 0,
+            "id": self.patient_id,
+            "name": "New Patient",
+            "age": 30, # Default/Placeholder
             "gender": "Unknown"
         }
+
+    def get_history(self) -> str:
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Error fetching history: {e}")
+            return HISTORY_ERROR
+        if not self.patient:
+            return NEW_PATIENT_HISTORY
+        if not self.history:
+            return NO_REPORTS_HISTORY
+
+        history_text = ""
+        for scan_date, impression in self.history:
+            history_text += f"Date: {scan_date.strftime('%Y-%m-%d')}\nFindings: {impression}\n\n"
+        return history_text
+
+    def store_report(self, report_text: str, scan_path: str) -> bool:
+        """Store the generated report and scan metadata."""
+        with self._lock:
+            session = self.session
+            try:
+                with self._counting():
+                    self.load()
+                    # 1. Find or Create Patient
+                    if self.patient:
+                        patient_pk = int(self.patient["id"])
+                    else:
+                        # In a real app, we'd probably want more details, but for this flow we create a placeholder
+                        patient = Patient(
+                            mrn=self.patient_id[:50],
+                            name="New Patient",
+                            age=30,
+                            gender="Unknown"
+                        )
+                        session.add(patient)
+                        session.flush() # Get ID
+                        patient_pk = patient.id
+
+                    # 2. Create Scan record
+                    scan = Scan(
+                        patient_id=patient_pk,
+                        file_url=scan_path,
+                        body_part="CHEST", # Default
+                        view_position="PA", # Default
+                        modality="DX"
+                    )
+                    session.add(scan)
+                    session.flush()
+
+                    # 3. Create Report record
+                    report = Report(
+                        scan_id=scan.id,
+                        radiologist_name="AI Copilot",
+                        full_text=report_text,
+                        impression=extract_impression(report_text)[:5000] # Truncate if needed
+                    )
+                    session.add(report)
+                    session.commit()
+                # History (and for new patients, existence) changed
+                invalidate_patient(self.patient_id, patient_pk, (self.patient or {}).get("mrn"))
+                self._loaded = False
+                print(f"Report stored successfully for patient {patient_pk}")
+                return True
+
+            except Exception as e:
+                session.rollback()
+                print(f"Error storing report: {e}")
+                return False
+
+    def close(self):
+        """Release the connection; cached details stay usable and the session reopens on demand."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+# ========================================
+# Per-run registry (handle kept in AgentState["data_handle"])
+# ========================================
+_pipeline_data = OrderedDict()
+_pipeline_data_lock = threading.Lock()
+
+
+def _register(handle: str, data: PipelineData):
+    evicted = []
+    with _pipeline_data_lock:
+        _pipeline_data[handle] = data
+        while len(_pipeline_data) > PIPELINE_DATA_CACHE_SIZE:
+            evicted.append(_pipeline_data.popitem(last=False)[1])
+    for stale in evicted:
+        stale.close()
+
+
+def open_pipeline_data(patient_id: str, **kwargs) -> str:
+    """Create the data access object for a new run; returns its handle."""
+    handle = uuid.uuid4().hex
+    _register(handle, PipelineData(patient_id, **kwargs))
+    return handle
+
+
+def get_pipeline_data(handle, patient_id: str) -> PipelineData:
+    """Resolve a handle, creating a fresh object if it was evicted (e.g. after a long review)."""
+    with _pipeline_data_lock:
+        data = _pipeline_data.get(handle) if handle else None
+    if data is None:
+        data = PipelineData(patient_id)
+        if handle:
+            _register(handle, data)
+    return data
+
+
+def close_pipeline_data(handle, release: bool = False):
+    """Close the run's session (e.g. at the review interrupt); release=True forgets the run."""
+    if not handle:
+        return
+    with _pipeline_data_lock:
+        data = _pipeline_data.pop(handle, None) if release else _pipeline_data.get(handle)
+    if data is not None:
+        data.close()
+
+
+# ========================================
+# One-off helpers (each call is its own short-lived run)
+# ========================================
+def get_patient_details(patient_id: str) -> dict:
+    """
+    Fetch patient details from the database.
+    """
+    data = PipelineData(patient_id)
+    try:
+        return data.get_details()
     finally:
-        session.close()
+        data.close()
 
 def fetch_patient_history(patient_id: str) -> str:
     """
     Fetch patient history (past reports) from the database.
     """
-    session = get_db_session()
+    data = PipelineData(patient_id)
     try:
-        patient = None
-        if patient_id.isdigit():
-             patient = session.query(Patient).filter(Patient.id == int(patient_id)).first()
-        if not patient:
-            patient = session.query(Patient).filter(Patient.mrn == patient_id).first()
-
-        if not patient:
-            return "No previous medical history available (New Patient)."
-
-        # Fetch recent reports
-        reports = session.query(Report).join(Scan).filter(Scan.patient_id == patient.id).order_by(desc(Scan.scan_date)).limit(3).all()
-        
-        if not reports:
-            return "No previous reports found."
-            
-        history_text = ""
-        for r in reports:
-            date_str = r.scan.scan_date.strftime('%Y-%m-%d')
-            history_text += f"Date: {date_str}\nFindings: {r.impression}\n\n"
-            
-        return history_text
-    except Exception as e:
-        print(f"Error fetching history: {e}")
-        return "Error fetching history."
+        return data.get_history()
     finally:
-        session.close()
+        data.close()
 
 def store_report(patient_id: str, report_text: str, scan_path: str):
     """
     Store the generated report and scan metadata.
     """
-    session = get_db_session()
+    data = PipelineData(patient_id)
     try:
-        # 1. Find or Create Patient
-        patient = None
-        if patient_id.isdigit():
-             patient = session.query(Patient).filter(Patient.id == int(patient_id)).first()
-        
-        if not patient:
-             patient = session.query(Patient).filter(Patient.mrn == patient_id).first()
-             
-        if not patient:
-            # Create new patient
-            # In a real app, we'd probably want more details, but for this flow we create a placeholder
-            patient = Patient(
-                mrn=patient_id[:50], 
-                name="New Patient", 
-                age=30, 
-                gender="Unknown"
-            )
-            session.add(patient)
-            session.flush() # Get ID
-            
-        # 2. Create Scan record
-        scan = Scan(
-            patient_id=patient.id,
-            file_path=scan_path,
-            body_part="CHEST", # Default
-            view_position="PA", # Default
-            modality="DX"
-        )
-        session.add(scan)
-        session.flush()
-        
-        # 3. Create Report record
-        # Extract impression if possible
-        impression = "See full report."
-        if "Impression" in report_text:
-            parts = report_text.split("Impression")
-            if len(parts) > 1:
-                # Take the part after "Impression"
-                impression = parts[1].split("\n\n")[0].strip(": \n")
-        elif "IMPRESSION" in report_text:
-             parts = report_text.split("IMPRESSION")
-             if len(parts) > 1:
-                impression = parts[1].split("\n\n")[0].strip(": \n")
-        
-        report = Report(
-            scan_id=scan.id,
-            radiologist_name="AI Copilot",
-            full_text=report_text,
-            impression=impression[:5000] # Truncate if needed
-        )
-        session.add(report)
-        session.commit()
-        print(f"Report stored successfully for patient {patient.id}")
-        return True
-        
-    except Exception as e:
-        session.rollback()
-        print(f"Error storing report: {e}")
-        return False
+        return data.store_report(report_text, scan_path)
     finally:
-        session.close()
+        data.close()
@@ -0,0 +1,212 @@
+"""
+Cache of LLM answers to questions about a report (/api/chat, /api/chat/stream,
+WhatsApp). Keys combine the report id, a generation bumped by
+invalidate_report_answers (update_report), a hash of the exact context the LLM
+saw, and the normalized question, so edited reports never serve stale answers.
+Same backends as the patient context cache: in-process TTL+LRU, or Redis via
+QA_CACHE_REDIS_URL (default: PATIENT_CACHE_REDIS_URL).
+
+With QA_CACHE_SEMANTIC=1, a miss falls back to an in-process similarity
+lookup over BiomedCLIP text embeddings of earlier questions on the same report,
+so paraphrases ("is this normal?" / "is my x-ray normal") reuse one answer.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from agent_graph.patient_cache import LocalTTLCache, RedisTTLCache
+
+QA_CACHE_CONFIG = {
+    'ttl_seconds': float(os.getenv('QA_CACHE_TTL_SECONDS', '86400')),
+    'max_size': int(os.getenv('QA_CACHE_MAX_SIZE', '4096')),
+    'redis_url': os.getenv('QA_CACHE_REDIS_URL', os.getenv('PATIENT_CACHE_REDIS_URL', '')),
+    'semantic': os.getenv('QA_CACHE_SEMANTIC', '0').lower() in ('1', 'true', 'yes'),
+    'similarity': float(os.getenv('QA_CACHE_SIMILARITY', '0.92')),
+    # Paraphrase candidates kept per report context
+    'semantic_entries': int(os.getenv('QA_CACHE_SEMANTIC_ENTRIES', '64')),
+}
+
+KEY_PREFIX = "qa:"
+GENERATION_PREFIX = "qa_gen:"
+
+
+def normalize_question(question: str) -> str:
+    """Case-, accent-, punctuation- and whitespace-insensitive form of a question"""
+    text = unicodedata.normalize('NFKD', question).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def clip_question_embedder(questions: list) -> np.ndarray:
+    """L2-normalized BiomedCLIP text features, (len(questions), D)"""
+    from agent_graph.tools.model_tools import ModelManager, encode_clip_text
+    _, model, tokenizer = ModelManager().load_clip()
+    return encode_clip_text(model, tokenizer, questions, template='').cpu().numpy()
+
+
+class SemanticIndex:
+    """Per-context (embedding, answer) lists, LRU over contexts; in-process only."""
+    def __init__(self, max_contexts: int, entries_per_context: int):
+        self.max_contexts = max_contexts
+        self.entries_per_context = entries_per_context
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(self, scope_key: str, embedding: np.ndarray, threshold: float) -> Optional[str]:
+        with self._lock:
+            entries = self._contexts.get(scope_key)
+            if not entries:
+                return None
+            self._contexts.move_to_end(scope_key)
+            matrix = np.stack([vector for vector, _ in entries])
+            scores = matrix @ embedding
+            best = int(np.argmax(scores))
+            return entries[best][1] if scores[best] >= threshold else None
+
+    def add(self, scope_key: str, embedding: np.ndarray, answer: str):
+        with self._lock:
+            entries = self._contexts.setdefault(scope_key, [])
+            entries.append((embedding, answer))
+            del entries[:-self.entries_per_context]
+            self._contexts.move_to_end(scope_key)
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+
+    def drop_report(self, report_id):
+        prefix = f"{report_id}:"
+        with self._lock:
+            for key in [key for key in self._contexts if key.startswith(prefix)]:
+                del self._contexts[key]
+
+
+class ReportAnswerCache:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ReportAnswerCache, cls).__new__(cls)
+            cls._instance.backend = cls._create_backend()
+            cls._instance.semantic = (
+                SemanticIndex(QA_CACHE_CONFIG['max_size'], QA_CACHE_CONFIG['semantic_entries'])
+                if QA_CACHE_CONFIG['semantic'] else None
+            )
+            cls._instance.embedder = clip_question_embedder
+            cls._instance.similarity = QA_CACHE_CONFIG['similarity']
+            cls._instance.hits = 0
+            cls._instance.semantic_hits = 0
+            cls._instance.misses = 0
+            cls._instance.invalidations = 0
+            cls._instance.stats_lock = threading.Lock()
+        return cls._instance
+
+    @staticmethod
+    def _create_backend():
+        if QA_CACHE_CONFIG['redis_url']:
+            try:
+                backend = RedisTTLCache(QA_CACHE_CONFIG['redis_url'], QA_CACHE_CONFIG['ttl_seconds'], KEY_PREFIX)
+                backend.client.ping()
+                print("Report answer cache: Redis")
+                return backend
+            except Exception as e:
+                print(f"Redis unavailable for report answer cache ({e}), using in-process cache")
+        return LocalTTLCache(QA_CACHE_CONFIG['max_size'], QA_CACHE_CONFIG['ttl_seconds'])
+
+    def _count(self, name: str):
+        with self.stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _generation(self, report_id) -> str:
+        try:
+            return self.backend.get(GENERATION_PREFIX + str(report_id)) or "0"
+        except Exception as e:
+            print(f"Report answer cache read failed: {e}")
+            return "0"
+
+    def _scope_key(self, report_id, context: str, scope: str) -> str:
+        """report id + generation + audience + hash of the context the LLM answers from"""
+        context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()[:32]
+        return f"{report_id}:{self._generation(report_id)}:{scope}:{context_hash}"
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        try:
+            return np.asarray(self.embedder([question]))[0]
+        except Exception as e:
+            print(f"Question embedding failed, exact matches only: {e}")
+            return None
+
+    def get(self, report_id, context: str, question: str, scope: str = "chat") -> Optional[str]:
+        scope_key = self._scope_key(report_id, context, scope)
+        normalized = normalize_question(question)
+        try:
+            value = self.backend.get(KEY_PREFIX + scope_key + ":" + normalized)
+        except Exception as e:
+            print(f"Report answer cache read failed: {e}")
+            value = None
+        if value is not None:
+            self._count("hits")
+            return json.loads(value)
+
+        if self.semantic is not None and normalized:
+            embedding = self._embed(normalized)
+            answer = self.semantic.search(scope_key, embedding, self.similarity) if embedding is not None else None
+            if answer is not None:
+                self._count("semantic_hits")
+                return answer
+        self._count("misses")
+        return None
+
+    def set(self, report_id, context: str, question: str, answer: str, scope: str = "chat"):
+        scope_key = self._scope_key(report_id, context, scope)
+        normalized = normalize_question(question)
+        try:
+            self.backend.set(KEY_PREFIX + scope_key + ":" + normalized, json.dumps(answer))
+        except Exception as e:
+            print(f"Report answer cache write failed: {e}")
+        if self.semantic is not None and normalized:
+            embedding = self._embed(normalized)
+            if embedding is not None:
+                self.semantic.add(scope_key, embedding, answer)
+
+    def invalidate(self, report_id):
+        """Orphan every cached answer of a report (they expire by TTL/LRU)"""
+        try:
+            generation = int(self._generation(report_id)) + 1
+            # Should the generation itself be evicted, the context hash still keeps
+            # answers about edited text apart
+            self.backend.set(GENERATION_PREFIX + str(report_id), str(generation))
+        except Exception as e:
+            print(f"Report answer cache invalidation failed: {e}")
+        if self.semantic is not None:
+            self.semantic.drop_report(report_id)
+        self._count("invalidations")
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            hits = self.hits + self.semantic_hits
+            lookups = hits + self.misses
+            stats = {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "semantic": self.semantic is not None,
+                "ttl_seconds": QA_CACHE_CONFIG['ttl_seconds'],
+            }
+        try:
+            stats["size"] = self.backend.size()
+        except Exception:
+            stats["size"] = None
+        return stats
+
+
+def invalidate_report_answers(report_id):
+    ReportAnswerCache().invalidate(report_id)
@@ -0,0 +1,206 @@
+"""
+Content-addressed cache of pipeline stage results, so identical films (duplicate
+uploads, test images, repeated /api/analyze calls) skip the models.
+Keys hash the stage inputs: the image's SHA-256 plus model versions and label set
+for the image stages, the report text for NER and the comparator.
+Entries are compressed .npz files in RESULT_CACHE_DIR, shared by the API and
+worker processes; the oldest are evicted past RESULT_CACHE_MAX_MB or
+RESULT_CACHE_TTL_SECONDS. Hit/miss counters are per process.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+# RESULT_CACHE_* are read at import, possibly before backend.database loads .env
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
+
+RESULT_CACHE_CONFIG = {
+    'enabled': os.getenv('RESULT_CACHE_ENABLED', '1') != '0',
+    'dir': os.getenv('RESULT_CACHE_DIR', str(Path(__file__).resolve().parents[1] / 'models' / 'result_cache')),
+    'max_bytes': int(float(os.getenv('RESULT_CACHE_MAX_MB', '512')) * 1024 * 1024),
+    'ttl_seconds': float(os.getenv('RESULT_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+}
+
+# Eviction trims the directory to this fraction of max_bytes so it doesn't run on every write
+EVICT_TO_FRACTION = 0.9
+META_KEY = '__meta__'
+
+
+def file_sha256(path, chunk_size=1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(**parts) -> str:
+    """Stable SHA-256 over the JSON of everything a stage's output depends on"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def to_jsonable(value):
+    """numpy scalars/arrays and tuples (skimage region props) to plain JSON types"""
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class PipelineResultCache:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PipelineResultCache, cls).__new__(cls)
+            cls._instance.cache_dir = RESULT_CACHE_CONFIG['dir']
+            cls._instance.max_bytes = RESULT_CACHE_CONFIG['max_bytes']
+            cls._instance.ttl_seconds = RESULT_CACHE_CONFIG['ttl_seconds']
+            cls._instance.enabled = RESULT_CACHE_CONFIG['enabled']
+            cls._instance.lock = threading.Lock()
+            cls._instance.hits = {}
+            cls._instance.misses = {}
+            cls._instance.evictions = 0
+            # Bytes written since the last directory scan, added to the scanned total
+            cls._instance.approx_bytes = None
+        return cls._instance
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage}-{key}.npz")
+
+    def _count(self, counter: dict, stage: str):
+        with self.lock:
+            counter[stage] = counter.get(stage, 0) + 1
+
+    def get(self, stage: str, key: str) -> Optional[tuple]:
+        """(meta, arrays) stored for stage/key, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+        path = self._path(stage, key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.ttl_seconds:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data[META_KEY]))
+                arrays = {name: data[name] for name in data.files if name != META_KEY}
+            # mtime doubles as last access time for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self._count(self.misses, stage)
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable result cache entry {path}: {e}")
+            self._count(self.misses, stage)
+            return None
+        self._count(self.hits, stage)
+        return meta, arrays
+
+    def set(self, stage: str, key: str, meta: dict, arrays: Optional[dict] = None):
+        if not self.enabled:
+            return
+        path = self._path(stage, key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **{META_KEY: np.array(json.dumps(to_jsonable(meta)))}, **(arrays or {}))
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Result cache write failed: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self.lock:
+            if self.approx_bytes is not None:
+                self.approx_bytes += size
+            over_budget = self.approx_bytes is None or self.approx_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _entries(self) -> list:
+        """(mtime, size, path) of every entry, oldest first"""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.npz'):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        entries.sort()
+        return entries
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used until under budget"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        expire_before = time.time() - self.ttl_seconds
+        target = self.max_bytes * EVICT_TO_FRACTION if total > self.max_bytes else self.max_bytes
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= expire_before and total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self.lock:
+            self.approx_bytes = total
+            self.evictions += removed
+        return removed
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self.lock:
+            self.approx_bytes = 0
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        with self.lock:
+            stages = sorted(set(self.hits) | set(self.misses))
+            hits = sum(self.hits.values())
+            lookups = hits + sum(self.misses.values())
+            return {
+                "enabled": self.enabled,
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "stages": {
+                    stage: {"hits": self.hits.get(stage, 0), "misses": self.misses.get(stage, 0)}
+                    for stage in stages
+                },
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "size_bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -1,11 +1,34 @@
-from typing import TypedDict, Any, List, Optional
+from typing import TypedDict, Optional, Annotated
+
+# Reducers for keys that parallel branches of the graph may write in the same step
+
+def keep_latest_report(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """Latest report wins (analyzer draft, join node, reviewer edit via update_state); None is no update, "" is an edit"""
+    return current if update is None else update
+
+def merge_dicts(current: Optional[dict], update: Optional[dict]) -> Optional[dict]:
+    """Key-wise merge, e.g. analyzer scores + NER's {"ner_entities": [...]}, or per-node timings"""
+    if current is None or update is None:
+        return update if current is None else current
+    return {**current, **update}
+
+def keep_first_error(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """The first failure is the root cause; later nodes usually fail because of it"""
+    return current or update
 
 class AgentState(TypedDict):
     patient_id: str
     xray_image_path: str
-    current_report: Optional[str]
+    image_handle: Optional[str]
+    image_sha256: Optional[str]
+    data_handle: Optional[str]
+    current_report: Annotated[Optional[str], keep_latest_report]
+    region_report: Optional[str]
     patient_history: Optional[str]
     comparison_result: Optional[str]
-    pathologies: Optional[dict]
+    pathologies: Annotated[Optional[dict], merge_dicts]
     visualization_path: Optional[str]
-    error: Optional[str]
+    pdf_path: Optional[str]
+    error: Annotated[Optional[str], keep_first_error]
+    # Seconds each node itself ran, {node: seconds} (added by graph.timed_node)
+    stage_timings: Annotated[Optional[dict], merge_dicts]
@@ -0,0 +1,113 @@
+import torch
+
+def class_gradients(scores, target):
+    """
+    Gradients of several class scores w.r.t. one tensor in a single batched autograd call.
+    scores: (N, K) selected class scores; target: (N, C, H, W) tensor in the same graph.
+    Returns (K, N, C, H, W).
+    """
+    num_classes = scores.shape[1]
+    one_hot = torch.eye(num_classes, dtype=scores.dtype, device=scores.device)
+    one_hot = one_hot[:, None, :].expand(num_classes, scores.shape[0], num_classes)
+    try:
+        return torch.autograd.grad(scores, target, grad_outputs=one_hot,
+                                   retain_graph=True, is_grads_batched=True)[0]
+    except RuntimeError:
+        # Fallback for ops without vmap support: one backward per class
+        return torch.stack([
+            torch.autograd.grad(scores[:, k].sum(), target, retain_graph=True)[0]
+            for k in range(num_classes)
+        ])
+
+def compute_cams(activations, gradients, dtype=torch.float32):
+    """
+    Grad-CAM maps as one einsum over channels instead of a per-channel Python loop.
+    activations: (N, C, H, W); gradients: (K, N, C, H, W) or (N, C, H, W).
+    Returns ReLU'd maps normalized to [0, 1] per map, shaped (K, N, H, W) or (N, H, W).
+    """
+    weights = gradients.mean(dim=(-2, -1))
+    cams = torch.relu(torch.einsum('...nc,nchw->...nhw', weights, activations))
+    maxima = cams.amax(dim=(-2, -1), keepdim=True)
+    cams = torch.where(maxima > 0, cams / maxima.clamp_min(1e-12), cams)
+    return cams.to(dtype)
+
+class GradCAM:
+    """
+    Gradient-weighted Class Activation Mapping for any model and target layer.
+    Hooks are removable: call remove() or use the instance as a context manager
+    so repeated construction on a shared model does not pile up stale hooks.
+    """
+    def __init__(self, model, target_layer):
+        self.model = model
+        self.target_layer = target_layer
+        self.gradients = None
+        self.activations = None
+
+        # Only a forward hook is needed; gradients are taken with torch.autograd.grad
+        self._handles = [self.target_layer.register_forward_hook(self.save_activation)]
+
+    def save_activation(self, module, input, output):
+        self.activations = output
+
+    def remove(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.remove()
+
+    def generate_cams(self, input_image, class_indices, dtype=torch.float32):
+        """One forward pass for all classes. Returns {class_idx: cam} for the first image."""
+        if not class_indices:
+            return {}
+        with torch.enable_grad():
+            output = self.model(input_image)
+            gradients = class_gradients(output[:, class_indices], self.activations)
+
+        # Drop the graph reference held by the hook output
+        self.activations = self.activations.detach()
+        self.gradients = gradients.detach()
+
+        cams = compute_cams(self.activations, self.gradients, dtype).cpu().numpy()
+        return {class_idx: cams[k, 0] for k, class_idx in enumerate(class_indices)}
+
+    def generate_cam(self, input_image, class_idx):
+        return self.generate_cams(input_image, [class_idx])[class_idx]
+
+class MultiClassGradCAM:
+    """
+    Grad-CAM for several pathologies at once on the final DenseNet feature map.
+    The backbone runs once (or not at all when the analyzer's features are passed in);
+    per-class gradients come from a single batched autograd call over a one-hot batch.
+    """
+    def __init__(self, model):
+        self.model = model
+
+    def compute_features(self, input_images):
+        with torch.no_grad():
+            return self.model.forward_features(input_images)
+
+    def batch_cams(self, class_indices, input_images=None, features=None, dtype=torch.float32):
+        """Returns a (K, N, H, W) tensor of CAMs for N images and K classes"""
+        if features is None:
+            features = self.compute_features(input_images)
+
+        model_device = next(self.model.parameters()).device
+        features = features.detach().to(model_device).requires_grad_(True)
+
+        with torch.enable_grad():
+            scores = self.model.forward_head(features)[:, class_indices]
+            gradients = class_gradients(scores, features)
+
+        return compute_cams(features.detach(), gradients, dtype)
+
+    def generate_cams(self, class_indices, input_image=None, features=None, dtype=torch.float32):
+        """Returns {class_idx: cam} with each cam normalized to [0, 1] at feature-map resolution"""
+        if not class_indices:
+            return {}
+        cams = self.batch_cams(class_indices, input_image, features, dtype).cpu().numpy()
+        return {class_idx: cams[k, 0] for k, class_idx in enumerate(class_indices)}
@@ -0,0 +1,238 @@
+"""
+Shared HTTP client for the OpenAI-compatible LLM server (LM Studio).
+One pooled keep-alive connection set per process (sync) and per event loop (async),
+connect/read timeouts so a hung server can't block a worker forever, a cap on
+in-flight requests toward the server, and retries with jittered exponential
+backoff for connection failures and overload responses.
+Streaming completions (astream) record time to first token.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+
+# LLM_* are read at import, possibly before backend.database loads .env
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
+
+LLM_CONFIG = {
+    'base_url': os.getenv('LLM_BASE_URL', 'http://localhost:1234/v1').rstrip('/'),
+    'model': os.getenv('LLM_MODEL', 'medgemma-4b-it'),
+    'max_tokens': int(os.getenv('LLM_MAX_TOKENS', '1024')),
+    'connect_timeout': float(os.getenv('LLM_CONNECT_TIMEOUT', '5')),
+    'read_timeout': float(os.getenv('LLM_READ_TIMEOUT', '120')),
+    'max_connections': int(os.getenv('LLM_MAX_CONNECTIONS', '8')),
+    'max_concurrency': int(os.getenv('LLM_MAX_CONCURRENCY', '4')),
+    'max_retries': int(os.getenv('LLM_MAX_RETRIES', '2')),
+    'retry_backoff': float(os.getenv('LLM_RETRY_BACKOFF', '0.5')),
+}
+
+# Overloaded or restarting server: worth another attempt
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+# Failures before the request reached the model. Read timeouts are not retried:
+# the server accepted the request and a retry would only double the wait.
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+MAX_BACKOFF_SECONDS = 10.0
+# Recent time-to-first-token samples kept for the streaming stats
+TTFT_SAMPLES = 1000
+STREAM_DONE = object()
+
+
+def backoff_seconds(attempt: int, base: float) -> float:
+    """Full jitter: uniform in [0, base * 2^attempt], capped"""
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, base * (2 ** attempt)))
+
+
+def stream_delta(line: str):
+    """Content of one OpenAI streaming SSE line; None for keep-alives/other fields, STREAM_DONE at [DONE]"""
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return STREAM_DONE
+    choices = json.loads(data).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+class LLMClient:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LLMClient, cls).__new__(cls)
+            cls._instance.config = dict(LLM_CONFIG)
+            cls._instance.client = None
+            cls._instance.client_lock = threading.Lock()
+            cls._instance.semaphore = threading.BoundedSemaphore(LLM_CONFIG['max_concurrency'])
+            # The async client and semaphore belong to the event loop that created them
+            cls._instance.async_client = None
+            cls._instance.async_semaphore = None
+            cls._instance.async_loop = None
+            cls._instance.stats_lock = threading.Lock()
+            cls._instance.ttft_ms = deque(maxlen=TTFT_SAMPLES)
+            cls._instance.streams = {"started": 0, "completed": 0, "cancelled": 0, "failed": 0}
+        return cls._instance
+
+    def _timeout(self):
+        return httpx.Timeout(self.config['read_timeout'], connect=self.config['connect_timeout'])
+
+    def _limits(self):
+        return httpx.Limits(max_connections=self.config['max_connections'],
+                            max_keepalive_connections=self.config['max_connections'])
+
+    def get_client(self) -> httpx.Client:
+        with self.client_lock:
+            if self.client is None:
+                self.client = httpx.Client(base_url=self.config['base_url'], timeout=self._timeout(),
+                                           limits=self._limits())
+        return self.client
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self.async_client is None or self.async_loop is not loop:
+            self.async_client = httpx.AsyncClient(base_url=self.config['base_url'], timeout=self._timeout(),
+                                                  limits=self._limits())
+            self.async_semaphore = asyncio.Semaphore(self.config['max_concurrency'])
+            self.async_loop = loop
+        return self.async_client
+
+    def payload(self, messages, **params) -> dict:
+        payload = {
+            "model": self.config['model'],
+            "messages": messages,
+            "max_tokens": self.config['max_tokens'],
+            "stream": False,
+        }
+        payload.update(params)
+        return payload
+
+    def _should_retry(self, attempt, response=None, error=None) -> bool:
+        if attempt >= self.config['max_retries']:
+            return False
+        if error is not None:
+            return isinstance(error, RETRY_EXCEPTIONS)
+        return response.status_code in RETRY_STATUS_CODES
+
+    def chat(self, messages, **params) -> str:
+        """Blocking chat completion; returns the first choice's content"""
+        client = self.get_client()
+        body = self.payload(messages, **params)
+        attempt = 0
+        while True:
+            with self.semaphore:
+                try:
+                    response = client.post("/chat/completions", json=body)
+                except httpx.HTTPError as e:
+                    if not self._should_retry(attempt, error=e):
+                        raise
+                    response = None
+            if response is not None and not self._should_retry(attempt, response=response):
+                response.raise_for_status()
+                return response.json()['choices'][0]['message']['content']
+            time.sleep(backoff_seconds(attempt, self.config['retry_backoff']))
+            attempt += 1
+
+    async def achat(self, messages, **params) -> str:
+        """chat() for async callers; does not tie up a thread while the model generates"""
+        client = self.get_async_client()
+        semaphore = self.async_semaphore
+        body = self.payload(messages, **params)
+        attempt = 0
+        while True:
+            async with semaphore:
+                try:
+                    response = await client.post("/chat/completions", json=body)
+                except httpx.HTTPError as e:
+                    if not self._should_retry(attempt, error=e):
+                        raise
+                    response = None
+            if response is not None and not self._should_retry(attempt, response=response):
+                response.raise_for_status()
+                return response.json()['choices'][0]['message']['content']
+            await asyncio.sleep(backoff_seconds(attempt, self.config['retry_backoff']))
+            attempt += 1
+
+    async def astream(self, messages, **params):
+        """
+        Async generator of content deltas as the server emits them ("stream": true).
+        Closing it (e.g. when the HTTP client disconnects) closes the upstream
+        connection, which stops the generation. Retries only happen before the
+        first token; records time to first token.
+        """
+        client = self.get_async_client()
+        semaphore = self.async_semaphore
+        body = self.payload(messages, **params, stream=True)
+        started_at = time.perf_counter()
+        first_token = False
+        outcome = "failed"
+        self._count_stream("started")
+        attempt = 0
+        try:
+            while True:
+                try:
+                    async with semaphore, client.stream("POST", "/chat/completions", json=body) as response:
+                        if not self._should_retry(attempt, response=response):
+                            if response.is_error:
+                                await response.aread()
+                                response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                delta = stream_delta(line)
+                                if delta is STREAM_DONE:
+                                    break
+                                if not delta:
+                                    continue
+                                if not first_token:
+                                    first_token = True
+                                    with self.stats_lock:
+                                        self.ttft_ms.append((time.perf_counter() - started_at) * 1000)
+                                yield delta
+                            outcome = "completed"
+                            return
+                except httpx.HTTPError as e:
+                    if first_token or not self._should_retry(attempt, error=e):
+                        raise
+                await asyncio.sleep(backoff_seconds(attempt, self.config['retry_backoff']))
+                attempt += 1
+        except (GeneratorExit, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        finally:
+            self._count_stream(outcome)
+
+    def _count_stream(self, name: str):
+        with self.stats_lock:
+            self.streams[name] += 1
+
+    def stream_stats(self) -> dict:
+        with self.stats_lock:
+            samples = list(self.ttft_ms)
+            streams = dict(self.streams)
+        return {
+            **streams,
+            "ttft_ms_p50": round(percentile(samples, 0.5), 1) if samples else None,
+            "ttft_ms_p95": round(percentile(samples, 0.95), 1) if samples else None,
+            "ttft_samples": len(samples),
+        }
+
+    def close(self):
+        with self.client_lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+
+    async def aclose(self):
+        if self.async_client is not None:
+            await self.async_client.aclose()
+            self.async_client = None
+            self.async_loop = None
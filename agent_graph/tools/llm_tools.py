@@ -1,47 +1,76 @@
-import requests
-import json
+import httpx
+
+from agent_graph.tools.llm_client import LLMClient, LLM_CONFIG
+
+LLM_MODEL = LLM_CONFIG['model']
+
+LLM_UNAVAILABLE_MESSAGE = "Error: Could not connect to LLM provider (LM Studio). Please ensure it is running on port 1234."
+LLM_FAILED_MESSAGE = "Sorry, I could not answer the question."
+# Fallback answers; callers must not cache or store these as results
+LLM_ERROR_MESSAGES = (LLM_UNAVAILABLE_MESSAGE, LLM_FAILED_MESSAGE)
+MISSING_INPUT_MESSAGE = "Cannot answer without a report context and a question."
+
+SYSTEM_INSTRUCTION = "You are an experienced radiologist. Analyze the provided X-ray report and answer questions based solely on the information within the report, providing clear and concise medical insights."
+
+def question_messages(context, question):
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_INSTRUCTION
+        },
+        {
+            "role": "user",
+            "content": f"Context: {context}\nQuestion: {question}"
+        }
+    ]
 
 def answer_text_question(context, question):
     """
     Answers a user's question based on the generated report (context) using MedGemma via LM Studio.
     """
     if not context or not question:
-        return "Cannot answer without a report context and a question."
-    
-    url = "http://localhost:1234/v1/chat/completions"
-    headers = {"Content-Type": "application/json"}
-    
-    system_instruction = "You are an experienced radiologist. Analyze the provided X-ray report and answer questions based solely on the information within the report, providing clear and concise medical insights."
-    
-    payload = {
-        "model": "medgemma-4b-it",
-        "messages": [
-            {
-                "role": "system",
-                "content": system_instruction
-            },
-            {
-                "role": "user",
-                "content": f"Context: {context}\nQuestion: {question}"
-            }
-        ],
-        "temperature": 0.7,
-        "max_tokens": -1,
-        "stream": False
-    }
+        return MISSING_INPUT_MESSAGE
+
+    try:
+        return LLMClient().chat(question_messages(context, question), temperature=0.7)
+
+    except httpx.HTTPError as e:
+        print(f"Error communicating with LM Studio: {e}")
+        return LLM_UNAVAILABLE_MESSAGE
+    except Exception as e:
+        print(f"An error occurred during question answering: {e}")
+        return LLM_FAILED_MESSAGE
+
+async def answer_text_question_async(context, question):
+    """answer_text_question for async endpoints (same pooled client, no thread held)"""
+    if not context or not question:
+        return MISSING_INPUT_MESSAGE
 
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        result = response.json()
-        return result['choices'][0]['message']['content']
+        return await LLMClient().achat(question_messages(context, question), temperature=0.7)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error communicating with LM Studio: {e}")
-        return "Error: Could not connect to LLM provider (LM Studio). Please ensure it is running on port 1234."
+        return LLM_UNAVAILABLE_MESSAGE
     except Exception as e:
         print(f"An error occurred during question answering: {e}")
-        return "Sorry, I could not answer the question."
+        return LLM_FAILED_MESSAGE
+
+async def stream_text_answer(context, question):
+    """
+    Yields the answer to a report question token by token as the LLM generates it.
+    Raises httpx.HTTPError if the server can't be reached; closing the generator cancels the generation.
+    """
+    if not context or not question:
+        yield MISSING_INPUT_MESSAGE
+        return
+
+    stream = LLMClient().astream(question_messages(context, question), temperature=0.7)
+    try:
+        async for token in stream:
+            yield token
+    finally:
+        await stream.aclose()
 
 def compare_reports(current_report: str, history: str) -> str:
     """
@@ -49,5 +78,5 @@ def compare_reports(current_report: str, history: str) -> str:
     """
     context = f"Patient History: {history}\n\nCurrent X-Ray Report: {current_report}"
     question = "Compare the current report with the patient history. Highlight any improvements, deteriorations, or new findings. Provide a detailed analysis as an experienced radiologist."
-    
+
     return answer_text_question(context, question)
@@ -1,15 +1,90 @@
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Settings in this module are read at import time, and the API process imports the
+# agent graph before backend.database loads .env, so load it here
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
+
+# Local weights directory. When set, the torchvision and Hugging Face caches live
+# inside it so deploys can ship pre-fetched weights (add HF_HUB_OFFLINE=1 to stay off the network).
+# Must be applied before open_clip/transformers import huggingface_hub.
+MODEL_WEIGHTS_DIR = os.getenv('MODEL_WEIGHTS_DIR')
+if MODEL_WEIGHTS_DIR:
+    os.environ.setdefault('HF_HOME', os.path.join(MODEL_WEIGHTS_DIR, 'huggingface'))
+    os.environ.setdefault('TORCH_HOME', os.path.join(MODEL_WEIGHTS_DIR, 'torch'))
+
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torchvision.transforms as transforms
 import torchvision.models as models
 from open_clip import create_model_from_pretrained, get_tokenizer
 from PIL import Image
 import numpy as np
 import cv2
+import json
+import hashlib
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
 
 # Device configuration
 device = torch.device('cuda') if torch.cuda.is_available() else torch.device('cpu')
 
+# Micro-batching configuration for ChexNet inference
+BATCH_CONFIG = {
+    'max_batch_size': int(os.getenv('CHEXNET_MAX_BATCH_SIZE', '16')),
+    'max_wait_ms': float(os.getenv('CHEXNET_MAX_WAIT_MS', '25')),
+}
+
+# Number of per-image DenseNet feature maps kept for reuse by the visualizer
+ACTIVATION_CACHE_SIZE = int(os.getenv('CHEXNET_ACTIVATION_CACHE_SIZE', '64'))
+
+# Decoded X-rays are downscaled so their longest side is at most this many pixels
+XRAY_MAX_SIDE = int(os.getenv('XRAY_MAX_SIDE', '2048'))
+PREPARED_IMAGE_CACHE_SIZE = int(os.getenv('PREPARED_IMAGE_CACHE_SIZE', '32'))
+
+CHEXNET_TRANSFORM = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], 
+                       std=[0.229, 0.224, 0.225])
+])
+
+# Optional optimized CPU backend: eager | torchscript | int8 | optimized (torchscript + int8)
+# torchscript: ChexNet feature extractor traced, frozen and run in channels_last layout
+# int8: dynamic int8 quantization of BiomedCLIP Linear layers
+CPU_BACKENDS = ('eager', 'torchscript', 'int8', 'optimized')
+CPU_INFERENCE_BACKEND = os.getenv('CPU_INFERENCE_BACKEND', 'eager').lower()
+if CPU_INFERENCE_BACKEND not in CPU_BACKENDS:
+    print(f"Unknown CPU_INFERENCE_BACKEND '{CPU_INFERENCE_BACKEND}', falling back to eager.")
+    CPU_INFERENCE_BACKEND = 'eager'
+
+# BiomedCLIP configuration
+CLIP_MODEL_ID = 'hf-hub:microsoft/BiomedCLIP-PubMedBERT_256-vit_base_patch16_224'
+CLIP_TEMPLATE = 'this is a photo of '
+CLIP_CONTEXT_LENGTH = 256
+CLIP_TEXT_CACHE_DIR = os.getenv(
+    'CLIP_TEXT_CACHE_DIR',
+    str(Path(__file__).resolve().parents[2] / 'models' / 'clip_text_cache')
+)
+
+# Fine-tuned ChexNet weights; without them the ImageNet DenseNet121 backbone is used
+CHEXNET_MODEL_PATH = os.getenv(
+    'CHEXNET_MODEL_PATH',
+    os.path.join(MODEL_WEIGHTS_DIR, 'chexnet_weights.pth') if MODEL_WEIGHTS_DIR else ''
+)
+
+# Labels the analyzer scores with BiomedCLIP zero-shot classification
+DEFAULT_CANDIDATE_LABELS = [
+    "normal chest x-ray", "pneumonia", "pleural effusion", "atelectasis",
+    "cardiomegaly", "pulmonary edema", "fracture", "nodule"
+]
+
 # ChexNet Labels
 CHEXNET_LABELS = [
     'Atelectasis', 'Cardiomegaly', 'Effusion', 'Infiltration', 'Mass', 
@@ -19,17 +94,176 @@ CHEXNET_LABELS = [
 
 class ChexNet(nn.Module):
     """ChexNet model architecture based on DenseNet121"""
-    def __init__(self, num_classes=14):
+    def __init__(self, num_classes=14, pretrained=True):
         super(ChexNet, self).__init__()
-        self.densenet121 = models.densenet121(pretrained=True)
+        self.densenet121 = models.densenet121(pretrained=pretrained)
         num_ftrs = self.densenet121.classifier.in_features
         self.densenet121.classifier = nn.Sequential(
             nn.Linear(num_ftrs, num_classes),
             nn.Sigmoid()
         )
+        self.channels_last = False
         
     def forward(self, x):
-        return self.densenet121(x)
+        return self.forward_head(self.forward_features(x))
+
+    def forward_features(self, x):
+        """Final DenseNet feature map (N, 1024, 7, 7), used as the Grad-CAM target"""
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        return self.densenet121.features(x)
+
+    def forward_head(self, features):
+        out = F.relu(features)
+        out = F.adaptive_avg_pool2d(out, (1, 1))
+        out = torch.flatten(out, 1)
+        return self.densenet121.classifier(out)
+
+class BatchInferenceEngine:
+    """
+    Collects single-image ChexNet requests from concurrent pipeline runs into
+    micro-batches and runs one forward pass per batch.
+    A batch is dispatched when it reaches max_batch_size or when the oldest
+    request has waited max_wait_ms, whichever comes first.
+    """
+    def __init__(self, model, max_batch_size=16, max_wait_ms=25):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="chexnet-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, image_tensor):
+        """
+        Queue a preprocessed (1, 3, 224, 224) tensor.
+        Returns a Future resolving to (probabilities, features) where features is
+        the (1, 1024, 7, 7) DenseNet feature map on the CPU.
+        """
+        future = Future()
+        self._queue.put((image_tensor, future))
+        return future
+
+    def predict(self, image_tensor, timeout=None):
+        return self.submit(image_tensor).result(timeout=timeout)
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the sentinel back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        # Drop requests whose callers have already given up
+        return [(tensor, future) for tensor, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            if not batch:
+                continue
+            try:
+                inputs = torch.cat([tensor.to(device) for tensor, _ in batch], dim=0)
+                with torch.no_grad():
+                    features = self.model.forward_features(inputs)
+                    predictions = self.model.forward_head(features).cpu().numpy()
+                features = features.cpu()
+                for i, (_, future) in enumerate(batch):
+                    future.set_result((predictions[i], features[i:i + 1]))
+            except Exception as e:
+                print(f"Error in batched ChexNet inference: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+
+def optimize_chexnet_for_cpu(model):
+    """
+    Traces and freezes the DenseNet feature extractor in channels_last layout.
+    The classifier head stays eager fp32 so Grad-CAM can still differentiate it.
+    """
+    model = model.to(memory_format=torch.channels_last)
+    model.channels_last = True
+    example = torch.randn(1, 3, 224, 224, device=device).contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        traced = torch.jit.trace(model.densenet121.features, example)
+        traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    model.densenet121.features = traced
+    return model
+
+def quantize_clip_for_cpu(model):
+    """Dynamic int8 quantization of BiomedCLIP Linear layers (ViT and PubMedBERT towers)"""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def cpu_backend_enabled(feature):
+    """True if the configured CPU backend includes 'torchscript' or 'int8' and we are on CPU"""
+    if device.type != 'cpu':
+        return False
+    return CPU_INFERENCE_BACKEND in (feature, 'optimized')
+
+def encode_clip_text(model, tokenizer, labels, template=CLIP_TEMPLATE):
+    """Encodes prompt labels into L2-normalized BiomedCLIP text features (len(labels), D)"""
+    texts = tokenizer([template + label for label in labels], context_length=CLIP_CONTEXT_LENGTH).to(device)
+    with torch.no_grad():
+        return model.encode_text(texts, normalize=True)
+
+class ClipTextEmbeddingCache:
+    """
+    Normalized BiomedCLIP text features keyed by model id, prompt template and label set.
+    Entries are kept in memory and persisted to disk so warm restarts skip the text tower.
+    """
+    def __init__(self, cache_dir=CLIP_TEXT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_id, template, labels):
+        payload = json.dumps({'model': model_id, 'template': template, 'labels': list(labels)})
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, model, tokenizer, labels, model_id=CLIP_MODEL_ID, template=CLIP_TEMPLATE):
+        key = self.make_key(model_id, template, labels)
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+
+            path = os.path.join(self.cache_dir, f"{key}.pt")
+            text_features = None
+            if os.path.exists(path):
+                try:
+                    text_features = torch.load(path, map_location=device)
+                except Exception as e:
+                    print(f"Ignoring unreadable CLIP text cache entry {path}: {e}")
+
+            if text_features is None:
+                text_features = encode_clip_text(model, tokenizer, labels, template)
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    torch.save(text_features.cpu(), tmp_path)
+                    os.replace(tmp_path, path)
+                except Exception as e:
+                    print(f"Could not persist CLIP text features: {e}")
+
+            self._memory[key] = text_features
+            return text_features
 
 class ModelManager:
     _instance = None
@@ -38,56 +272,227 @@ class ModelManager:
         if cls._instance is None:
             cls._instance = super(ModelManager, cls).__new__(cls)
             cls._instance.chexnet_model = None
+            cls._instance.chexnet_lock = threading.Lock()
+            cls._instance.clip_lock = threading.Lock()
+            cls._instance.chexnet_engine = None
+            cls._instance.engine_lock = threading.Lock()
+            cls._instance.cam_extractor = None
+            cls._instance.activation_cache = OrderedDict()
+            cls._instance.activation_lock = threading.Lock()
+            cls._instance.prepared_images = OrderedDict()
+            cls._instance.prepared_lock = threading.Lock()
             cls._instance.clip_model = None
             cls._instance.clip_preprocess = None
             cls._instance.clip_tokenizer = None
+            cls._instance.clip_text_cache = ClipTextEmbeddingCache()
         return cls._instance
 
     def load_chexnet(self):
-        if self.chexnet_model is None:
-            print("Loading ChexNet model...")
-            try:
-                model = ChexNet(num_classes=len(CHEXNET_LABELS))
-                # In a real scenario, we would load weights here:
-                # model.load_state_dict(torch.load('chexnet_model.pth.tar', map_location=device))
-                model.to(device)
-                model.eval()
-                self.chexnet_model = model
-                print("ChexNet model loaded.")
-            except Exception as e:
-                print(f"Error loading ChexNet: {e}")
-                raise e
+        with self.chexnet_lock:
+            if self.chexnet_model is None:
+                print("Loading ChexNet model...")
+                try:
+                    if CHEXNET_MODEL_PATH and os.path.exists(CHEXNET_MODEL_PATH):
+                        # Local fine-tuned weights: skip the ImageNet download entirely
+                        model = ChexNet(num_classes=len(CHEXNET_LABELS), pretrained=False)
+                        checkpoint = torch.load(CHEXNET_MODEL_PATH, map_location=device)
+                        model.load_state_dict(checkpoint.get('state_dict', checkpoint))
+                        print(f"ChexNet weights loaded from {CHEXNET_MODEL_PATH}")
+                    else:
+                        model = ChexNet(num_classes=len(CHEXNET_LABELS))
+                    model.to(device)
+                    model.eval()
+                    if cpu_backend_enabled('torchscript'):
+                        model = optimize_chexnet_for_cpu(model)
+                        print("ChexNet optimized with TorchScript (frozen, channels_last).")
+                    self.chexnet_model = model
+                    print("ChexNet model loaded.")
+                except Exception as e:
+                    print(f"Error loading ChexNet: {e}")
+                    raise e
         return self.chexnet_model
 
+    def get_chexnet_engine(self):
+        """Returns the shared micro-batching engine wrapping the ChexNet model"""
+        if self.chexnet_engine is None:
+            # Loaded outside engine_lock: load_chexnet takes chexnet_lock itself
+            model = self.load_chexnet()
+            with self.engine_lock:
+                # Concurrent first scans must share one engine (and its batching thread)
+                if self.chexnet_engine is None:
+                    self.chexnet_engine = BatchInferenceEngine(
+                        model,
+                        max_batch_size=BATCH_CONFIG['max_batch_size'],
+                        max_wait_ms=BATCH_CONFIG['max_wait_ms']
+                    )
+        return self.chexnet_engine
+
+    def get_cam_extractor(self):
+        """
+        Returns the single Grad-CAM extractor bound to the shared ChexNet model.
+        It is created once per process and registers no module hooks, so repeated
+        visualizer runs do not add work to every subsequent forward pass.
+        """
+        if self.cam_extractor is None:
+            from agent_graph.tools.cam_tools import MultiClassGradCAM
+            self.cam_extractor = MultiClassGradCAM(self.load_chexnet())
+        return self.cam_extractor
+
+    def warm_up_chexnet(self):
+        """Runs a dummy scan through the batch engine and the CAM extractor"""
+        dummy = torch.zeros(1, 3, 224, 224, device=device)
+        _, features = self.get_chexnet_engine().predict(dummy)
+        self.get_cam_extractor().generate_cams([0], features=features)
+
+    def warm_up_clip(self):
+        """Encodes the default label set (filling the text cache) and a dummy image"""
+        _, model, _ = self.load_clip()
+        self.get_clip_text_features(DEFAULT_CANDIDATE_LABELS)
+        with torch.no_grad():
+            model.encode_image(torch.zeros(1, 3, 224, 224, device=device), normalize=True)
+
+    def store_activations(self, key, features):
+        """Keeps the analyzer's feature map so the visualizer can skip its own forward pass"""
+        with self.activation_lock:
+            self.activation_cache[key] = features
+            self.activation_cache.move_to_end(key)
+            while len(self.activation_cache) > ACTIVATION_CACHE_SIZE:
+                self.activation_cache.popitem(last=False)
+
+    def take_activations(self, key):
+        with self.activation_lock:
+            return self.activation_cache.pop(key, None)
+
+    def prepare_image(self, image_path):
+        """
+        Decodes an X-ray once and builds both model inputs.
+        Returns a handle for AgentState; nodes resolve it with get_prepared_image.
+        """
+        clip_preprocess, _, _ = self.load_clip()
+        prepared = prepare_image(image_path, clip_preprocess)
+        handle = uuid.uuid4().hex
+        with self.prepared_lock:
+            self.prepared_images[handle] = prepared
+            while len(self.prepared_images) > PREPARED_IMAGE_CACHE_SIZE:
+                self.prepared_images.popitem(last=False)
+        return handle
+
+    def get_prepared_image(self, handle, image_path):
+        """Resolves a handle, re-preparing from disk if it was evicted (e.g. after a resume)"""
+        with self.prepared_lock:
+            prepared = self.prepared_images.get(handle) if handle else None
+        if prepared is None:
+            clip_preprocess, _, _ = self.load_clip()
+            prepared = prepare_image(image_path, clip_preprocess)
+        return prepared
+
     def get_chexnet_target_layer(self):
-        """Returns the target layer for GradCAM"""
+        """
+        Returns the target layer for the hook-based GradCAM (use it as a context manager).
+        None when the feature extractor has been frozen by the TorchScript backend.
+        """
         if self.chexnet_model:
-            return self.chexnet_model.densenet121.features.denseblock4.denselayer16.conv2
+            try:
+                return self.chexnet_model.densenet121.features.denseblock4.denselayer16.conv2
+            except AttributeError:
+                return None
         return None
 
     def load_clip(self):
-        if self.clip_model is None:
-            print("Loading BiomedCLIP model...")
-            try:
-                model, preprocess = create_model_from_pretrained('hf-hub:microsoft/BiomedCLIP-PubMedBERT_256-vit_base_patch16_224')
-                tokenizer = get_tokenizer('hf-hub:microsoft/BiomedCLIP-PubMedBERT_256-vit_base_patch16_224')
-                model.to(device)
-                self.clip_model = model
-                self.clip_preprocess = preprocess
-                self.clip_tokenizer = tokenizer
-                print("BiomedCLIP loaded.")
-            except Exception as e:
-                print(f"Error loading BiomedCLIP: {e}")
-                raise e
+        with self.clip_lock:
+            if self.clip_model is None:
+                print("Loading BiomedCLIP model...")
+                try:
+                    model, preprocess = create_model_from_pretrained(CLIP_MODEL_ID)
+                    tokenizer = get_tokenizer(CLIP_MODEL_ID)
+                    model.to(device)
+                    model.eval()
+                    if cpu_backend_enabled('int8'):
+                        model = quantize_clip_for_cpu(model)
+                        print("BiomedCLIP quantized to dynamic int8.")
+                    self.clip_preprocess = preprocess
+                    self.clip_tokenizer = tokenizer
+                    self.clip_model = model
+                    print("BiomedCLIP loaded.")
+                except Exception as e:
+                    print(f"Error loading BiomedCLIP: {e}")
+                    raise e
         return self.clip_preprocess, self.clip_model, self.clip_tokenizer
 
+    def get_clip_text_features(self, labels, template=CLIP_TEMPLATE):
+        """Cached, normalized text features for a label set"""
+        _, model, tokenizer = self.load_clip()
+        # Quantized text towers produce slightly different features, so they get their own entries
+        model_id = f"{CLIP_MODEL_ID}#int8" if cpu_backend_enabled('int8') else CLIP_MODEL_ID
+        return self.clip_text_cache.get(model, tokenizer, labels, model_id=model_id, template=template)
+
+_weights_fingerprint = {}
+
+def model_versions():
+    """
+    Everything that changes the image stages' outputs for the same film: model ids,
+    the ChexNet weights file, the CPU backend in effect and the decode size.
+    Used in the pipeline result cache keys.
+    """
+    if CHEXNET_MODEL_PATH and os.path.exists(CHEXNET_MODEL_PATH):
+        stat = os.stat(CHEXNET_MODEL_PATH)
+        signature = (CHEXNET_MODEL_PATH, stat.st_size, stat.st_mtime_ns)
+        if signature not in _weights_fingerprint:
+            with open(CHEXNET_MODEL_PATH, 'rb') as f:
+                _weights_fingerprint[signature] = hashlib.sha256(f.read()).hexdigest()
+        chexnet = _weights_fingerprint[signature]
+    else:
+        chexnet = 'densenet121-imagenet'
+    return {
+        'chexnet': chexnet,
+        'chexnet_torchscript': cpu_backend_enabled('torchscript'),
+        'clip': f"{CLIP_MODEL_ID}#int8" if cpu_backend_enabled('int8') else CLIP_MODEL_ID,
+        'clip_template': CLIP_TEMPLATE,
+        'device': device.type,
+        'xray_max_side': XRAY_MAX_SIDE,
+    }
+
+def load_xray_image(image_path, max_side=XRAY_MAX_SIDE):
+    """
+    Opens an X-ray as RGB, shrinking large films while decoding.
+    JPEGs are decoded at reduced scale via draft(); other formats use a cheap
+    integer reduce() before the final resize to max_side.
+    """
+    image = Image.open(image_path)
+    image.draft('RGB', (max_side, max_side))
+    longest = max(image.size)
+    if longest > max_side:
+        factor = longest // max_side
+        if factor > 1:
+            image = image.reduce(factor)
+        if max(image.size) > max_side:
+            scale = max_side / max(image.size)
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.BILINEAR)
+    return image.convert('RGB')
+
+def prepare_image(image_path, clip_preprocess=None):
+    """Decodes once and returns the RGB image plus the ChexNet and CLIP input tensors"""
+    with Image.open(image_path) as source:
+        original_size = source.size  # header only; load_xray_image may shrink the decode
+    image = load_xray_image(image_path)
+    return {
+        'image': image,
+        'original_size': original_size,
+        'chexnet_tensor': preprocess_image_for_chexnet(image),
+        'clip_tensor': clip_preprocess(image).unsqueeze(0).to(device) if clip_preprocess else None
+    }
+
+def full_resolution_image(prepared, image_path):
+    """
+    The prepared image at the film's own size, for outputs a reader measures (overlay,
+    region sizes). Only decoded again when load_xray_image downscaled it for the models.
+    """
+    if prepared['image'].size == prepared['original_size']:
+        return prepared['image']
+    return Image.open(image_path).convert('RGB')
+
 def preprocess_image_for_chexnet(image):
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                           std=[0.229, 0.224, 0.225])
-    ])
     if isinstance(image, np.ndarray):
         image = Image.fromarray(image)
     
@@ -95,52 +500,78 @@ def preprocess_image_for_chexnet(image):
     if image.mode != 'RGB':
         image = image.convert('RGB')
         
-    image_tensor = transform(image).unsqueeze(0).to(device)
+    image_tensor = CHEXNET_TRANSFORM(image).unsqueeze(0).to(device)
     return image_tensor
 
+def format_pathology_predictions(predictions, threshold=0.5):
+    results = {}
+    for i, label in enumerate(CHEXNET_LABELS):
+        results[label] = {
+            'probability': float(predictions[i]),
+            'detected': bool(predictions[i] > threshold)
+        }
+    return results
+
 def predict_pathologies(image, model, threshold=0.5):
     try:
         image_tensor = preprocess_image_for_chexnet(image)
         with torch.no_grad():
             predictions = model(image_tensor)
             predictions = predictions.cpu().numpy()[0]
-        results = {}
-        for i, label in enumerate(CHEXNET_LABELS):
-            results[label] = {
-                'probability': float(predictions[i]),
-                'detected': bool(predictions[i] > threshold)
-            }
-        return results
+        return format_pathology_predictions(predictions, threshold)
     except Exception as e:
         print(f"Error in pathology prediction: {e}")
         return {}
 
-def generate_clip_report(image, preprocess, model, tokenizer, candidate_labels):
+def predict_pathologies_batched(image, engine, threshold=0.5, return_features=False, image_tensor=None):
+    """
+    Submits one image to the shared BatchInferenceEngine and waits for its slice of the batch.
+    With return_features=True, returns (results, features) so the caller can reuse the feature map.
+    Pass image_tensor to skip preprocessing when it was already done.
+    """
+    try:
+        if image_tensor is None:
+            image_tensor = preprocess_image_for_chexnet(image)
+        predictions, features = engine.predict(image_tensor)
+        results = format_pathology_predictions(predictions, threshold)
+        return (results, features) if return_features else results
+    except Exception as e:
+        print(f"Error in pathology prediction: {e}")
+        return ({}, None) if return_features else {}
+
+def clip_label_scores(image, preprocess, model, tokenizer, candidate_labels, text_features=None, image_tensor=None):
+    """
+    Zero-shot probabilities {label: float} for candidate_labels. Pass cached text_features
+    (e.g. ModelManager.get_clip_text_features) so only the image tower runs,
+    and image_tensor to reuse an already preprocessed CLIP input.
+    """
+    if text_features is None:
+        text_features = encode_clip_text(model, tokenizer, candidate_labels)
+
+    # Ensure image is PIL
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+
+    with torch.no_grad():
+        image_processed = image_tensor if image_tensor is not None else preprocess(image).unsqueeze(0).to(device)
+        image_features = model.encode_image(image_processed, normalize=True)
+        logits = (model.logit_scale.exp() * image_features @ text_features.t()).softmax(dim=-1)
+
+    probs = logits.cpu().numpy()
+    return {label: float(prob) for label, prob in zip(candidate_labels, probs[0])}
+
+def format_clip_report(scores):
+    sorted_scores = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return "\n".join(f"- **{label}:** {score:.2%}" for label, score in sorted_scores)
+
+def generate_clip_report(image, preprocess, model, tokenizer, candidate_labels, text_features=None, image_tensor=None):
+    """Zero-shot scores for candidate_labels as a Markdown list (see clip_label_scores)"""
     if not image or not candidate_labels:
         return "Error: Invalid input."
 
     try:
-        template = 'this is a photo of '
-        texts = tokenizer([template + label for label in candidate_labels], context_length=256).to(device)
-        
-        # Ensure image is PIL
-        if isinstance(image, np.ndarray):
-            image = Image.fromarray(image)
-            
-        with torch.no_grad():
-            image_processed = preprocess(image).unsqueeze(0).to(device)
-            image_features, text_features, logit_scale = model(image_processed, texts)
-            logits = (logit_scale * image_features @ text_features.t()).detach().softmax(dim=-1)
-
-        probs = logits.cpu().numpy()
-        scores = {label: prob for label, prob in zip(candidate_labels, probs[0])}
-        sorted_scores = sorted(scores.items(), key=lambda item: item[1], reverse=True)
-
-        report_lines = []
-        for label, score in sorted_scores:
-            report_lines.append(f"- **{label}:** {score:.2%}")
-            
-        return "\n".join(report_lines)
+        return format_clip_report(clip_label_scores(image, preprocess, model, tokenizer, candidate_labels,
+                                                    text_features, image_tensor))
     except Exception as e:
         print(f"Error generating CLIP report: {e}")
         return "Failed to generate report."
@@ -1,5 +1,10 @@
+# Imported first so MODEL_WEIGHTS_DIR redirects the Hugging Face cache before transformers loads
+from agent_graph.tools.model_tools import MODEL_WEIGHTS_DIR
 from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
 import re
+import threading
+
+NER_MODEL_ID = "d4data/biomedical-ner-all"
 
 # NER Configuration
 NER_CONFIG = {
@@ -16,21 +21,27 @@ class NERManager:
         if cls._instance is None:
             cls._instance = super(NERManager, cls).__new__(cls)
             cls._instance.pipeline = None
+            cls._instance.lock = threading.Lock()
         return cls._instance
 
     def load_pipeline(self):
-        if self.pipeline is None:
-            print("Loading NER pipeline...")
-            try:
-                tokenizer = AutoTokenizer.from_pretrained("d4data/biomedical-ner-all")
-                model = AutoModelForTokenClassification.from_pretrained("d4data/biomedical-ner-all")
-                self.pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
-                print("NER pipeline loaded.")
-            except Exception as e:
-                print(f"Error loading NER pipeline: {e}")
-                raise e
+        with self.lock:
+            if self.pipeline is None:
+                print("Loading NER pipeline...")
+                try:
+                    tokenizer = AutoTokenizer.from_pretrained(NER_MODEL_ID)
+                    model = AutoModelForTokenClassification.from_pretrained(NER_MODEL_ID)
+                    self.pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+                    print("NER pipeline loaded.")
+                except Exception as e:
+                    print(f"Error loading NER pipeline: {e}")
+                    raise e
         return self.pipeline
 
+    def warm_up(self):
+        """Runs one short report through the pipeline so the first real call is not slowed by lazy init"""
+        self.load_pipeline()("Chest X-ray shows no acute cardiopulmonary abnormality.")
+
 def extract_ner_entities(text, ner_pipeline):
     """Process text through NER pipeline with enhanced filtering."""
     try:
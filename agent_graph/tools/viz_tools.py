@@ -1,4 +1,3 @@
-import torch
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
@@ -19,44 +18,6 @@ ANATOMICAL_REGIONS = {
     'right_costophrenic': {'coords': (0.6, 0.75, 0.9, 0.95), 'label': 'Right Costophrenic Angle'}
 }
 
-class GradCAM:
-    """Gradient-weighted Class Activation Mapping for model interpretability"""
-    def __init__(self, model, target_layer):
-        self.model = model
-        self.target_layer = target_layer
-        self.gradients = None
-        self.activations = None
-        
-        # Register hooks
-        self.target_layer.register_forward_hook(self.save_activation)
-        self.target_layer.register_backward_hook(self.save_gradient)
-        
-    def save_activation(self, module, input, output):
-        self.activations = output.detach()
-        
-    def save_gradient(self, module, grad_input, grad_output):
-        self.gradients = grad_output[0].detach()
-        
-    def generate_cam(self, input_image, class_idx):
-        self.model.zero_grad()
-        output = self.model(input_image)
-        output[0, class_idx].backward(retain_graph=True)
-
-        gradients = self.gradients[0]
-        activations = self.activations[0]
-
-        weights = torch.mean(gradients, dim=[1, 2])
-        cam = torch.zeros(activations.shape[1:], dtype=torch.float32, device=activations.device)
-
-        for i, w in enumerate(weights):
-            cam += w * activations[i]
-
-        cam = torch.relu(cam)
-        if torch.max(cam) > 0:
-            cam = cam / torch.max(cam)
-
-        return cam.cpu().numpy()
-
 def find_activation_regions(cam_map, threshold=0.3, min_area=100):
     binary_map = cam_map > threshold
     binary_map = morphology.remove_small_objects(binary_map, min_size=min_area)
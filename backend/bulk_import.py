@@ -0,0 +1,320 @@
+"""
+Bulk patient / scan import from CSV or JSONL
+Patients are upserted by MRN in chunks (multi-row INSERT ... ON CONFLICT, or
+COPY into a temp table on PostgreSQL); optional scan rows are inserted in the
+same chunk transaction. import_records() yields a progress dict per chunk.
+
+Columns / keys:
+    mrn, name, age, gender                      (patient; mrn, name and age required)
+    scan_file, body_part, view_position,        (optional scan: URL, or a path under scan_root)
+    modality, scan_date
+
+Usage:
+    python -m backend.bulk_import patients.csv
+    python -m backend.bulk_import clinic.jsonl --chunk-size 10000 --method copy --analyze
+"""
+import os
+import io
+import csv
+import json
+import time
+import uuid
+import shutil
+import argparse
+from datetime import datetime
+from typing import Optional, Iterator, Iterable
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models import Patient, Scan, AnalysisJob
+from backend.worklist import refresh_worklist, worklist_suspended
+from backend.context_version import bump_context_version
+
+IMPORT_CONFIG = {
+    'chunk_size': int(os.getenv('IMPORT_CHUNK_SIZE', '5000')),
+    # Imported scan files are copied here so /reports serves them like uploads
+    'scan_dir': os.path.join("reports", "imports"),
+}
+
+MAX_ERRORS_REPORTED = 100
+
+
+def read_records(stream, fmt: str) -> Iterator[tuple]:
+    """Yields (line_number, dict) from a text stream of CSV or JSONL."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if line:
+                yield line_no, json.loads(line)
+    else:
+        raise ValueError(f"Unsupported format '{fmt}', use csv or jsonl")
+
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def resolve_scan_file(value: str, scan_root: Optional[str]) -> tuple:
+    """Returns (file_url, local_path). URLs pass through; local files must live under scan_root."""
+    if value.startswith(("http://", "https://")):
+        return value, None
+    if not scan_root:
+        raise ValueError("local scan files are not allowed here, use a URL")
+    root = os.path.realpath(scan_root)
+    source = os.path.realpath(os.path.join(root, value))
+    if os.path.commonpath([root, source]) != root:
+        raise ValueError(f"scan file outside the import directory: {value}")
+    if not os.path.isfile(source):
+        raise ValueError(f"scan file not found: {value}")
+
+    os.makedirs(IMPORT_CONFIG['scan_dir'], exist_ok=True)
+    filename = f"{uuid.uuid4().hex[:8]}_{os.path.basename(source)}"
+    target = os.path.join(IMPORT_CONFIG['scan_dir'], filename)
+    shutil.copyfile(source, target)
+    return f"/reports/imports/{filename}", os.path.abspath(target)
+
+
+def normalize_record(record: dict, scan_root: Optional[str]) -> tuple:
+    """Validates one input row; returns (patient dict, scan dict or None)."""
+    mrn = str(record.get("mrn") or "").strip()
+    name = str(record.get("name") or "").strip()
+    if not mrn or not name:
+        raise ValueError("mrn and name are required")
+    if len(mrn) > 50:
+        raise ValueError("mrn longer than 50 characters")
+    try:
+        age = int(record.get("age"))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid age {record.get('age')!r}")
+
+    patient = {
+        "mrn": mrn,
+        "name": name[:200],
+        "age": age,
+        "gender": str(record.get("gender") or "Unknown").strip()[:20]
+    }
+
+    scan_file = str(record.get("scan_file") or "").strip()
+    if not scan_file:
+        return patient, None
+
+    scan_date = record.get("scan_date")
+    file_url, local_path = resolve_scan_file(scan_file, scan_root)
+    scan = {
+        "mrn": mrn,
+        "file_url": file_url,
+        "local_path": local_path,
+        "body_part": str(record.get("body_part") or "CHEST").strip().upper()[:100],
+        "view_position": str(record.get("view_position") or "PA").strip().upper()[:50],
+        "modality": str(record.get("modality") or "DX").strip().upper()[:10],
+        "scan_date": datetime.fromisoformat(scan_date) if scan_date else datetime.utcnow()
+    }
+    return patient, scan
+
+
+def _upsert_statement(dialect: str):
+    """INSERT ... ON CONFLICT (mrn) DO UPDATE for the connected database, run as executemany"""
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(Patient)
+        return statement.on_duplicate_key_update(
+            name=statement.inserted.name, age=statement.inserted.age, gender=statement.inserted.gender
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+
+    statement = insert(Patient)
+    return statement.on_conflict_do_update(
+        index_elements=[Patient.mrn],
+        set_={"name": statement.excluded.name, "age": statement.excluded.age, "gender": statement.excluded.gender}
+    )
+
+
+def _copy_upsert(db: Session, rows: list):
+    """PostgreSQL COPY into a temp table, then one INSERT ... SELECT ... ON CONFLICT"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row["mrn"], row["name"], row["age"], row["gender"]])
+    buffer.seek(0)
+
+    dbapi_connection = db.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS patient_import "
+            "(mrn varchar(50), name varchar(200), age integer, gender varchar(20)) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert("COPY patient_import (mrn, name, age, gender) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            "INSERT INTO patients (mrn, name, age, gender, created_at) "
+            "SELECT mrn, name, age, gender, now() AT TIME ZONE 'utc' FROM patient_import "
+            "ON CONFLICT (mrn) DO UPDATE SET name = EXCLUDED.name, age = EXCLUDED.age, gender = EXCLUDED.gender"
+        )
+
+
+def upsert_patients(db: Session, rows: list, method: str = "insert"):
+    """Upsert one chunk of patients (unique MRNs) without committing."""
+    dialect = db.get_bind().dialect.name
+    if method == "copy" and dialect == "postgresql":
+        _copy_upsert(db, rows)
+        return
+
+    statement = _upsert_statement(dialect)
+    if statement is not None:
+        # A list of parameter sets lets SQLAlchemy batch this into multi-row INSERTs
+        db.execute(statement, rows)
+        return
+
+    # Generic fallback: update existing MRNs, bulk insert the rest
+    existing = dict(db.execute(select(Patient.mrn, Patient.id).where(Patient.mrn.in_([r["mrn"] for r in rows]))).all())
+    updates = [{"id": existing[r["mrn"]], **r} for r in rows if r["mrn"] in existing]
+    inserts = [r for r in rows if r["mrn"] not in existing]
+    if updates:
+        db.bulk_update_mappings(Patient, updates)
+    if inserts:
+        db.bulk_insert_mappings(Patient, inserts)
+
+
+def import_chunk(db: Session, patients: list, scans: list, method: str, analyze: bool) -> dict:
+    """Upsert patients, then insert their scans (and analysis jobs) in one transaction."""
+    # Last row wins for MRNs repeated within the chunk (ON CONFLICT can't touch a row twice)
+    unique = list({p["mrn"]: p for p in patients}.values())
+    mrns = [p["mrn"] for p in unique]
+    existing = set(db.execute(select(Patient.mrn).where(Patient.mrn.in_(mrns))).scalars())
+
+    # Core upserts bypass the per-flush worklist hook; refresh the whole chunk once instead
+    with worklist_suspended(db):
+        upsert_patients(db, unique, method)
+
+        ids = {}
+        if scans:
+            scan_mrns = list({s["mrn"] for s in scans})
+            ids = dict(db.execute(select(Patient.mrn, Patient.id).where(Patient.mrn.in_(scan_mrns))).all())
+            scan_objects = [
+                Scan(
+                    patient_id=ids[s["mrn"]],
+                    file_url=s["file_url"],
+                    body_part=s["body_part"],
+                    view_position=s["view_position"],
+                    modality=s["modality"],
+                    scan_date=s["scan_date"]
+                )
+                for s in scans
+            ]
+            db.add_all(scan_objects)
+            db.flush()
+
+            if analyze:
+                db.add_all(
+                    AnalysisJob(scan_id=scan.id, file_path=s["local_path"], patient_mrn=s["mrn"], status="queued")
+                    for scan, s in zip(scan_objects, scans) if s["local_path"]
+                )
+
+        db.flush()
+        chunk_patients = select(Patient.id).where(Patient.mrn.in_(mrns))
+        refresh_worklist(db, patient_ids=chunk_patients)
+        # The Core upsert bypasses the flush hook too; stale cached context in any process is dropped
+        bump_context_version(db, patient_ids=chunk_patients)
+        db.commit()
+
+    updated = [mrn for mrn in mrns if mrn in existing]
+    # Every MRN in the chunk: updated demographics, new scans, and new patients an
+    # earlier lookup may have cached as unknown
+    from agent_graph.patient_cache import invalidate_patient
+    invalidate_patient(*mrns)
+
+    return {"inserted": len(unique) - len(updated), "updated": len(updated), "scans": len(scans)}
+
+
+def import_records(db: Session, records: Iterable[tuple], chunk_size: int = None, method: str = "insert",
+                   scan_root: Optional[str] = None, analyze: bool = False) -> Iterator[dict]:
+    """
+    Import (line_number, dict) records chunk by chunk.
+    Yields a progress dict after every chunk and a final one with "done": True.
+    """
+    chunk_size = chunk_size or IMPORT_CONFIG['chunk_size']
+    started = time.perf_counter()
+    progress = {"processed": 0, "inserted": 0, "updated": 0, "scans": 0, "failed": 0, "errors": []}
+
+    def flush(patients, scans):
+        try:
+            counts = import_chunk(db, patients, scans, method, analyze)
+            for key, value in counts.items():
+                progress[key] += value
+        except Exception as e:
+            db.rollback()
+            progress["failed"] += len(patients)
+            if len(progress["errors"]) < MAX_ERRORS_REPORTED:
+                progress["errors"].append({"chunk_end": progress["processed"], "error": str(e)[:500]})
+        progress["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+        progress["rows_per_second"] = round(progress["processed"] / max(progress["elapsed_seconds"], 1e-6))
+        return dict(progress, errors=list(progress["errors"]))
+
+    patients, scans = [], []
+    for line_no, record in records:
+        progress["processed"] += 1
+        try:
+            patient, scan = normalize_record(record, scan_root)
+        except Exception as e:
+            progress["failed"] += 1
+            if len(progress["errors"]) < MAX_ERRORS_REPORTED:
+                progress["errors"].append({"line": line_no, "error": str(e)})
+            continue
+        patients.append(patient)
+        if scan:
+            scans.append(scan)
+        if len(patients) >= chunk_size:
+            yield flush(patients, scans)
+            patients, scans = [], []
+
+    if patients:
+        yield flush(patients, scans)
+    final = dict(progress, errors=list(progress["errors"]), done=True)
+    final["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    yield final
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import patients (and optional scans) from CSV/JSONL")
+    parser.add_argument("path", help="CSV or JSONL file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="Default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CONFIG['chunk_size'])
+    parser.add_argument("--method", choices=["insert", "copy"], default="insert",
+                        help="copy uses PostgreSQL COPY into a temp table")
+    parser.add_argument("--scan-root", default=None, help="Directory scan_file paths are relative to "
+                                                           "(default: the input file's directory)")
+    parser.add_argument("--analyze", action="store_true", help="Queue AI analysis for imported local scans")
+    args = parser.parse_args()
+
+    from backend.database import get_db_session
+    from backend.migrate import upgrade_database
+
+    upgrade_database()
+    fmt = args.format or detect_format(args.path)
+    scan_root = args.scan_root or os.path.dirname(os.path.abspath(args.path))
+
+    db = get_db_session()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            for progress in import_records(db, read_records(stream, fmt), args.chunk_size,
+                                           args.method, scan_root, args.analyze):
+                print(f"{progress['processed']:>8} rows  +{progress['inserted']} new  "
+                      f"~{progress['updated']} updated  {progress['scans']} scans  {progress['failed']} failed  "
+                      f"({progress['elapsed_seconds']}s)")
+        print(f"✅ Import finished in {progress['elapsed_seconds']}s")
+        for error in progress["errors"]:
+            print(f"❌ {error}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,8 +25,15 @@ import io
 import tempfile
 import pandas as pd
 import re
+import sys
+from pathlib import Path
 import fitz  # PyMuPDF
 
+# Make the repo root importable so the Streamlit app shares the agent CAM implementation
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from agent_graph.tools.cam_tools import GradCAM
+from agent_graph.tools.model_tools import ClipTextEmbeddingCache
+
 # Add these anatomical region definitions
 ANATOMICAL_REGIONS = {
     'upper_left_lung': {'coords': (0, 0, 0.45, 0.6), 'label': 'Upper Left Lung'},
@@ -278,6 +285,13 @@ def load_clip_model():
         st.info("Please ensure you have a stable internet connection.")
         st.stop()
 
+@st.cache_resource
+def load_clip_text_cache():
+    """
+    Shared cache of normalized text features for custom label sets (persisted to disk).
+    """
+    return ClipTextEmbeddingCache()
+
 # ChexNet class definitions and labels
 CHEXNET_LABELS = [
     'Atelectasis', 'Cardiomegaly', 'Effusion', 'Infiltration', 'Mass', 
@@ -299,55 +313,6 @@ class ChexNet(nn.Module):
     def forward(self, x):
         return self.densenet121(x)
 
-class GradCAM:
-    """Gradient-weighted Class Activation Mapping for model interpretability"""
-    def __init__(self, model, target_layer):
-        self.model = model
-        self.target_layer = target_layer
-        self.gradients = None
-        self.activations = None
-        
-        # Register hooks
-        self.target_layer.register_forward_hook(self.save_activation)
-        self.target_layer.register_backward_hook(self.save_gradient)
-        
-    def save_activation(self, module, input, output):
-        self.activations = output.detach()  # Detach here to avoid gradient tracking
-        
-    def save_gradient(self, module, grad_input, grad_output):
-        self.gradients = grad_output[0].detach()  # Detach here too
-        
-    def generate_cam(self, input_image, class_idx):
-        # Clear previous gradients
-        self.model.zero_grad()
-        
-        # Forward pass
-        output = self.model(input_image)
-
-        # Backward pass
-        output[0, class_idx].backward(retain_graph=True)
-
-        # Generate CAM
-        gradients = self.gradients[0]
-        activations = self.activations[0]
-
-        # Compute weights by global average pooling of gradients
-        weights = torch.mean(gradients, dim=[1, 2])
-        
-        # Initialize CAM
-        cam = torch.zeros(activations.shape[1:], dtype=torch.float32, device=activations.device)
-
-        # Compute weighted combination of activation maps
-        for i, w in enumerate(weights):
-            cam += w * activations[i]
-
-        # Apply ReLU and normalize
-        cam = torch.relu(cam)
-        if torch.max(cam) > 0:  # Avoid division by zero
-            cam = cam / torch.max(cam)
-
-        return cam.cpu().numpy()  # Now safe to convert to numpy
-
 @st.cache_resource
 def load_chexnet_model():
     """
@@ -402,13 +367,13 @@ def predict_pathologies(image, chexnet_model, threshold=0.5):
 def generate_segmentation_map(image, chexnet_model, grad_cam, top_predictions, original_size):
     try:
         image_tensor = preprocess_image_for_chexnet(image)
+        detected = [pathology for pathology, data in top_predictions.items() if data['detected']]
+        # One forward pass for all detected pathologies
+        cams = grad_cam.generate_cams(image_tensor, [CHEXNET_LABELS.index(p) for p in detected])
         segmentation_maps = {}
-        for pathology, data in top_predictions.items():
-            if data['detected']:
-                class_idx = CHEXNET_LABELS.index(pathology)
-                cam = grad_cam.generate_cam(image_tensor, class_idx)
-                cam_resized = cv2.resize(cam, original_size)
-                segmentation_maps[pathology] = cam_resized
+        for pathology in detected:
+            cam = cams[CHEXNET_LABELS.index(pathology)]
+            segmentation_maps[pathology] = cv2.resize(cam, original_size)
         return segmentation_maps
     except Exception as e:
         st.error(f"Error generating segmentation maps: {e}")
@@ -486,13 +451,13 @@ def generate_report(image, processor, model, tokenizer, candidate_labels):
         return "Error: Please upload an image and provide at least one descriptive label.", ""
 
     try:
-        template = 'this is a photo of '
-        texts = tokenizer([template + label for label in candidate_labels], context_length=256).to(device)
+        # Text features for this label set come from the cache; only the image tower runs per request
+        text_features = load_clip_text_cache().get(model, tokenizer, candidate_labels)
 
         with torch.no_grad():
             image_processed = processor(image).unsqueeze(0).to(device)
-            image_features, text_features, logit_scale = model(image_processed, texts)
-            logits = (logit_scale * image_features @ text_features.t()).detach().softmax(dim=-1)
+            image_features = model.encode_image(image_processed, normalize=True)
+            logits = (model.logit_scale.exp() * image_features @ text_features.t()).softmax(dim=-1)
 
         probs = logits.cpu().numpy()
         scores = {label: prob for label, prob in zip(candidate_labels, probs[0])}
@@ -0,0 +1,68 @@
+"""
+Server-sent events for POST /api/chat/stream: LLM tokens are forwarded as the
+OpenAI-compatible server emits them, and the upstream request is closed as soon
+as the browser goes away so LM Studio stops generating. Repeat questions are
+answered from the report answer cache without calling the LLM.
+"""
+import json
+import time
+from typing import Optional
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+
+from agent_graph.tools.llm_tools import stream_text_answer, LLM_UNAVAILABLE_MESSAGE, MISSING_INPUT_MESSAGE
+from agent_graph.response_cache import ReportAnswerCache
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
+
+async def answer_events(context: str, question: str, request, label: str = "chat", report_id=None):
+    """
+    {"token": ...} per generated chunk, then a "done" event with time to first
+    token and total time, or an "error" event. request is the Starlette Request,
+    polled for client disconnects between chunks.
+    With a report_id, answers are served from and stored in the ReportAnswerCache.
+    """
+    started = time.perf_counter()
+    if report_id is not None:
+        # Off the event loop: the semantic tier embeds the question
+        cached = await run_in_threadpool(ReportAnswerCache().get, report_id, context, question)
+        if cached is not None:
+            yield sse_event({"token": cached})
+            total_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield sse_event({"ttft_ms": total_ms, "total_ms": total_ms, "chunks": 1, "cached": True}, event="done")
+            return
+
+    first_token_ms = None
+    chunks = 0
+    parts = []
+    answer = stream_text_answer(context, question)
+    try:
+        async for token in answer:
+            if await request.is_disconnected():
+                print(f"{label}: client disconnected after {chunks} chunks, generation cancelled")
+                return
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+            chunks += 1
+            parts.append(token)
+            yield sse_event({"token": token})
+    except Exception as e:
+        print(f"{label}: stream error: {e}")
+        yield sse_event({"message": LLM_UNAVAILABLE_MESSAGE}, event="error")
+        return
+    finally:
+        # Shielded: when the response task is cancelled on disconnect, the upstream
+        # request must still be closed rather than left generating
+        with anyio.CancelScope(shield=True):
+            await answer.aclose()
+
+    total_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"{label}: first token {first_token_ms} ms, {chunks} chunks in {total_ms} ms")
+    # Only complete answers are cached
+    if report_id is not None and parts and "".join(parts) != MISSING_INPUT_MESSAGE:
+        await run_in_threadpool(ReportAnswerCache().set, report_id, context, question, "".join(parts))
+    yield sse_event({"ttft_ms": first_token_ms, "total_ms": total_ms, "chunks": chunks, "cached": False}, event="done")
@@ -0,0 +1,76 @@
+"""
+Maintains patients.context_version, the stamp the pipeline's patient context
+cache (agent_graph/patient_cache.py) validates its entries against.
+ORM writes that change what PipelineData loads (demographics, scans, report
+impressions) are collected per flush and the affected patients are bumped with
+one UPDATE just before the transaction commits; bulk Core statements call
+bump_context_version themselves. Importing this module registers the hooks.
+"""
+from itertools import chain
+
+from sqlalchemy import update, select, event, inspect, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from backend.models import Patient, Scan, Report
+
+PENDING_KEY = "context_version_pending"
+
+# Attributes whose changes alter the cached patient context
+TRACKED_CHANGES = {
+    Patient: ("mrn", "name", "age", "gender"),
+    Scan: ("patient_id", "scan_date"),
+    Report: ("scan_id", "impression"),
+}
+
+
+def bump_context_version(bind, patient_ids=(), scan_ids=()):
+    """Increment the version of the given patients and of the owners of scan_ids (collections or selects)."""
+    connection = bind.connection() if isinstance(bind, Session) else bind
+    conditions = []
+    if isinstance(patient_ids, Select) or patient_ids:
+        conditions.append(Patient.id.in_(patient_ids if isinstance(patient_ids, Select) else list(patient_ids)))
+    if isinstance(scan_ids, Select) or scan_ids:
+        scans = scan_ids if isinstance(scan_ids, Select) else list(scan_ids)
+        conditions.append(Patient.id.in_(select(Scan.patient_id).where(Scan.id.in_(scans))))
+    if conditions:
+        connection.execute(update(Patient).where(or_(*conditions))
+                           .values(context_version=Patient.context_version + 1))
+
+
+def _old_and_new(obj, name) -> set:
+    history = inspect(obj).attrs[name].history
+    return {getattr(obj, name), *history.deleted}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_after_flush(session, flush_context):
+    patient_ids, scan_ids = session.info.setdefault(PENDING_KEY, (set(), set()))
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tracked = TRACKED_CHANGES.get(type(obj))
+        if tracked is None:
+            continue
+        if obj in session.dirty and not any(inspect(obj).attrs[name].history.has_changes() for name in tracked):
+            continue
+        if isinstance(obj, Patient):
+            patient_ids.add(obj.id)
+        elif isinstance(obj, Scan):
+            patient_ids.update(_old_and_new(obj, "patient_id"))
+        else:
+            scan_ids.update(_old_and_new(obj, "scan_id"))
+    patient_ids.discard(None)
+    scan_ids.discard(None)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_before_commit(session):
+    # Flush now so the commit's own flush has nothing left to collect
+    session.flush()
+    patient_ids, scan_ids = session.info.pop(PENDING_KEY, (set(), set()))
+    if patient_ids or scan_ids:
+        bump_context_version(session.connection(), patient_ids, scan_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
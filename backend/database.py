@@ -6,8 +6,9 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Generator, AsyncGenerator
 
 # Load environment variables from parent directory
 env_path = Path(__file__).resolve().parent.parent / ".env"
@@ -58,6 +59,68 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+# ========================================
+# Async engine (asyncpg for PostgreSQL, aiosqlite for SQLite)
+# ========================================
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str):
+    """
+    Derive the async driver URL from DATABASE_URL (override with ASYNC_DATABASE_URL).
+    asyncpg does not understand ?sslmode=, so it is moved into connect_args.
+    """
+    url = make_url(url)
+    connect_args = {}
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    if url.drivername == "postgresql+asyncpg" and "sslmode" in url.query:
+        if url.query["sslmode"] in ("require", "verify-ca", "verify-full"):
+            connect_args["ssl"] = "require"
+        url = url.difference_update_query(["sslmode"])
+    return url, connect_args
+
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """
+    Lazily create the async engine so the async driver stays an optional
+    dependency for scripts that only use the sync session.
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url, connect_args = async_database_url(os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL)
+        options = {"echo": False, "pool_pre_ping": True, "connect_args": connect_args}
+        if not url.drivername.startswith("sqlite"):
+            options.update(pool_size=10, max_overflow=20)
+        _async_engine = create_async_engine(url, **options)
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db() -> AsyncGenerator:
+    """
+    Async counterpart of get_db for FastAPI endpoints
+
+    Usage:
+        @app.get("/patients")
+        async def get_patients(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(Patient))
+    """
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
 def get_db_session() -> Session:
     """
     Direct session creation for scripts and CLI tools
@@ -5,29 +5,13 @@ Uses SQLAlchemy and the existing database session
 import os
 from dotenv import load_dotenv
 from database import get_db, engine
-from models import Patient, Scan, Report, Base
-from sqlalchemy import text, Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from models import Patient, Scan, Report, WhatsAppChat, Base
+from sqlalchemy import text
 from datetime import datetime
 
 load_dotenv()
 
 
-class WhatsAppChat(Base):
-    """WhatsApp chat history table"""
-    __tablename__ = "whatsapp_chats"
-    
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    phone_number = Column(String(20))
-    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"))
-    message_from = Column(String(10))  # 'patient' or 'ai'
-    message_text = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    
-    def __repr__(self):
-        return f"<WhatsAppChat(id={self.id}, from={self.message_from})>"
-
-
 def init_whatsapp_tables():
     """Create WhatsApp-specific tables in PostgreSQL."""
     try:
@@ -47,8 +31,13 @@ def init_whatsapp_tables():
                 """))
                 conn.commit()
                 print("✅ Added phone_number column to patients table")
-        
-        # Create whatsapp_chats table
+
+        # Phone lookups (get_patient_by_phone)
+        for index in Patient.__table__.indexes:
+            if index.name == "ix_patients_phone_number":
+                index.create(bind=engine, checkfirst=True)
+
+        # Create whatsapp_chats table (with its phone/time index)
         Base.metadata.create_all(engine, tables=[WhatsAppChat.__table__])
         print("✅ WhatsApp chat history table ready")
         
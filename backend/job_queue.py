@@ -0,0 +1,267 @@
+"""
+Durable scan-analysis job queue backed by the analysis_jobs table
+Producers (upload endpoint) enqueue; inference worker processes claim jobs,
+report per-node progress, and failed attempts are retried with backoff.
+Worker processes also keep a heartbeat row in inference_workers, which the
+API's readiness check reads.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Optional, List
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from backend.database import engine
+from backend.models import Base, AnalysisJob, InferenceWorker
+# Importing the module also keeps patient_worklist in step with ORM writes
+from backend.worklist import refresh_worklist
+# ... and patients.context_version, which cached patient context is validated against
+import backend.context_version
+
+JOB_CONFIG = {
+    'max_attempts': int(os.getenv('JOB_MAX_ATTEMPTS', '3')),
+    'backoff_base_seconds': float(os.getenv('JOB_BACKOFF_BASE_SECONDS', '10')),
+    'backoff_max_seconds': float(os.getenv('JOB_BACKOFF_MAX_SECONDS', '600')),
+    # Running jobs without a heartbeat for this long belong to a dead worker
+    'lease_seconds': float(os.getenv('JOB_LEASE_SECONDS', '900')),
+    # Workers refresh their inference_workers row this often; a row older than
+    # worker_stale_seconds no longer counts towards readiness
+    'worker_heartbeat_seconds': float(os.getenv('WORKER_HEARTBEAT_SECONDS', '10')),
+    'worker_stale_seconds': float(os.getenv('WORKER_STALE_SECONDS', '30')),
+}
+
+JOB_STATES = ("queued", "running", "done", "failed")
+
+
+def init_job_tables():
+    """Create the analysis_jobs and inference_workers tables if they do not exist yet."""
+    Base.metadata.create_all(engine, tables=[AnalysisJob.__table__, InferenceWorker.__table__])
+
+
+def enqueue_analysis(db: Session, scan_id: int, file_path: str, patient_mrn: str) -> AnalysisJob:
+    """Add a queued analysis job for a scan and commit it."""
+    job = AnalysisJob(
+        scan_id=scan_id,
+        file_path=file_path,
+        patient_mrn=patient_mrn,
+        status="queued",
+        attempts=0,
+        max_attempts=JOB_CONFIG['max_attempts'],
+        stage_timings={}
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def queue_depth(db: Session) -> int:
+    """Number of jobs waiting for a worker (including ones backing off)."""
+    return db.query(AnalysisJob).filter(AnalysisJob.status == "queued").count()
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter for the given number of failed attempts."""
+    ceiling = min(JOB_CONFIG['backoff_max_seconds'],
+                  JOB_CONFIG['backoff_base_seconds'] * (2 ** max(0, attempts - 1)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def claim_next_job(db: Session, worker_name: str) -> Optional[AnalysisJob]:
+    """
+    Atomically move the oldest claimable queued job to running and return it.
+    Uses SKIP LOCKED on PostgreSQL so concurrent workers never block each other;
+    the conditional UPDATE keeps the claim safe on databases without row locks.
+    """
+    now = datetime.utcnow()
+    candidate = db.query(AnalysisJob.id, AnalysisJob.scan_id).filter(
+        AnalysisJob.status == "queued",
+        or_(AnalysisJob.next_attempt_at.is_(None), AnalysisJob.next_attempt_at <= now)
+    ).order_by(AnalysisJob.id).with_for_update(skip_locked=True).first()
+
+    if candidate is None:
+        db.rollback()
+        return None
+
+    claimed = db.query(AnalysisJob).filter(
+        AnalysisJob.id == candidate.id,
+        AnalysisJob.status == "queued"
+    ).update({
+        AnalysisJob.status: "running",
+        AnalysisJob.worker: worker_name,
+        AnalysisJob.attempts: AnalysisJob.attempts + 1,
+        AnalysisJob.current_stage: None,
+        AnalysisJob.stage_timings: {},
+        AnalysisJob.started_at: now,
+        AnalysisJob.heartbeat_at: now,
+        AnalysisJob.finished_at: None
+    }, synchronize_session=False)
+    if claimed:
+        refresh_worklist(db, scan_ids=[candidate.scan_id])
+    db.commit()
+
+    if not claimed:
+        return None
+    return db.get(AnalysisJob, candidate.id)
+
+
+def record_stage(db: Session, job: AnalysisJob, stage: str, seconds: float):
+    """Store progress after an agent node finishes; doubles as the worker heartbeat."""
+    timings = dict(job.stage_timings or {})
+    timings[stage] = round(seconds, 3)
+    job.stage_timings = timings
+    job.current_stage = stage
+    job.heartbeat_at = datetime.utcnow()
+    db.commit()
+
+
+def complete_job(db: Session, job: AnalysisJob):
+    job.status = "done"
+    job.error = None
+    job.next_attempt_at = None
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def fail_job(db: Session, job: AnalysisJob, error: str):
+    """Re-queue with backoff while attempts remain, otherwise mark the job failed."""
+    job.error = error[:5000]
+    job.finished_at = datetime.utcnow()
+    if job.attempts < job.max_attempts:
+        job.status = "queued"
+        job.next_attempt_at = job.finished_at + timedelta(seconds=retry_delay(job.attempts))
+    else:
+        job.status = "failed"
+        job.next_attempt_at = None
+    db.commit()
+
+
+def requeue_stale_jobs(db: Session) -> int:
+    """Treat running jobs whose worker stopped heartbeating as a failed attempt."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_CONFIG['lease_seconds'])
+    stale = db.query(AnalysisJob).filter(
+        AnalysisJob.status == "running",
+        AnalysisJob.heartbeat_at < cutoff
+    ).with_for_update(skip_locked=True).all()
+    for job in stale:
+        fail_job(db, job, f"Worker {job.worker} stopped responding during '{job.current_stage or 'startup'}'")
+    db.commit()
+    return len(stale)
+
+
+def worker_heartbeat(db: Session, worker_name: str, status: Optional[str] = None, error: Optional[str] = None):
+    """Create or refresh a worker's inference_workers row; status=None keeps the current one."""
+    now = datetime.utcnow()
+    worker = db.get(InferenceWorker, worker_name)
+    if worker is None:
+        worker = InferenceWorker(name=worker_name, status=status or "loading", started_at=now)
+        db.add(worker)
+    elif status:
+        worker.status = status
+    if status == "ready":
+        worker.ready_at = now
+    if error is not None:
+        worker.error = error[:5000]
+    worker.heartbeat_at = now
+    db.commit()
+
+
+def prune_workers(db: Session, older_than_seconds: float = 24 * 3600) -> int:
+    """Drop rows of worker processes that stopped heartbeating long ago."""
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than_seconds)
+    count = db.query(InferenceWorker).filter(InferenceWorker.heartbeat_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+def worker_status(db: Session) -> dict:
+    """Live workers (fresh heartbeat) by status, for readiness and /api/health."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_CONFIG['worker_stale_seconds'])
+    live = db.query(InferenceWorker).filter(InferenceWorker.heartbeat_at >= cutoff).all()
+    counts = {state: 0 for state in ("loading", "ready", "failed")}
+    for worker in live:
+        counts[worker.status] = counts.get(worker.status, 0) + 1
+    return {
+        "ready": counts["ready"],
+        "loading": counts["loading"],
+        "failed": counts["failed"],
+        "errors": {worker.name: worker.error for worker in live if worker.status == "failed"},
+    }
+
+
+def redrive_failed_jobs(db: Session, job_ids: Optional[List[int]] = None) -> int:
+    """Put failed jobs back on the queue with a fresh attempt budget."""
+    query = db.query(AnalysisJob).filter(AnalysisJob.status == "failed")
+    if job_ids is not None:
+        query = query.filter(AnalysisJob.id.in_(job_ids))
+    scan_ids = [scan_id for (scan_id,) in query.with_entities(AnalysisJob.scan_id).all()]
+    count = query.update({
+        AnalysisJob.status: "queued",
+        AnalysisJob.attempts: 0,
+        AnalysisJob.next_attempt_at: None,
+        AnalysisJob.error: None
+    }, synchronize_session=False)
+    refresh_worklist(db, scan_ids=scan_ids)
+    db.commit()
+    return count
+
+
+def latest_job_for_scan(db: Session, scan_id: int) -> Optional[AnalysisJob]:
+    return db.query(AnalysisJob).filter(
+        AnalysisJob.scan_id == scan_id
+    ).order_by(AnalysisJob.id.desc()).first()
+
+
+def job_to_dict(job: AnalysisJob) -> dict:
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "job_id": job.id,
+        "scan_id": job.scan_id,
+        "status": job.status,
+        "current_stage": job.current_stage,
+        "stage_timings": job.stage_timings or {},
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "worker": job.worker,
+        "error": job.error,
+        "queued_at": iso(job.created_at),
+        "started_at": iso(job.started_at),
+        "finished_at": iso(job.finished_at),
+        "next_attempt_at": iso(job.next_attempt_at)
+    }
+
+
+def queue_stats(db: Session, sample_size: int = 200) -> dict:
+    """Queue depth per state plus per-stage latency over the most recent finished jobs."""
+    counts = dict(db.query(AnalysisJob.status, func.count(AnalysisJob.id)).group_by(AnalysisJob.status).all())
+
+    recent = db.query(AnalysisJob.stage_timings, AnalysisJob.started_at, AnalysisJob.finished_at).filter(
+        AnalysisJob.status == "done"
+    ).order_by(AnalysisJob.id.desc()).limit(sample_size).all()
+
+    per_stage = {}
+    totals = []
+    for timings, started_at, finished_at in recent:
+        for stage, seconds in (timings or {}).items():
+            per_stage.setdefault(stage, []).append(seconds)
+        if started_at and finished_at:
+            totals.append((finished_at - started_at).total_seconds())
+
+    def summarize(values):
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "mean": round(sum(values) / len(values), 3),
+            "p50": round(values[len(values) // 2], 3),
+            "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3)
+        }
+
+    return {
+        "depth": counts.get("queued", 0),
+        "states": {state: counts.get(state, 0) for state in JOB_STATES},
+        "stage_latency_seconds": {stage: summarize(values) for stage, values in per_stage.items()},
+        "job_latency_seconds": summarize(totals) if totals else None
+    }
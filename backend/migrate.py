@@ -0,0 +1,45 @@
+"""
+Apply the Alembic migrations in backend/migrations.
+
+Usage:
+    python -m backend.migrate              # upgrade DATABASE_URL to head
+    python -m backend.migrate --revision 0001
+    alembic upgrade head                   # equivalent, from the repo root
+"""
+import argparse
+from pathlib import Path
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+ALEMBIC_INI = MIGRATIONS_DIR.parent.parent / "alembic.ini"
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    # Independent of the working directory
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    if connection is not None:
+        config.attributes["connection"] = connection
+        config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(bind=None, revision: str = "head"):
+    """Upgrade the schema of bind (an Engine; default backend.database.engine) to revision."""
+    from alembic import command
+
+    if bind is None:
+        from backend.database import engine as bind
+    # A plain connection: migrations manage their own transactions (and autocommit blocks)
+    with bind.connect() as connection:
+        command.upgrade(alembic_config(connection), revision)
+        connection.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--revision", default="head")
+    args = parser.parse_args()
+    upgrade_database(revision=args.revision)
+    print(f"✅ Database upgraded to {args.revision}")
@@ -0,0 +1,55 @@
+"""
+Alembic environment for the radiology schema.
+Connects through backend.database (DATABASE_URL) unless a connection is passed
+in config.attributes["connection"] (see backend/migrate.py) or sqlalchemy.url is set.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from backend.models import Base
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Emit the SQL instead of running it (alembic upgrade head --sql)."""
+    url = config.get_main_option("sqlalchemy.url")
+    if not url:
+        from backend.database import DATABASE_URL as url
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_with_connection(connection):
+    # One transaction per revision, so an autocommit block only commits its own revision's work
+    context.configure(connection=connection, target_metadata=target_metadata,
+                      transaction_per_migration=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_with_connection(connection)
+        return
+    url = config.get_main_option("sqlalchemy.url")
+    if url:
+        engine = create_engine(url)
+    else:
+        from backend.database import engine
+    with engine.connect() as connection:
+        run_with_connection(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
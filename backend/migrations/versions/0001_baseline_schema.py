@@ -0,0 +1,111 @@
+"""Baseline radiology schema
+
+Databases created earlier with Base.metadata.create_all already have these
+tables; each one is only created when missing, so they can be upgraded in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "patients" not in existing:
+        op.create_table(
+            "patients",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("mrn", sa.String(50), nullable=False, comment="Medical Record Number"),
+            sa.Column("name", sa.String(200), nullable=False),
+            sa.Column("age", sa.Integer(), nullable=False),
+            sa.Column("gender", sa.String(20), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_patients_mrn", "patients", ["mrn"], unique=True)
+
+    if "scans" not in existing:
+        op.create_table(
+            "scans",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("file_url", sa.String(500), nullable=False),
+            sa.Column("body_part", sa.String(100), nullable=False),
+            sa.Column("view_position", sa.String(50), nullable=False),
+            sa.Column("modality", sa.String(10), nullable=False),
+            sa.Column("scan_date", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_scans_patient_id", "scans", ["patient_id"])
+
+    if "patient_documents" not in existing:
+        op.create_table(
+            "patient_documents",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("document_name", sa.String(200), nullable=False),
+            sa.Column("document_type", sa.String(50), nullable=False),
+            sa.Column("file_url", sa.String(500), nullable=False),
+            sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_patient_documents_patient_id", "patient_documents", ["patient_id"])
+
+    if "reports" not in existing:
+        op.create_table(
+            "reports",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("scan_id", sa.Integer(), sa.ForeignKey("scans.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("radiologist_name", sa.String(200), nullable=False),
+            sa.Column("full_text", sa.Text(), nullable=False),
+            sa.Column("impression", sa.Text(), nullable=False),
+            sa.Column("patient_history", sa.Text(), nullable=True),
+            sa.Column("comparison_findings", sa.Text(), nullable=True),
+            sa.Column("ner_tags", sa.JSON(), nullable=True),
+            sa.Column("pdf_url", sa.String(500), nullable=True),
+            sa.Column("status", sa.String(50), nullable=False),
+        )
+        op.create_index("ix_reports_scan_id", "reports", ["scan_id"])
+
+    if "analysis_jobs" not in existing:
+        op.create_table(
+            "analysis_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("scan_id", sa.Integer(), sa.ForeignKey("scans.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("file_path", sa.String(500), nullable=False),
+            sa.Column("patient_mrn", sa.String(50), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("current_stage", sa.String(50), nullable=True),
+            sa.Column("stage_timings", sa.JSON(), nullable=True),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("max_attempts", sa.Integer(), nullable=False),
+            sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+            sa.Column("worker", sa.String(100), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_analysis_jobs_scan_id", "analysis_jobs", ["scan_id"])
+
+    if "whatsapp_chats" not in existing:
+        op.create_table(
+            "whatsapp_chats",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("phone_number", sa.String(20), nullable=True),
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id", ondelete="CASCADE"), nullable=True),
+            sa.Column("message_from", sa.String(10), nullable=True),
+            sa.Column("message_text", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade():
+    for table in ("whatsapp_chats", "analysis_jobs", "reports", "patient_documents", "scans", "patients"):
+        op.drop_table(table)
@@ -0,0 +1,66 @@
+"""Composite indexes for the hot read paths
+
+- scans(scan_date, id), reports(status, id): keyset pages sorted by date / filtered by status
+- scans(patient_id, id), reports(scan_id, id): newest scan and report per patient
+- scans(patient_id, scan_date): a patient's latest scan and report history
+- analysis_jobs(status, id): job claiming and queue depth
+- patients(phone_number): WhatsApp patient lookup (the column itself was added ad hoc)
+- whatsapp_chats(phone_number, created_at): recent chat history for a number
+
+On PostgreSQL the indexes are built CONCURRENTLY so live tables are not locked.
+Indexes that already exist (e.g. created by create_all) are skipped.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_scans_scan_date_id", "scans", ["scan_date", "id"]),
+    ("ix_scans_patient_id_id", "scans", ["patient_id", "id"]),
+    ("ix_scans_patient_id_scan_date", "scans", ["patient_id", "scan_date"]),
+    ("ix_reports_scan_id_id", "reports", ["scan_id", "id"]),
+    ("ix_reports_status_id", "reports", ["status", "id"]),
+    ("ix_analysis_jobs_status_id", "analysis_jobs", ["status", "id"]),
+    ("ix_patients_phone_number", "patients", ["phone_number"]),
+    ("ix_whatsapp_chats_phone_number_created_at", "whatsapp_chats", ["phone_number", "created_at"]),
+]
+
+
+def existing_indexes(bind) -> set:
+    inspector = sa.inspect(bind)
+    return {(table, index["name"]) for table in {table for _, table, _ in INDEXES}
+            for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("patients")}
+    if "phone_number" not in columns:
+        op.add_column("patients", sa.Column("phone_number", sa.String(20), nullable=True))
+
+    existing = existing_indexes(bind)
+    missing = [index for index in INDEXES if (index[1], index[0]) not in existing]
+    if bind.dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in missing:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in missing:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    bind = op.get_bind()
+    existing = existing_indexes(bind)
+    for name, table, _ in reversed(INDEXES):
+        if (table, name) in existing:
+            op.drop_index(name, table_name=table)
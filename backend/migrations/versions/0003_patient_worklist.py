@@ -0,0 +1,47 @@
+"""Denormalized patient worklist
+
+patient_worklist holds one dashboard row per patient (latest scan, latest
+report, job state, scan status, last activity) so GET /api/patients is a
+single indexed range scan. Rows are filled here from the source tables and
+kept current by backend/worklist.py; python -m backend.worklist --rebuild
+recomputes them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("patient_worklist"):
+        op.create_table(
+            "patient_worklist",
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id", ondelete="CASCADE"),
+                      primary_key=True, autoincrement=False),
+            sa.Column("mrn", sa.String(50), nullable=False),
+            sa.Column("name", sa.String(200), nullable=False),
+            sa.Column("age", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("latest_scan_id", sa.Integer(), nullable=True),
+            sa.Column("latest_report_id", sa.Integer(), nullable=True),
+            sa.Column("job_status", sa.String(20), nullable=True),
+            sa.Column("scan_status", sa.String(20), nullable=False),
+            sa.Column("last_activity_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_patient_worklist_mrn", "patient_worklist", ["mrn"])
+        op.create_index("ix_patient_worklist_scan_status_patient_id", "patient_worklist",
+                        ["scan_status", "patient_id"])
+
+    from backend.worklist import rebuild_worklist
+    rebuild_worklist(op.get_bind())
+
+
+def downgrade():
+    op.drop_table("patient_worklist")
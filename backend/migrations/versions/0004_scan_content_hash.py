@@ -0,0 +1,38 @@
+"""Content hash on scans for upload deduplication
+
+scans.content_sha256 holds the SHA-256 of the uploaded file; the unique
+(patient_id, content_sha256) index makes a re-upload of the same film for a
+patient resolve to the existing scan. Older scans keep a NULL hash.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "content_sha256" not in {column["name"] for column in inspector.get_columns("scans")}:
+        op.add_column("scans", sa.Column("content_sha256", sa.String(64), nullable=True))
+    if "uq_scans_patient_id_content_sha256" in {index["name"] for index in inspector.get_indexes("scans")}:
+        return
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index("uq_scans_patient_id_content_sha256", "scans", ["patient_id", "content_sha256"],
+                            unique=True, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index("uq_scans_patient_id_content_sha256", "scans", ["patient_id", "content_sha256"],
+                        unique=True)
+
+
+def downgrade():
+    op.drop_index("uq_scans_patient_id_content_sha256", table_name="scans")
+    op.drop_column("scans", "content_sha256")
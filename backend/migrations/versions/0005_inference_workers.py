@@ -0,0 +1,36 @@
+"""Heartbeat table for inference worker processes
+
+inference_workers holds one row per worker process: loading while its models
+load, ready once warmed up, failed if loading raised. Workers refresh
+heartbeat_at periodically; GET /api/health/ready reports ready only while at
+least one ready worker has a fresh heartbeat.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("inference_workers"):
+        return
+    op.create_table(
+        "inference_workers",
+        sa.Column("name", sa.String(100), primary_key=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("ready_at", sa.DateTime(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("inference_workers")
@@ -0,0 +1,28 @@
+"""Version stamp on patients for the pipeline's patient context cache
+
+patients.context_version is bumped on every write that changes a patient's
+demographics or report history (backend/context_version.py). Cached patient
+context records the version it was built from and is discarded once the row
+has moved on, so caches in other processes never serve stale history.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "context_version" in {column["name"] for column in sa.inspect(op.get_bind()).get_columns("patients")}:
+        return
+    op.add_column("patients", sa.Column("context_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    op.drop_column("patients", "context_version")
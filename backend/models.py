@@ -4,7 +4,7 @@ Supports vector embeddings via pgvector extension
 """
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 # from pgvector.sqlalchemy import Vector
 
@@ -24,7 +24,12 @@ class Patient(Base):
     name: Mapped[str] = mapped_column(String(200), nullable=False)
     age: Mapped[int] = mapped_column(Integer, nullable=False)
     gender: Mapped[str] = mapped_column(String(20), nullable=False)
+    phone_number: Mapped[Optional[str]] = mapped_column(String(20), nullable=True, index=True,
+                                                         comment="WhatsApp number used to look the patient up")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    context_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False,
+                                                 comment="Bumped when demographics or report history change "
+                                                         "(backend/context_version.py)")
 
     # Relationships
     scans: Mapped[List["Scan"]] = relationship("Scan", back_populates="patient", cascade="all, delete-orphan")
@@ -37,6 +42,16 @@ class Patient(Base):
 class Scan(Base):
     """Medical imaging scan metadata with Cloudinary URL"""
     __tablename__ = "scans"
+    __table_args__ = (
+        # Newest scan per patient without a sort
+        Index("ix_scans_patient_id_id", "patient_id", "id"),
+        # Keyset pagination by scan date
+        Index("ix_scans_scan_date_id", "scan_date", "id"),
+        # A patient's scans by date (latest scan, pipeline history)
+        Index("ix_scans_patient_id_scan_date", "patient_id", "scan_date"),
+        # Re-uploads of the same film for a patient are deduplicated
+        Index("uq_scans_patient_id_content_sha256", "patient_id", "content_sha256", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     patient_id: Mapped[int] = mapped_column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), 
@@ -50,6 +65,8 @@ class Scan(Base):
     modality: Mapped[str] = mapped_column(String(10), default="DX", nullable=False, 
                                            comment="DX=Digital Radiography")
     scan_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    content_sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True,
+                                                          comment="SHA-256 of the uploaded file")
 
     # Relationships
     patient: Mapped["Patient"] = relationship("Patient", back_populates="scans")
@@ -84,6 +101,10 @@ class PatientDocument(Base):
 class Report(Base):
     """Radiological report with AI-extracted entities and vector embeddings"""
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_scan_id_id", "scan_id", "id"),
+        Index("ix_reports_status_id", "status", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     scan_id: Mapped[int] = mapped_column(Integer, ForeignKey("scans.id", ondelete="CASCADE"), 
@@ -111,3 +132,109 @@ class Report(Base):
 
     def __repr__(self):
         return f"<Report(id={self.id}, scan_id={self.scan_id}, radiologist={self.radiologist_name})>"
+
+
+class AnalysisJob(Base):
+    """Durable queue entry for running the agent pipeline on an uploaded scan"""
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        Index("ix_analysis_jobs_status_id", "status", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    scan_id: Mapped[int] = mapped_column(Integer, ForeignKey("scans.id", ondelete="CASCADE"),
+                                          nullable=False, index=True)
+    file_path: Mapped[str] = mapped_column(String(500), nullable=False,
+                                            comment="Local path of the uploaded image for the worker")
+    patient_mrn: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="queued", nullable=False,
+                                         comment="queued, running, done, failed")
+    current_stage: Mapped[Optional[str]] = mapped_column(String(50), nullable=True,
+                                                          comment="Last agent node that finished")
+    stage_timings: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True,
+                                                           comment="Seconds spent in each agent node")
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3, nullable=False)
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True,
+                                                                 comment="Retry backoff; not claimable before this")
+    worker: Mapped[Optional[str]] = mapped_column(String(100), nullable=True,
+                                                   comment="Worker process that claimed the job")
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True,
+                                                              comment="Refreshed on every stage; stale running jobs are re-queued")
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<AnalysisJob(id={self.id}, scan_id={self.scan_id}, status={self.status})>"
+
+
+class InferenceWorker(Base):
+    """Heartbeat row per inference worker process; API readiness counts the fresh, ready ones"""
+    __tablename__ = "inference_workers"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False,
+                                        comment="loading, ready, failed")
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    ready_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False,
+                                                   comment="Refreshed periodically while the process is alive")
+
+    def __repr__(self):
+        return f"<InferenceWorker(name={self.name}, status={self.status})>"
+
+
+class PatientWorklist(Base):
+    """
+    Denormalized dashboard row per patient: demographics plus its latest scan,
+    report and analysis job state. Maintained by backend/worklist.py on writes.
+    """
+    __tablename__ = "patient_worklist"
+    __table_args__ = (
+        # Status-filtered pages in patient id order
+        Index("ix_patient_worklist_scan_status_patient_id", "scan_status", "patient_id"),
+    )
+
+    patient_id: Mapped[int] = mapped_column(Integer, ForeignKey("patients.id", ondelete="CASCADE"),
+                                             primary_key=True, autoincrement=False)
+    mrn: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    age: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False,
+                                                 comment="Patient creation time")
+    latest_scan_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    latest_report_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True,
+                                                            comment="Report of the newest scan that has one")
+    job_status: Mapped[Optional[str]] = mapped_column(String(20), nullable=True,
+                                                      comment="Latest analysis job of the latest scan")
+    scan_status: Mapped[str] = mapped_column(String(20), nullable=False,
+                                             comment="Ready, Processing, Queued, Failed, None")
+    last_activity_at: Mapped[datetime] = mapped_column(DateTime, nullable=False,
+                                                       comment="Latest scan date, else patient creation")
+
+    def __repr__(self):
+        return f"<PatientWorklist(patient_id={self.patient_id}, status={self.scan_status})>"
+
+
+class WhatsAppChat(Base):
+    """WhatsApp chat history table"""
+    __tablename__ = "whatsapp_chats"
+    __table_args__ = (
+        # Recent history for a phone number
+        Index("ix_whatsapp_chats_phone_number_created_at", "phone_number", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    phone_number: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    patient_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("patients.id", ondelete="CASCADE"),
+                                                       nullable=True)
+    message_from: Mapped[Optional[str]] = mapped_column(String(10), nullable=True,
+                                                         comment="'patient' or 'ai'")
+    message_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<WhatsAppChat(id={self.id}, from={self.message_from})>"
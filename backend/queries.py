@@ -0,0 +1,318 @@
+"""
+Set-based read queries for the dashboard endpoints
+Each listing is a fixed number of SQL statements regardless of row count,
+pages with keyset cursors and only loads the columns the caller asked for.
+"""
+import json
+import base64
+from datetime import datetime
+from typing import Optional, List
+from sqlalchemy import select, func, and_, or_, case
+from sqlalchemy.orm import Session, joinedload, contains_eager, defer
+
+from backend.models import Patient, Scan, Report, AnalysisJob, PatientWorklist
+
+
+# ========================================
+# Cursors, filters and sparse fieldsets
+# ========================================
+
+def encode_cursor(values: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """Returns the cursor dict, or raises ValueError for a malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], available: dict) -> List[str]:
+    """Comma-separated field names -> validated list (all fields when empty)"""
+    if not fields:
+        return list(available)
+    wanted = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in wanted if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return wanted
+
+
+def serialize(items, serializers: dict, wanted: List[str]) -> list:
+    # Only requested fields are touched, so deferred columns are never loaded
+    return [{name: serializers[name](item) for name in wanted} for item in items]
+
+
+def date_range(column, date_from: Optional[datetime], date_to: Optional[datetime]) -> list:
+    conditions = []
+    if date_from:
+        conditions.append(column >= date_from)
+    if date_to:
+        conditions.append(column <= date_to)
+    return conditions
+
+
+def keyset_after(sort_column, id_column, cursor: Optional[dict], descending=True):
+    """Condition selecting rows strictly after the cursor in (sort_column, id) order"""
+    if cursor is None:
+        return None
+    try:
+        last_id = int(cursor["id"])
+        last_value = datetime.fromisoformat(cursor["date"]) if sort_column is not None else None
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if sort_column is None:
+        return id_column < last_id if descending else id_column > last_id
+    if descending:
+        return or_(sort_column < last_value, and_(sort_column == last_value, id_column < last_id))
+    return or_(sort_column > last_value, and_(sort_column == last_value, id_column > last_id))
+
+
+def page(rows: list, limit: Optional[int], cursor_of) -> tuple:
+    """Trim the limit+1 lookahead row and build the next cursor"""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(cursor_of(rows[-1]))
+
+
+# ========================================
+# Patients
+# ========================================
+
+def patient_list_statement(patient_ids=None):
+    """
+    One statement for the patient list: each patient with the report of its
+    newest scan that has one, plus the analysis job state of its newest scan.
+    patient_ids (a select of Patient.id) restricts the per-patient lookups to one page.
+    Source of the patient_worklist rows (backend/worklist.py).
+    """
+    latest_report = select(
+        Scan.patient_id.label("patient_id"),
+        Report.id.label("report_id"),
+        func.row_number().over(
+            partition_by=Scan.patient_id,
+            order_by=(Scan.id.desc(), Report.id)
+        ).label("rn")
+    ).join(Report, Report.scan_id == Scan.id)
+
+    latest_scan = select(
+        Scan.patient_id.label("patient_id"),
+        func.max(Scan.id).label("scan_id"),
+        func.max(Scan.scan_date).label("last_scan_at")
+    ).group_by(Scan.patient_id)
+
+    latest_job = select(
+        AnalysisJob.scan_id.label("scan_id"),
+        AnalysisJob.status.label("status"),
+        func.row_number().over(
+            partition_by=AnalysisJob.scan_id,
+            order_by=AnalysisJob.id.desc()
+        ).label("rn")
+    )
+
+    if patient_ids is not None:
+        latest_report = latest_report.where(Scan.patient_id.in_(patient_ids))
+        latest_scan = latest_scan.where(Scan.patient_id.in_(patient_ids))
+        latest_job = latest_job.join(Scan, Scan.id == AnalysisJob.scan_id).where(Scan.patient_id.in_(patient_ids))
+
+    latest_report = latest_report.subquery("latest_report")
+    latest_scan = latest_scan.subquery("latest_scan")
+    latest_job = latest_job.subquery("latest_job")
+
+    statement = select(
+        Patient.id,
+        Patient.mrn,
+        Patient.name,
+        Patient.age,
+        Patient.created_at,
+        latest_report.c.report_id,
+        latest_scan.c.scan_id,
+        latest_scan.c.last_scan_at,
+        latest_job.c.status.label("job_status")
+    ).outerjoin(
+        latest_report, and_(latest_report.c.patient_id == Patient.id, latest_report.c.rn == 1)
+    ).outerjoin(
+        latest_scan, latest_scan.c.patient_id == Patient.id
+    ).outerjoin(
+        latest_job, and_(latest_job.c.scan_id == latest_scan.c.scan_id, latest_job.c.rn == 1)
+    ).order_by(Patient.id)
+
+    if patient_ids is not None:
+        statement = statement.where(Patient.id.in_(patient_ids))
+    return statement
+
+
+SCAN_STATUSES = ("Ready", "Processing", "Queued", "Failed", "None")
+
+
+def scan_status_expression(report_id, scan_id, job_status):
+    """Dashboard scan status as SQL: Ready once reported, else the latest scan's job state"""
+    return case(
+        (report_id.isnot(None), "Ready"),
+        (scan_id.is_(None), "None"),
+        # No report yet: reflect the analysis job of the latest scan
+        (job_status == "failed", "Failed"),
+        (job_status == "queued", "Queued"),
+        else_="Processing"
+    )
+
+
+PATIENT_FIELDS = {
+    "id": lambda row: str(row.mrn), # Using MRN as ID for frontend
+    "name": lambda row: row.name,
+    "age": lambda row: row.age,
+    "diagnosis": lambda row: "Unknown", # Placeholder
+    "status": lambda row: "Active", # Placeholder
+    "assignedTo": lambda row: "Unassigned", # Placeholder
+    "lastVisit": lambda row: row.created_at.strftime("%b %d, %Y"),
+    "lastActivity": lambda row: row.last_activity_at.isoformat(),
+    "scanStatus": lambda row: row.scan_status,
+    "reportId": lambda row: row.latest_report_id,
+}
+
+
+def list_patients(db: Session, limit: Optional[int] = None, cursor: Optional[str] = None,
+                  mrn: Optional[str] = None, status: Optional[str] = None,
+                  date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                  fields: Optional[str] = None) -> tuple:
+    """
+    Rows for GET /api/patients, newest patient first; returns (rows, next_cursor).
+    Reads the maintained patient_worklist, so a page is one indexed range scan
+    (primary key, or (scan_status, patient_id) when filtering by status).
+    """
+    wanted = parse_fields(fields, PATIENT_FIELDS)
+    if status and status not in SCAN_STATUSES:
+        raise ValueError(f"Unknown status '{status}'. Use one of: {', '.join(SCAN_STATUSES)}")
+
+    statement = select(*PatientWorklist.__table__.c).where(
+        *date_range(PatientWorklist.created_at, date_from, date_to)
+    )
+    if mrn:
+        statement = statement.where(PatientWorklist.mrn == mrn)
+    if status:
+        statement = statement.where(PatientWorklist.scan_status == status)
+    after = keyset_after(None, PatientWorklist.patient_id, decode_cursor(cursor))
+    if after is not None:
+        statement = statement.where(after)
+
+    statement = statement.order_by(PatientWorklist.patient_id.desc())
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+
+    rows, next_cursor = page(db.execute(statement).all(), limit, lambda row: {"id": row.patient_id})
+    return serialize(rows, PATIENT_FIELDS, wanted), next_cursor
+
+
+# ========================================
+# Scans
+# ========================================
+
+SCAN_FIELDS = {
+    "id": lambda s: s.id,
+    "patientName": lambda s: s.patient.name,
+    "patientId": lambda s: s.patient.mrn,
+    "bodyPart": lambda s: s.body_part,
+    "modality": lambda s: s.modality,
+    "date": lambda s: s.scan_date.strftime("%b %d, %Y"),
+    "time": lambda s: s.scan_date.strftime("%H:%M"),
+    "file_url": lambda s: s.file_url,
+}
+
+
+def list_scans(db: Session, limit: Optional[int] = None, cursor: Optional[str] = None,
+               sort: str = "id", mrn: Optional[str] = None, body_part: Optional[str] = None,
+               date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+               fields: Optional[str] = None) -> tuple:
+    """Rows for GET /api/scans, newest first; returns (rows, next_cursor)"""
+    wanted = parse_fields(fields, SCAN_FIELDS)
+    sort_column = Scan.scan_date if sort == "scan_date" else None
+
+    query = db.query(Scan).options(joinedload(Scan.patient)).filter(
+        *date_range(Scan.scan_date, date_from, date_to)
+    )
+    if mrn:
+        query = query.join(Scan.patient).filter(Patient.mrn == mrn)
+    if body_part:
+        query = query.filter(Scan.body_part == body_part.upper())
+    after = keyset_after(sort_column, Scan.id, decode_cursor(cursor))
+    if after is not None:
+        query = query.filter(after)
+
+    query = query.order_by(*([sort_column.desc()] if sort_column is not None else []), Scan.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows, next_cursor = page(query.all(), limit, lambda s: {"id": s.id, "date": s.scan_date.isoformat()})
+    return serialize(rows, SCAN_FIELDS, wanted), next_cursor
+
+
+# ========================================
+# Reports
+# ========================================
+
+REPORT_FIELDS = {
+    "id": lambda r: r.id,
+    "patientName": lambda r: r.scan.patient.name,
+    "patientId": lambda r: r.scan.patient.mrn,
+    "date": lambda r: r.scan.scan_date.strftime("%b %d, %Y"),
+    "time": lambda r: r.scan.scan_date.strftime("%H:%M"),
+    "diagnosis": lambda r: "See Findings", # Placeholder or extract from impression
+    "findings": lambda r: r.impression[:100] + "..." if len(r.impression) > 100 else r.impression,
+    "full_text": lambda r: r.full_text,
+    "patient_history": lambda r: r.patient_history,
+    "comparison_findings": lambda r: r.comparison_findings,
+    "confidence": lambda r: 95, # Placeholder
+    "status": lambda r: r.status or "Draft",
+    "radiologist": lambda r: r.radiologist_name,
+    "pdf_url": lambda r: r.pdf_url,
+}
+
+# Large text columns and the fields that need them; deferred unless requested
+REPORT_TEXT_COLUMNS = {
+    "full_text": Report.full_text,
+    "patient_history": Report.patient_history,
+    "comparison_findings": Report.comparison_findings,
+    "findings": Report.impression,
+}
+
+
+def list_reports(db: Session, limit: Optional[int] = None, cursor: Optional[str] = None,
+                 sort: str = "id", status: Optional[str] = None, mrn: Optional[str] = None,
+                 patient_name: Optional[str] = None, body_part: Optional[str] = None,
+                 date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                 fields: Optional[str] = None) -> tuple:
+    """Rows for GET /api/reports, newest first; returns (rows, next_cursor)"""
+    wanted = parse_fields(fields, REPORT_FIELDS)
+    sort_column = Scan.scan_date if sort == "scan_date" else None
+
+    query = db.query(Report).join(Report.scan).options(
+        contains_eager(Report.scan).joinedload(Scan.patient),
+        *[defer(column) for name, column in REPORT_TEXT_COLUMNS.items() if name not in wanted]
+    ).filter(*date_range(Scan.scan_date, date_from, date_to))
+    if status:
+        query = query.filter(Report.status == status)
+    if mrn or patient_name:
+        query = query.join(Scan.patient)
+    if mrn:
+        query = query.filter(Patient.mrn == mrn)
+    if patient_name:
+        # Case-insensitive exact match (patient portal logins are by name)
+        query = query.filter(func.lower(Patient.name) == patient_name.strip().lower())
+    if body_part:
+        query = query.filter(Scan.body_part == body_part.upper())
+    after = keyset_after(sort_column, Report.id, decode_cursor(cursor))
+    if after is not None:
+        query = query.filter(after)
+
+    query = query.order_by(*([sort_column.desc()] if sort_column is not None else []), Report.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows, next_cursor = page(query.all(), limit, lambda r: {"id": r.id, "date": r.scan.scan_date.isoformat()})
+    return serialize(rows, REPORT_FIELDS, wanted), next_cursor
@@ -3,6 +3,8 @@ Cloudinary Storage Service for Remote File Storage
 Handles X-ray images and PDF documents upload to Cloudinary
 """
 import os
+import hashlib
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 import cloudinary
@@ -22,6 +24,48 @@ cloudinary.config(
     secure=True
 )
 
+# Read size when copying uploads to disk, and part size for chunked Cloudinary uploads
+# (Cloudinary requires parts of at least 5 MB)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+CLOUDINARY_CHUNK_BYTES = max(int(os.getenv("CLOUDINARY_CHUNK_BYTES", str(20 * 1024 * 1024))), 5 * 1024 * 1024)
+# Partial uploads are written here, outside every static mount, then renamed into place;
+# it must be on the same filesystem as reports/ for the rename to be atomic
+UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", "upload_staging")
+
+
+def save_stream(source, file_path: str, chunk_size: int = UPLOAD_CHUNK_BYTES) -> tuple:
+    """
+    Copy a binary stream to file_path chunk by chunk, hashing as it goes.
+    Returns (sha256 hex digest, size in bytes); memory use is one chunk.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, "wb") as target:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            target.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def stage_stream(source, suffix: str = "", staging_dir: str = UPLOAD_STAGING_DIR) -> tuple:
+    """
+    save_stream into a new private file in staging_dir.
+    Returns (path, sha256 hex digest, size); the file is removed if the copy fails.
+    """
+    os.makedirs(staging_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=staging_dir, prefix="upload_", suffix=suffix)
+    os.close(fd)
+    try:
+        digest, size = save_stream(source, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest, size
+
 
 def upload_to_cloud(
     file: UploadFile,
@@ -192,9 +236,10 @@ def upload_local_file(
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(
+        # Streamed from disk in CLOUDINARY_CHUNK_BYTES parts instead of read into memory
+        upload_result = cloudinary.uploader.upload_large(
             file_path,
+            chunk_size=CLOUDINARY_CHUNK_BYTES,
             folder=folder,
             resource_type=resource_type,
             use_filename=True,
@@ -4,6 +4,8 @@ Sends medical reports to patients and handles AI-powered Q&A chatbot
 Uses PostgreSQL database
 """
 import os
+import sys
+from pathlib import Path
 from twilio.rest import Client
 from dotenv import load_dotenv
 from database_postgres import (
@@ -15,6 +17,10 @@ from database_postgres import (
     init_whatsapp_tables
 )
 
+# Make the repo root importable so answers share the report answer cache with the API
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from agent_graph.response_cache import ReportAnswerCache
+
 # Load environment variables
 load_dotenv()
 
@@ -168,6 +174,17 @@ def generate_ai_response(patient_data, user_question, chat_history):
         gemini_api_key = os.environ.get('GEMINI_API_KEY')
         openai_api_key = os.environ.get('OPENAI_API_KEY')
         
+        # Repeat questions about the same report text skip the LLM; keyed on the report,
+        # not the conversation, so only LLM answers (not the rule-based fallback) are stored
+        report_id = patient_data.get('report_id')
+        report_context = f"{patient_data.get('name')}|{patient_data.get('age')}|{patient_data.get('gender')}|" \
+                         f"{patient_data.get('report_content', '')}"
+        cache = ReportAnswerCache()
+        if report_id is not None:
+            cached = cache.get(report_id, report_context, user_question, scope="whatsapp")
+            if cached is not None:
+                return cached
+        
         # Build context from patient data
         context = f"""
 Patient Information:
@@ -204,6 +221,8 @@ Be clear, compassionate, and accurate. If you're unsure, advise them to consult
 Provide a clear, concise answer (max 300 words):"""
                 
                 response = model.generate_content(prompt)
+                if report_id is not None:
+                    cache.set(report_id, report_context, user_question, response.text, scope="whatsapp")
                 return response.text
             except Exception as e:
                 print(f"Gemini API error: {e}")
@@ -223,7 +242,10 @@ Provide a clear, concise answer (max 300 words):"""
                     max_tokens=400,
                     temperature=0.7
                 )
-                return response.choices[0].message.content
+                answer = response.choices[0].message.content
+                if report_id is not None:
+                    cache.set(report_id, report_context, user_question, answer, scope="whatsapp")
+                return answer
             except Exception as e:
                 print(f"OpenAI API error: {e}")
         
@@ -0,0 +1,177 @@
+"""
+Maintains patient_worklist, the denormalized row per patient behind GET /api/patients.
+ORM writes to patients, scans, reports and analysis jobs refresh the affected
+patients' rows in the same flush (and so the same transaction). Bulk Core
+statements call refresh_worklist themselves.
+
+Usage:
+    python -m backend.worklist --rebuild
+"""
+import argparse
+from contextlib import contextmanager
+from itertools import chain
+
+from sqlalchemy import select, delete, insert, func, or_, case, true, event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from backend.models import Patient, Scan, Report, AnalysisJob, PatientWorklist
+from backend.queries import patient_list_statement, scan_status_expression
+
+WORKLIST_COLUMNS = ["patient_id", "mrn", "name", "age", "created_at", "latest_scan_id",
+                    "latest_report_id", "job_status", "scan_status", "last_activity_at"]
+
+# Attributes whose changes can move a patient's worklist row
+TRACKED_CHANGES = {
+    Patient: ("mrn", "name", "age", "created_at"),
+    Scan: ("patient_id", "scan_date"),
+    Report: ("scan_id",),
+    AnalysisJob: ("scan_id", "status"),
+}
+
+SUSPEND_KEY = "worklist_suspended"
+
+
+def worklist_statement(patient_ids=None):
+    """patient_worklist rows computed from the source tables (select of Patient.id to restrict)"""
+    latest = patient_list_statement(patient_ids).subquery("latest")
+    return select(
+        latest.c.id,
+        latest.c.mrn,
+        latest.c.name,
+        latest.c.age,
+        latest.c.created_at,
+        latest.c.scan_id,
+        latest.c.report_id,
+        latest.c.job_status,
+        scan_status_expression(latest.c.report_id, latest.c.scan_id, latest.c.job_status),
+        case((latest.c.last_scan_at > latest.c.created_at, latest.c.last_scan_at), else_=latest.c.created_at)
+    )
+
+
+def _ids_condition(column, patient_ids, scan_ids):
+    """column IN patient_ids, or IN the patients owning scan_ids (each a collection or a select)"""
+    conditions = []
+    if isinstance(patient_ids, Select) or patient_ids:
+        conditions.append(column.in_(patient_ids if isinstance(patient_ids, Select) else list(patient_ids)))
+    if isinstance(scan_ids, Select) or scan_ids:
+        scans = scan_ids if isinstance(scan_ids, Select) else list(scan_ids)
+        conditions.append(column.in_(select(Scan.patient_id).where(Scan.id.in_(scans))))
+    return or_(*conditions) if conditions else None
+
+
+def _upsert(connection, rows):
+    """INSERT ... SELECT rows ON CONFLICT (patient_id) DO UPDATE for the connected database"""
+    dialect = connection.dialect.name
+    # WHERE true keeps SQLite from reading ON CONFLICT as a join constraint
+    rows = rows.where(true())
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(PatientWorklist).from_select(WORKLIST_COLUMNS, rows)
+        statement = statement.on_duplicate_key_update(
+            {name: statement.inserted[name] for name in WORKLIST_COLUMNS[1:]}
+        )
+    elif dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(PatientWorklist).from_select(WORKLIST_COLUMNS, rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[PatientWorklist.patient_id],
+            set_={name: statement.excluded[name] for name in WORKLIST_COLUMNS[1:]}
+        )
+    else:
+        # Generic fallback: replace the rows
+        connection.execute(delete(PatientWorklist).where(PatientWorklist.patient_id.in_(
+            select(rows.subquery().c.id)
+        )))
+        statement = insert(PatientWorklist).from_select(WORKLIST_COLUMNS, rows)
+    connection.execute(statement)
+
+
+def refresh_worklist(bind, patient_ids=(), scan_ids=()):
+    """
+    Recompute the worklist rows of the given patients (and of the patients owning scan_ids)
+    on bind (a Session or Connection), inside the caller's transaction.
+    Rows of patients that no longer exist are removed.
+    """
+    connection = bind.connection() if isinstance(bind, Session) else bind
+    condition = _ids_condition(Patient.id, patient_ids, scan_ids)
+    if condition is None:
+        return
+    # An upsert rather than delete + insert, so concurrent refreshes of one patient don't collide
+    _upsert(connection, worklist_statement(select(Patient.id).where(condition)))
+    connection.execute(delete(PatientWorklist).where(
+        _ids_condition(PatientWorklist.patient_id, patient_ids, scan_ids),
+        ~select(Patient.id).where(Patient.id == PatientWorklist.patient_id).exists()
+    ))
+
+
+def rebuild_worklist(bind) -> int:
+    """Recompute every worklist row from the source tables; returns the row count."""
+    connection = bind.connection() if isinstance(bind, Session) else bind
+    connection.execute(delete(PatientWorklist))
+    connection.execute(insert(PatientWorklist).from_select(WORKLIST_COLUMNS, worklist_statement()))
+    return connection.execute(select(func.count()).select_from(PatientWorklist)).scalar()
+
+
+@contextmanager
+def worklist_suspended(session: Session):
+    """Skip the per-flush refresh while bulk writers refresh_worklist() once themselves."""
+    previous = session.info.get(SUSPEND_KEY, False)
+    session.info[SUSPEND_KEY] = True
+    try:
+        yield
+    finally:
+        session.info[SUSPEND_KEY] = previous
+
+
+def _changed(obj, attributes) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+
+def _old_and_new(obj, name) -> set:
+    """Current value plus the pre-flush one (a scan moved between patients touches both)"""
+    history = inspect(obj).attrs[name].history
+    return {getattr(obj, name), *history.deleted}
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    if session.info.get(SUSPEND_KEY):
+        return
+    patient_ids, scan_ids = set(), set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tracked = TRACKED_CHANGES.get(type(obj))
+        if tracked is None or (obj in session.dirty and not _changed(obj, tracked)):
+            continue
+        if isinstance(obj, Patient):
+            patient_ids.add(obj.id)
+        elif isinstance(obj, Scan):
+            patient_ids.update(_old_and_new(obj, "patient_id"))
+        else:
+            scan_ids.update(_old_and_new(obj, "scan_id"))
+    patient_ids.discard(None)
+    scan_ids.discard(None)
+    if patient_ids or scan_ids:
+        refresh_worklist(session.connection(), patient_ids, scan_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the patient worklist table")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every row from the source tables")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    from backend.database import engine
+    with engine.begin() as connection:
+        count = rebuild_worklist(connection)
+    print(f"✅ Patient worklist rebuilt: {count} patients")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Bulk import throughput check.
+Generates a synthetic patient CSV and loads it with backend.bulk_import, then
+re-imports it to exercise the MRN upsert path. Target: 100k patients well
+under a minute against local Postgres.
+
+Usage:
+    python bench_bulk_import.py --patients 100000                  # DATABASE_URL
+    python bench_bulk_import.py --patients 100000 --method copy
+    python bench_bulk_import.py --patients 20000 --database-url sqlite:///bench_import.db
+"""
+import argparse
+import csv
+import io
+import random
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Patient
+from backend.bulk_import import import_records, read_records
+from backend.migrate import upgrade_database
+
+
+def synthetic_csv(num_patients, prefix, seed=0):
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["mrn", "name", "age", "gender"])
+    for i in range(num_patients):
+        writer.writerow([f"{prefix}.{i}", f"Patient {i}", rng.randint(1, 95), rng.choice(["Male", "Female"])])
+    buffer.seek(0)
+    return buffer
+
+
+def run_import(Session, num_patients, prefix, chunk_size, method):
+    db = Session()
+    try:
+        start = time.perf_counter()
+        for progress in import_records(db, read_records(synthetic_csv(num_patients, prefix), "csv"),
+                                       chunk_size, method):
+            pass
+        return time.perf_counter() - start, progress
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import throughput")
+    parser.add_argument("--patients", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--method", choices=["insert", "copy"], default="insert")
+    parser.add_argument("--database-url", default=None, help="Default: DATABASE_URL from .env")
+    parser.add_argument("--target-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from backend.database import engine
+    upgrade_database(engine)
+    Session = sessionmaker(bind=engine)
+
+    prefix = f"BULK{int(time.time())}"
+    first, progress = run_import(Session, args.patients, prefix, args.chunk_size, args.method)
+    print(f"Initial load: {args.patients} patients in {first:.1f}s "
+          f"({args.patients / first:,.0f} rows/s), inserted={progress['inserted']} failed={progress['failed']}")
+
+    second, progress = run_import(Session, args.patients, prefix, args.chunk_size, args.method)
+    print(f"Re-import (upsert): {second:.1f}s, updated={progress['updated']} inserted={progress['inserted']}")
+
+    with Session() as db:
+        loaded = db.execute(select(func.count()).select_from(Patient).where(Patient.mrn.like(f"{prefix}.%"))).scalar()
+        db.query(Patient).filter(Patient.mrn.like(f"{prefix}.%")).delete(synchronize_session=False)
+        db.commit()
+
+    if loaded != args.patients or progress["updated"] != args.patients:
+        raise SystemExit(f"❌ Expected {args.patients} patients, found {loaded}; updated {progress['updated']}")
+    if first > args.target_seconds:
+        raise SystemExit(f"❌ Initial load took {first:.1f}s (target {args.target_seconds}s)")
+    print(f"✅ Loaded and upserted {args.patients} patients within {args.target_seconds}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Checks the streaming chat path (backend/chat_stream.py, POST /api/chat/stream)
+end to end under uvicorn, against the stub OpenAI-compatible server from
+bench_llm_client.py (no LM Studio or database needed):
+- tokens reach the HTTP client as the stub emits them: time to first token
+  is a small fraction of the full generation time
+- a client that disconnects mid-answer closes the upstream request
+- an unreachable LLM produces an "error" event instead of a hung response
+- the non-streaming answer is unchanged
+
+Usage:
+    python bench_chat_stream.py --tokens 40 --token-delay 0.05
+"""
+import argparse
+import json
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from agent_graph.tools.llm_client import LLMClient
+from agent_graph.tools.llm_tools import answer_text_question_async
+from backend.chat_stream import answer_events
+from bench_llm_client import start_stub, fresh_client, unused_port
+
+CONTEXT = "Findings: clear lungs.\nImpression: No acute findings."
+
+
+def create_app():
+    """The /api/chat routes of server.py with a fixed report context"""
+    app = FastAPI()
+
+    @app.post("/api/chat")
+    async def chat(body: dict):
+        return {"answer": await answer_text_question_async(CONTEXT, body["question"])}
+
+    @app.post("/api/chat/stream")
+    async def chat_stream(body: dict, request: Request):
+        return StreamingResponse(answer_events(CONTEXT, body["question"], request, label="bench stream"),
+                                 media_type="text/event-stream")
+
+    return app
+
+
+def serve(app):
+    port = unused_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def read_events(response, stop_after=None):
+    """(event, data, seconds since request) for each SSE event; stops early after stop_after tokens"""
+    events, event = [], None
+    started = time.perf_counter()
+    for line in response.iter_lines():
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            events.append((event or "token", json.loads(line[len("data:"):]), time.perf_counter() - started))
+            event = None
+            if stop_after and len(events) >= stop_after:
+                break
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming /api/chat checks")
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stub = start_stub()
+    state = stub.state
+    llm_url = f"http://127.0.0.1:{stub.server_address[1]}/v1"
+    fresh_client(llm_url)
+    server, base_url = serve(create_app())
+    failures = []
+
+    def check(condition, message):
+        print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    with httpx.Client(base_url=base_url, timeout=30) as http:
+        # Full stream
+        state.reset(stream_tokens=args.tokens, token_delay=args.token_delay)
+        start = time.perf_counter()
+        with http.stream("POST", "/api/chat/stream", json={"question": "is this normal?"}) as response:
+            events = read_events(response)
+        tokens = [data["token"] for event, data, _ in events if event == "token"]
+        done = [data for event, data, _ in events if event == "done"]
+        first_token_s = events[0][2] if events else float("inf")
+        total_s = time.perf_counter() - start
+        check(len(tokens) == args.tokens and done and first_token_s < total_s / 4,
+              f"streamed {len(tokens)} tokens: first after {first_token_s * 1000:.0f} ms, "
+              f"all after {total_s * 1000:.0f} ms (server ttft {done[0]['ttft_ms'] if done else None} ms)")
+
+        # Client disconnects after a few tokens: upstream generation must stop
+        state.reset(stream_tokens=args.tokens * 10, token_delay=args.token_delay)
+        with http.stream("POST", "/api/chat/stream", json={"question": "cancel me"}) as response:
+            read_events(response, stop_after=3)
+        deadline = time.time() + 5
+        while time.time() < deadline and not state.streams_aborted:
+            time.sleep(0.05)
+        stats = LLMClient().stream_stats()
+        check(state.streams_aborted == 1 and not state.streams_completed and stats["cancelled"] == 1,
+              f"client disconnect closed the upstream request (aborted={state.streams_aborted}); "
+              f"client stats {stats}")
+
+        # Non-streaming path is unchanged
+        state.reset()
+        answer = http.post("/api/chat", json={"question": "plain"}).json()["answer"]
+        check(answer.startswith("echo:"), "non-streaming /api/chat still answers in one response")
+
+        # LLM unreachable: an error event, promptly
+        fresh_client(f"http://127.0.0.1:{unused_port()}/v1", max_retries=1)
+        start = time.perf_counter()
+        with http.stream("POST", "/api/chat/stream", json={"question": "anyone there?"}) as response:
+            events = read_events(response)
+        check([event for event, _, _ in events] == ["error"] and time.perf_counter() - start < 5,
+              "unreachable LLM gives an error event")
+
+    server.should_exit = True
+    stub.shutdown()
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print("✅ Chat streaming: tokens forwarded as generated, cancelled on disconnect")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Checks the comparator node (agent_graph/agents/comparator.py) against the stub
+OpenAI-compatible server from bench_llm_client.py, no LM Studio needed:
+- new patients / patients without prior reports never reach the LLM
+- re-running the same report against the same history reuses the comparison
+- a changed history or report is compared again
+- an unreachable LLM leaves a comparison message instead of state["error"]
+
+Usage:
+    python bench_comparator.py --llm-delay 0.5
+"""
+import argparse
+import tempfile
+import time
+
+from agent_graph.agents.comparator import comparator_agent, NO_HISTORY_COMPARISON
+from agent_graph.real_database import NEW_PATIENT_HISTORY, NO_REPORTS_HISTORY
+from agent_graph.result_cache import PipelineResultCache
+from bench_llm_client import start_stub, fresh_client, unused_port
+
+REPORT = "Findings: mild cardiomegaly.\nImpression: Enlarged cardiac silhouette."
+HISTORY = "Patient: Jane Doe, 54, F\nHistory: [2025-01-10] Impression: No acute findings.\n"
+
+
+def run(report, history):
+    start = time.perf_counter()
+    result = comparator_agent({"current_report": report, "patient_history": history})
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparator skip/reuse checks")
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    stub = start_stub()
+    state = stub.state
+    fresh_client(f"http://127.0.0.1:{stub.server_address[1]}/v1")
+    PipelineResultCache._instance = None
+    PipelineResultCache().cache_dir = tempfile.mkdtemp(prefix="comparator_cache_")
+    failures = []
+
+    def check(condition, message):
+        print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    # Empty histories, bare and as the retriever's "Patient: ...\nHistory: ..." summary
+    state.reset(delay=args.llm_delay)
+    results = [run(REPORT, history)[0] for history in
+               (NEW_PATIENT_HISTORY, f"Patient: John Doe, 40, M\nHistory: {NO_REPORTS_HISTORY}")]
+    check(state.requests == 0 and all(r["comparison_result"] == NO_HISTORY_COMPARISON for r in results),
+          "empty histories skip the LLM")
+
+    # Same pair twice: one LLM call
+    state.reset(delay=args.llm_delay)
+    first, first_s = run(REPORT, HISTORY)
+    second, second_s = run(REPORT, HISTORY)
+    check(state.requests == 1 and first == second,
+          f"re-run reuses the comparison ({first_s * 1000:.0f} ms, then {second_s * 1000:.1f} ms)")
+
+    # Any change in history or report is compared again
+    run(REPORT, HISTORY + "[2025-06-02] Impression: Small left effusion.\n")
+    run(REPORT + " Addendum: stable.", HISTORY)
+    check(state.requests == 3, f"changed history/report compared again ({state.requests} LLM calls)")
+
+    # LLM down: the optional comparison degrades without setting state["error"]
+    fresh_client(f"http://127.0.0.1:{unused_port()}/v1", max_retries=0)
+    result, _ = run(REPORT, HISTORY + "[2025-09-09] Impression: Resolved.\n")
+    check("error" not in result and result.get("comparison_result"),
+          f"unreachable LLM: {result.get('comparison_result')!r}")
+
+    stub.shutdown()
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print("✅ Comparator: empty histories skipped, repeat comparisons reused")
+
+
+if __name__ == "__main__":
+    main()
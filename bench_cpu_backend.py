@@ -0,0 +1,129 @@
+"""
+Checks the optimized CPU inference backend against the eager fp32 models.
+Reports per-label probability drift for ChexNet and BiomedCLIP on a fixed
+image set, and the per-scan analyzer latency of both backends.
+
+Usage:
+    python bench_cpu_backend.py --images Reports/images --backend optimized
+    python bench_cpu_backend.py --synthetic 16       # seeded random inputs when no films are at hand
+"""
+import argparse
+import copy
+import glob
+import os
+import statistics
+import time
+
+import torch
+
+from agent_graph.tools.model_tools import (
+    ChexNet, CHEXNET_LABELS, CLIP_MODEL_ID, DEFAULT_CANDIDATE_LABELS, device,
+    encode_clip_text, load_xray_image, preprocess_image_for_chexnet,
+    optimize_chexnet_for_cpu, quantize_clip_for_cpu
+)
+from open_clip import create_model_from_pretrained, get_tokenizer
+
+
+def load_inputs(images_dir, synthetic, clip_preprocess):
+    """Returns a list of (name, chexnet_tensor, clip_tensor)"""
+    inputs = []
+    paths = sorted(glob.glob(os.path.join(images_dir, "*"))) if images_dir else []
+    for path in paths:
+        try:
+            image = load_xray_image(path)
+        except Exception:
+            continue
+        inputs.append((os.path.basename(path), preprocess_image_for_chexnet(image),
+                       clip_preprocess(image).unsqueeze(0).to(device)))
+
+    generator = torch.Generator().manual_seed(0)
+    for i in range(synthetic if not inputs else 0):
+        chexnet_tensor = torch.randn(1, 3, 224, 224, generator=generator).to(device)
+        clip_tensor = torch.randn(1, 3, 224, 224, generator=generator).to(device)
+        inputs.append((f"synthetic_{i}", chexnet_tensor, clip_tensor))
+    return inputs
+
+
+def run_analyzer(chexnet, clip_model, text_features, inputs):
+    """Runs the analyzer's model work per scan; returns (chexnet_probs, clip_probs, latencies_ms)"""
+    chexnet_probs, clip_probs, latencies = [], [], []
+    with torch.no_grad():
+        for _, chexnet_tensor, clip_tensor in inputs:
+            start = time.perf_counter()
+            probs = chexnet(chexnet_tensor)
+            image_features = clip_model.encode_image(clip_tensor, normalize=True)
+            scores = (clip_model.logit_scale.exp() * image_features @ text_features.t()).softmax(dim=-1)
+            latencies.append((time.perf_counter() - start) * 1000)
+            chexnet_probs.append(probs.cpu())
+            clip_probs.append(scores.cpu())
+    return torch.cat(chexnet_probs), torch.cat(clip_probs), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimized CPU backend drift and latency check")
+    parser.add_argument("--images", default=None, help="Directory of X-ray images")
+    parser.add_argument("--synthetic", type=int, default=16, help="Seeded random inputs if no images are found")
+    parser.add_argument("--backend", choices=["torchscript", "int8", "optimized"], default="optimized")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-drift", type=float, default=0.02, help="Max allowed absolute probability drift")
+    parser.add_argument("--target-speedup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if device.type != "cpu":
+        print("⚠️ CUDA is available; the optimized backend is only applied on CPU nodes.")
+
+    print("Loading eager models...")
+    chexnet = ChexNet(num_classes=len(CHEXNET_LABELS)).to(device).eval()
+    clip_model, clip_preprocess = create_model_from_pretrained(CLIP_MODEL_ID)
+    tokenizer = get_tokenizer(CLIP_MODEL_ID)
+    clip_model.to(device).eval()
+
+    print(f"Building '{args.backend}' models...")
+    opt_chexnet, opt_clip = chexnet, clip_model
+    if args.backend in ("torchscript", "optimized"):
+        opt_chexnet = optimize_chexnet_for_cpu(copy.deepcopy(chexnet))
+    if args.backend in ("int8", "optimized"):
+        opt_clip = quantize_clip_for_cpu(copy.deepcopy(clip_model))
+
+    inputs = load_inputs(args.images, args.synthetic, clip_preprocess)
+    print(f"Evaluating on {len(inputs)} images")
+
+    eager_text = encode_clip_text(clip_model, tokenizer, DEFAULT_CANDIDATE_LABELS)
+    opt_text = encode_clip_text(opt_clip, tokenizer, DEFAULT_CANDIDATE_LABELS)
+
+    # Warm-up so tracing/quantization setup does not count towards latency
+    run_analyzer(chexnet, clip_model, eager_text, inputs[:1])
+    run_analyzer(opt_chexnet, opt_clip, opt_text, inputs[:1])
+
+    eager_latency, opt_latency = [], []
+    for _ in range(args.repeats):
+        eager_chexnet, eager_clip, latencies = run_analyzer(chexnet, clip_model, eager_text, inputs)
+        eager_latency += latencies
+        opt_chexnet_probs, opt_clip_probs, latencies = run_analyzer(opt_chexnet, opt_clip, opt_text, inputs)
+        opt_latency += latencies
+
+    chexnet_drift = (opt_chexnet_probs - eager_chexnet).abs().max(dim=0).values
+    clip_drift = (opt_clip_probs - eager_clip).abs().max(dim=0).values
+
+    print("\nChexNet per-label max drift:")
+    for label, drift in zip(CHEXNET_LABELS, chexnet_drift.tolist()):
+        print(f"  {label:<20} {drift:.5f}")
+    print("BiomedCLIP per-label max drift:")
+    for label, drift in zip(DEFAULT_CANDIDATE_LABELS, clip_drift.tolist()):
+        print(f"  {label:<20} {drift:.5f}")
+
+    eager_ms = statistics.median(eager_latency)
+    opt_ms = statistics.median(opt_latency)
+    speedup = eager_ms / opt_ms
+    print(f"\nPer-scan analyzer latency: eager {eager_ms:.1f} ms, {args.backend} {opt_ms:.1f} ms (x{speedup:.2f})")
+
+    worst = max(chexnet_drift.max().item(), clip_drift.max().item())
+    if worst > args.max_drift:
+        raise SystemExit(f"❌ Probability drift {worst:.4f} exceeds bound {args.max_drift}")
+    if speedup < args.target_speedup:
+        print(f"⚠️ Speedup x{speedup:.2f} is below the x{args.target_speedup} target")
+    print(f"✅ Drift within {args.max_drift}")
+
+
+if __name__ == "__main__":
+    main()
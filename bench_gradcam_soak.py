@@ -0,0 +1,81 @@
+"""
+Soak benchmark for Grad-CAM hook lifecycle.
+Runs the visualizer's CAM step repeatedly against the shared ChexNet model and
+reports per-window latency plus the number of hooks left on the target layer.
+Latency and hook counts should stay flat for the whole run.
+
+Usage:
+    python bench_gradcam_soak.py --scans 10000 --window 500
+    python bench_gradcam_soak.py --mode legacy   # hook-based GradCAM used as a context manager
+"""
+import argparse
+import statistics
+import time
+
+import torch
+
+from agent_graph.tools.model_tools import ModelManager, CHEXNET_LABELS, device
+from agent_graph.tools.cam_tools import GradCAM
+
+
+def count_hooks(module):
+    return len(module._forward_hooks) + len(module._backward_hooks)
+
+
+def run_soak(scans, window, mode, class_names):
+    manager = ModelManager()
+    model = manager.load_chexnet()
+    target_layer = manager.get_chexnet_target_layer()
+    class_indices = [CHEXNET_LABELS.index(name) for name in class_names]
+    image_tensor = torch.randn(1, 3, 224, 224, device=device)
+
+    window_means = []
+    latencies = []
+    for i in range(1, scans + 1):
+        start = time.perf_counter()
+        if mode == "shared":
+            manager.get_cam_extractor().generate_cams(class_indices, input_image=image_tensor)
+        else:
+            with GradCAM(model, target_layer) as grad_cam:
+                grad_cam.generate_cams(image_tensor, class_indices)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if i % window == 0:
+            mean_ms = statistics.mean(latencies)
+            window_means.append(mean_ms)
+            print(f"scans {i - window + 1:>6}-{i:<6} mean {mean_ms:8.2f} ms  "
+                  f"p95 {sorted(latencies)[int(len(latencies) * 0.95) - 1]:8.2f} ms  "
+                  f"hooks on target layer: {count_hooks(target_layer)}")
+            latencies = []
+
+    return window_means, count_hooks(target_layer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grad-CAM soak benchmark")
+    parser.add_argument("--scans", type=int, default=10000)
+    parser.add_argument("--window", type=int, default=500)
+    parser.add_argument("--mode", choices=["shared", "legacy"], default="shared")
+    parser.add_argument("--classes", nargs="+", default=["Cardiomegaly", "Effusion", "Pneumonia", "Edema"])
+    parser.add_argument("--max-drift", type=float, default=1.25,
+                        help="Fail if the last window is slower than the first by this factor")
+    args = parser.parse_args()
+
+    print(f"Running {args.scans} scans in '{args.mode}' mode on {device}...")
+    window_means, hooks_left = run_soak(args.scans, args.window, args.mode, args.classes)
+
+    if not window_means:
+        print("Not enough scans for a full window.")
+        return
+
+    drift = window_means[-1] / window_means[0]
+    print(f"\nFirst window: {window_means[0]:.2f} ms, last window: {window_means[-1]:.2f} ms, drift x{drift:.2f}")
+    print(f"Hooks left on target layer: {hooks_left}")
+
+    if hooks_left != 0 or drift > args.max_drift:
+        raise SystemExit("❌ Per-scan latency or hook count grew during the soak run")
+    print("✅ Per-scan latency stayed flat")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Latency of the agent graph's topology (agent_graph/graph.py): the real
+create_graph() wiring, state reducers and join node, with every model/DB/LLM
+node replaced by a stand-in that sleeps for a typical stage time. Checks that a
+scan takes roughly its critical path rather than the sum of all stages, that the
+draft at the review interrupt has the region text and merged pathologies, that
+each node reports its own run time (not the gap since the previous stream event),
+that a reviewer edit plus resume still reaches pdf_generator, and that an empty
+edit is kept rather than dropped by the current_report reducer.
+
+Usage:
+    python bench_graph_fanout.py --runs 5
+"""
+import argparse
+import time
+import uuid
+from unittest import mock
+
+import agent_graph.graph as graph
+
+# Seconds per stage: DB, image decode, ChexNet + CLIP, CAMs, NER, LLM comparison
+STAGE_SECONDS = {"retriever": 0.3, "preprocessor": 0.1, "analyzer": 0.5,
+                 "visualizer": 0.4, "ner": 0.3, "comparator": 1.0, "pdf_generator": 0.05}
+ANALYZER_REPORT = "CLIP Report: pneumonia (0.61)\n\n**ChexNet Detections:** Pneumonia"
+REGION_REPORT = "**Regions:** Pneumonia - right lower zone"
+
+
+def timed(name, update):
+    def node(state):
+        time.sleep(STAGE_SECONDS[name])
+        return update(state) if callable(update) else update
+    return node
+
+
+STAND_INS = {
+    "retriever_agent": timed("retriever", {"patient_history": "Patient: Bench\nHistory: [2025-01-10] Clear.",
+                                           "data_handle": "bench"}),
+    "preprocessor_agent": timed("preprocessor", {"image_handle": "bench", "image_sha256": "0" * 64}),
+    "analyzer_agent": timed("analyzer", {"current_report": ANALYZER_REPORT,
+                                         "pathologies": {"Pneumonia": {"probability": 0.61, "detected": True}}}),
+    "visualizer_agent": timed("visualizer", {"region_report": REGION_REPORT,
+                                             "visualization_path": "/reports/visualizations/overlay_bench.png"}),
+    "ner_agent": timed("ner", {"pathologies": {"ner_entities": [{"text": "pneumonia", "label": "DISEASE"}]}}),
+    "comparator_agent": timed("comparator", lambda state: {
+        "comparison_result": f"compared against {state['patient_history'].splitlines()[-1]}"}),
+    "pdf_agent": timed("pdf_generator", lambda state: {"pdf_path": f"report_{len(state['current_report'])}.pdf"}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent graph fan-out latency")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    s = STAGE_SECONDS
+    sequential = sum(v for k, v in s.items() if k != "pdf_generator")
+    critical = s["preprocessor"] + max(s["retriever"], s["analyzer"]) + max(s["visualizer"], s["ner"], s["comparator"])
+    failures = []
+
+    def check(condition, message):
+        print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    with mock.patch.multiple(graph, **STAND_INS):
+        app = graph.create_graph()
+        timings = []
+        for _ in range(args.runs):
+            config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+            start = time.perf_counter()
+            reported = {}
+            for event in app.stream({"patient_id": "BENCH.1", "xray_image_path": "bench.png"}, config=config):
+                for node, update in event.items():
+                    if not node.startswith("__") and isinstance(update, dict):
+                        reported[node] = update["stage_timings"][node]
+            timings.append(time.perf_counter() - start)
+        state = app.get_state(config)
+        values = state.values
+
+        median = sorted(timings)[len(timings) // 2]
+        print(f"Until review: median {median:.2f}s over {args.runs} runs; "
+              f"sum of stages {sequential:.2f}s, critical path {critical:.2f}s")
+        check(median < critical * 1.15, "end-to-end latency close to the critical path")
+        check(state.next == ("pdf_generator",), f"paused before {state.next}")
+        check(all(abs(reported.get(k, 0) - v) < 0.05 for k, v in s.items() if k != "pdf_generator"),
+              "per-node timings: " + ", ".join(f"{k} {v:.2f}s" for k, v in reported.items()))
+        check(values["current_report"] == ANALYZER_REPORT + "\n\n" + REGION_REPORT,
+              "draft = analyzer report + region report")
+        check({"Pneumonia", "ner_entities"} <= set(values["pathologies"]),
+              "ChexNet scores and NER entities both kept in pathologies")
+        check(values.get("comparison_result", "").startswith("compared against") and not values.get("error"),
+              "comparator saw the retriever's history")
+
+        # Reviewer edit and resume, as /api/feedback does
+        app.update_state(config, {"current_report": "Edited by radiologist."})
+        for _event in app.stream(None, config=config):
+            pass
+        values = app.get_state(config).values
+        check(values["current_report"] == "Edited by radiologist." and values.get("pdf_path"),
+              "edited report reaches pdf_generator after resume")
+
+        # A reviewer clearing the draft is an edit too; only None keeps the current report
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        for _event in app.stream({"patient_id": "BENCH.1", "xray_image_path": "bench.png"}, config=config):
+            pass
+        app.update_state(config, {"current_report": ""})
+        check(app.get_state(config).values["current_report"] == "", "empty reviewer edit replaces the draft")
+
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print("✅ Agent graph: branches overlap, join assembles the draft")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Checks the pooled LLM client (agent_graph/tools/llm_client.py) against a local
+stub OpenAI-compatible server, no LM Studio needed:
+- sequential calls reuse one keep-alive connection
+- concurrent sync and async calls never exceed LLM_MAX_CONCURRENCY in flight
+- 503s and refused connections are retried, then succeed or fail cleanly
+- a hung server is cut off at the read timeout instead of blocking the worker
+
+Usage:
+    python bench_llm_client.py
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent_graph.tools.llm_client import LLMClient
+from agent_graph.tools.llm_tools import answer_text_question, answer_text_question_async, LLM_UNAVAILABLE_MESSAGE
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, delay=0.0, fail_first=0, hang=0.0, stream_tokens=20, token_delay=0.0):
+        with self.lock:
+            self.delay = delay
+            self.fail_first = fail_first
+            self.hang = hang
+            self.stream_tokens = stream_tokens
+            self.token_delay = token_delay
+            self.streams_completed = 0
+            self.streams_aborted = 0
+            self.requests = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.client_ports = set()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions (plain or "stream": true); behaviour set on server.state"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, state):
+        """OpenAI-style SSE chunks, one token every token_delay seconds; notes a client hang-up"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for i in range(state.stream_tokens):
+                chunk = {"choices": [{"delta": {"content": f"tok{i} "}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(state.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with state.lock:
+                state.streams_aborted += 1
+            return
+        with state.lock:
+            state.streams_completed += 1
+
+    def do_POST(self):
+        state = self.server.state
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with state.lock:
+            state.requests += 1
+            state.client_ports.add(self.client_address[1])
+            failing = state.fail_first > 0
+            state.fail_first -= 1 if failing else 0
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+        try:
+            if failing:
+                return self.send_json(503, {"error": "model loading"})
+            time.sleep(state.hang or state.delay)
+            if body.get("stream"):
+                return self.send_stream(state)
+            question = body["messages"][-1]["content"]
+            self.send_json(200, {"choices": [{"message": {"role": "assistant", "content": f"echo: {question[-20:]}"}}]})
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.state = StubState()
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fresh_client(base_url, **overrides):
+    LLMClient._instance = None
+    client = LLMClient()
+    client.config.update(base_url=base_url, retry_backoff=0.05, **overrides)
+    client.semaphore = threading.BoundedSemaphore(client.config['max_concurrency'])
+    return client
+
+
+def unused_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    server = start_stub()
+    state = server.state
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    failures = []
+
+    def check(condition, message):
+        print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    # Keep-alive
+    fresh_client(base_url)
+    answers = [answer_text_question("Findings: clear lungs.", f"question {i}") for i in range(20)]
+    check(all(a.startswith("echo:") for a in answers) and len(state.client_ports) == 1,
+          f"20 sequential calls over {len(state.client_ports)} connection(s)")
+
+    # Bounded concurrency, sync
+    fresh_client(base_url, max_concurrency=4)
+    state.reset(delay=0.1)
+    with ThreadPoolExecutor(16) as pool:
+        answers = list(pool.map(lambda i: answer_text_question("ctx", f"q{i}"), range(16)))
+    check(all(a.startswith("echo:") for a in answers) and state.max_in_flight <= 4,
+          f"16 threads: max {state.max_in_flight} in flight (limit 4), {len(state.client_ports)} connections")
+
+    # Bounded concurrency, async
+    async def many_async():
+        try:
+            return await asyncio.gather(*(answer_text_question_async("ctx", f"q{i}") for i in range(16)))
+        finally:
+            await LLMClient().aclose()
+    state.reset(delay=0.1)
+    answers = asyncio.run(many_async())
+    check(all(a.startswith("echo:") for a in answers) and state.max_in_flight <= 4,
+          f"16 async tasks: max {state.max_in_flight} in flight (limit 4)")
+
+    # Retry on 503
+    fresh_client(base_url, max_retries=2)
+    state.reset(fail_first=2)
+    answer = answer_text_question("ctx", "retry me")
+    check(answer.startswith("echo:") and state.requests == 3, f"two 503s then success in {state.requests} requests")
+
+    state.reset(fail_first=5)
+    answer = answer_text_question("ctx", "give up")
+    check(answer == LLM_UNAVAILABLE_MESSAGE and state.requests == 3,
+          f"persistent 503 gives up after {state.requests} requests")
+
+    # Hung server: read timeout, no retry
+    fresh_client(base_url, read_timeout=0.5)
+    state.reset(hang=3.0)
+    start = time.perf_counter()
+    answer = answer_text_question("ctx", "hang")
+    elapsed = time.perf_counter() - start
+    check(answer == LLM_UNAVAILABLE_MESSAGE and elapsed < 1.5 and state.requests == 1,
+          f"hung server cut off after {elapsed:.2f}s ({state.requests} request)")
+
+    # Nothing listening: connection errors are retried, then reported
+    fresh_client(f"http://127.0.0.1:{unused_port()}/v1", max_retries=2)
+    start = time.perf_counter()
+    answer = answer_text_question("ctx", "refused")
+    check(answer == LLM_UNAVAILABLE_MESSAGE, f"refused connection reported after {time.perf_counter() - start:.2f}s")
+
+    LLMClient().close()
+    server.shutdown()
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print("✅ LLM client: keep-alive, bounded concurrency, retries and timeouts behave")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Load test for the API server: read-endpoint latency during concurrent uploads.
+Uploader threads keep posting scans for one patient while reader threads hit
+the list/detail endpoints; p50/p99 of the reads are reported per endpoint.
+With the async DB layer the read p99 should stay low while uploads run.
+
+Usage (server running on localhost:8000, INFERENCE_WORKERS can be 0):
+    python bench_load.py --image Reports/images/sample.png --uploaders 8 --readers 16 --seconds 30
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+READ_ENDPOINTS = [
+    "/api/patients?limit=50",
+    "/api/scans?limit=50",
+    "/api/reports?limit=50&fields=id,patientName,status,date",
+    "/api/health/ready",
+]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def uploader(base_url, patient_id, image_path, stop, stats):
+    session = requests.Session()
+    with open(image_path, "rb") as f:
+        payload = f.read()
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = session.post(
+            f"{base_url}/api/scans",
+            data={"patient_id": patient_id, "body_part": "CHEST"},
+            files={"file": ("load_test.png", payload, "image/png")}
+        )
+        stats["upload"].append((time.perf_counter() - start) * 1000)
+        if response.status_code == 503:
+            # Queue is full: honour Retry-After briefly instead of hammering
+            stop.wait(1)
+
+
+def reader(base_url, stop, stats, index):
+    session = requests.Session()
+    i = index
+    while not stop.is_set():
+        endpoint = READ_ENDPOINTS[i % len(READ_ENDPOINTS)]
+        i += 1
+        start = time.perf_counter()
+        response = session.get(f"{base_url}{endpoint}")
+        elapsed = (time.perf_counter() - start) * 1000
+        stats[endpoint.split("?")[0]].append(elapsed)
+        if response.status_code >= 500 and endpoint != "/api/health/ready":
+            stats["errors"].append(response.status_code)
+
+
+def run_phase(base_url, readers, uploaders, seconds, patient_id, image_path):
+    stats = defaultdict(list)
+    stop = threading.Event()
+    threads = [threading.Thread(target=reader, args=(base_url, stop, stats, i), daemon=True)
+               for i in range(readers)]
+    threads += [threading.Thread(target=uploader, args=(base_url, patient_id, image_path, stop, stats), daemon=True)
+                for _ in range(uploaders)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    return stats
+
+
+def report(title, stats):
+    print(f"\n{title}")
+    read_latencies = []
+    for name, values in sorted(stats.items()):
+        if name == "errors" or not values:
+            continue
+        if name != "upload":
+            read_latencies += values
+        print(f"  {name:<22} n={len(values):<6} p50 {percentile(values, 50):8.1f} ms  p99 {percentile(values, 99):8.1f} ms")
+    if stats["errors"]:
+        print(f"  read errors: {len(stats['errors'])}")
+    return percentile(read_latencies, 99) if read_latencies else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read latency under concurrent uploads")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--image", required=True, help="X-ray image to upload repeatedly")
+    parser.add_argument("--patient-id", default=None, help="MRN to upload against (created if omitted)")
+    parser.add_argument("--uploaders", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--max-p99-ratio", type=float, default=3.0,
+                        help="Fail if read p99 under upload load exceeds the idle p99 by this factor")
+    args = parser.parse_args()
+
+    patient_id = args.patient_id
+    if not patient_id:
+        response = requests.post(f"{args.base_url}/api/patients",
+                                 json={"name": "Load Test", "age": 40, "gender": "Unknown"})
+        response.raise_for_status()
+        patient_id = response.json()["id"]
+        print(f"Created load-test patient {patient_id}")
+
+    idle_p99 = report("Reads only", run_phase(args.base_url, args.readers, 0, args.seconds, patient_id, args.image))
+    loaded_p99 = report(f"Reads with {args.uploaders} concurrent uploaders",
+                        run_phase(args.base_url, args.readers, args.uploaders, args.seconds, patient_id, args.image))
+
+    if idle_p99 is None or loaded_p99 is None:
+        raise SystemExit("❌ No read requests completed")
+    ratio = loaded_p99 / idle_p99
+    print(f"\nRead p99: idle {idle_p99:.1f} ms, under uploads {loaded_p99:.1f} ms (x{ratio:.2f})")
+    if ratio > args.max_p99_ratio:
+        raise SystemExit(f"❌ Read p99 grew x{ratio:.2f} under upload load (limit x{args.max_p99_ratio})")
+    print("✅ Read latency stayed low during uploads")
+
+
+if __name__ == "__main__":
+    main()
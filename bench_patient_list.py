@@ -0,0 +1,159 @@
+"""
+Benchmark for GET /api/patients on the patient_worklist table.
+Seeds an in-memory SQLite database with synthetic patients, scans, reports and
+analysis jobs at several sizes, rebuilds the worklist, then times list pages
+(first page, a deep cursor page, a status-filtered page) and counts the SQL
+statements each issues. Every page must be one statement, and the pages must
+stay within the latency target at every size.
+It also writes scans, reports and job updates through the ORM and checks that
+the incrementally maintained rows match a full rebuild.
+
+Usage:
+    python bench_patient_list.py --sizes 1000 20000 100000 --target-ms 10
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Base, Patient, Scan, Report, AnalysisJob, PatientWorklist
+from backend.queries import list_patients, encode_cursor
+from backend.worklist import rebuild_worklist, worklist_statement, worklist_suspended
+
+PAGE_SIZE = 100
+
+
+def seed(db, num_patients, scans_per_patient=3, report_ratio=0.6, seed_value=0):
+    """Synthetic data: every patient gets 0..N scans, most scans a report, the rest a job"""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    db.add_all(
+        Patient(mrn=f"BENCH.{i}", name=f"Patient {i}", age=rng.randint(1, 95),
+                gender=rng.choice(["Male", "Female"]), created_at=now - timedelta(days=i % 365))
+        for i in range(num_patients)
+    )
+    db.flush()
+
+    patient_ids = [row[0] for row in db.query(Patient.id).all()]
+    scans = [
+        Scan(patient_id=patient_id, file_url="/reports/bench.png", body_part="CHEST")
+        for patient_id in patient_ids
+        for _ in range(rng.randint(0, scans_per_patient))
+    ]
+    db.add_all(scans)
+    db.flush()
+
+    for scan in scans:
+        if rng.random() < report_ratio:
+            db.add(Report(scan_id=scan.id, radiologist_name="AI Agent",
+                          full_text="No acute findings.", impression="No acute findings."))
+        else:
+            db.add(AnalysisJob(scan_id=scan.id, file_path="/reports/bench.png", patient_mrn="BENCH",
+                               status=rng.choice(["queued", "running", "failed"])))
+    db.commit()
+
+
+def count_queries(engine, fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements), elapsed, result
+
+
+def worklist_rows(db):
+    stored = db.execute(select(*PatientWorklist.__table__.c).order_by(PatientWorklist.patient_id)).all()
+    expected = db.execute(worklist_statement().order_by(None)).all()
+    return [tuple(row) for row in stored], sorted(tuple(row) for row in expected)
+
+
+def check_incremental(Session):
+    """ORM writes keep the worklist equal to a full recomputation"""
+    db = Session()
+    patient = db.query(Patient).order_by(Patient.id.desc()).first()
+    scan = Scan(patient_id=patient.id, file_url="/reports/new.png", body_part="CHEST",
+                scan_date=datetime.utcnow() + timedelta(days=1))
+    db.add(scan)
+    db.commit()
+    job = AnalysisJob(scan_id=scan.id, file_path="/reports/new.png", patient_mrn=patient.mrn, status="queued")
+    db.add(job)
+    db.commit()
+    job.status = "failed"
+    db.commit()
+    db.add(Report(scan_id=scan.id, radiologist_name="AI Agent", full_text="Clear.", impression="Clear."))
+    patient.name = "Renamed Patient"
+    db.commit()
+    new_patient = Patient(mrn="BENCH.NEW", name="New", age=40, gender="Female")
+    db.add(new_patient)
+    db.commit()
+    db.delete(db.query(Patient).order_by(Patient.id).first())
+    db.commit()
+
+    stored, expected = worklist_rows(db)
+    db.close()
+    return stored == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Patient list benchmark on the worklist table")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000, 100000])
+    parser.add_argument("--target-ms", type=float, default=10.0, help="Per-page latency target")
+    args = parser.parse_args()
+
+    failures = []
+    for size in args.sizes:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        with worklist_suspended(db):
+            seed(db, size)
+        start = time.perf_counter()
+        rebuild_worklist(db)
+        db.commit()
+        rebuild_seconds = time.perf_counter() - start
+
+        middle = db.execute(select(PatientWorklist.patient_id).order_by(PatientWorklist.patient_id)
+                            .offset(size // 2).limit(1)).scalar()
+        deep_cursor = encode_cursor({"id": middle})
+
+        pages = {
+            "first page": lambda: list_patients(db, limit=PAGE_SIZE),
+            "deep page": lambda: list_patients(db, limit=PAGE_SIZE, cursor=deep_cursor),
+            "status=Failed": lambda: list_patients(db, limit=PAGE_SIZE, status="Failed"),
+        }
+        timings = []
+        for name, fn in pages.items():
+            fn()  # warm up
+            queries, elapsed, (rows, _) = count_queries(engine, fn)
+            timings.append(f"{name} {elapsed * 1000:.2f} ms")
+            if queries != 1 or elapsed * 1000 > args.target_ms or not rows:
+                failures.append(f"{size} patients, {name}: {queries} queries, {elapsed * 1000:.2f} ms, {len(rows)} rows")
+        print(f"{size:>7} patients: rebuild {rebuild_seconds:.2f}s; " + "; ".join(timings))
+
+        stored, expected = worklist_rows(db)
+        db.close()
+        if stored != expected:
+            failures.append(f"{size} patients: rebuilt worklist differs from the source tables")
+        if not check_incremental(Session):
+            failures.append(f"{size} patients: worklist out of date after ORM writes")
+        engine.dispose()
+
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print(f"✅ One statement per page, within {args.target_ms} ms, worklist consistent")
+
+
+if __name__ == "__main__":
+    main()
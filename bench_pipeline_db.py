@@ -0,0 +1,137 @@
+"""
+Database round trips per scan for the agent pipeline.
+Seeds an in-memory SQLite database, then replays what one pipeline run does
+against it (retriever: details + history, pdf_generator: details + store_report)
+through a single PipelineData and reports the round trips per step.
+Also checks that a warm cache hit issues no statements, and that cached patient
+context is not served past PATIENT_CACHE_VALIDATE_SECONDS after another process
+(which can only invalidate its own cache) adds a report for the patient.
+
+Usage:
+    python bench_pipeline_db.py --history 12
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.models import Base, Patient, Scan, Report
+from agent_graph.real_database import PipelineData
+from agent_graph.patient_cache import PatientContextCache, CACHE_CONFIG
+
+# Upper bounds per step: one joined read (or a version check on a cache hit older than
+# PATIENT_CACHE_VALIDATE_SECONDS), then scan + report inserts, the
+# patients.context_version bump and the commit
+MAX_RETRIEVER_ROUND_TRIPS = 1
+MAX_RUN_ROUND_TRIPS = 5
+
+
+def seed(Session, num_reports):
+    db = Session()
+    patient = Patient(mrn="BENCH.1", name="Bench Patient", age=54, gender="Female")
+    db.add(patient)
+    db.flush()
+    for i in range(num_reports):
+        scan = Scan(patient_id=patient.id, file_url=f"/reports/bench_{i}.png", body_part="CHEST",
+                    scan_date=datetime.utcnow() - timedelta(days=30 * i))
+        db.add(scan)
+        db.flush()
+        db.add(Report(scan_id=scan.id, radiologist_name="AI Agent",
+                      full_text=f"Report {i}", impression=f"Impression {i}"))
+    db.commit()
+    patient_pk = patient.id
+    db.close()
+    return patient_pk
+
+
+def run_pipeline(Session, patient_id):
+    data = PipelineData(patient_id, session_factory=Session)
+
+    # retriever node
+    details = data.get_details()
+    history = data.get_history()
+    retriever_round_trips = data.round_trips
+    data.close()  # review interrupt
+
+    # pdf_generator node after approval
+    data.get_details()
+    stored = data.store_report("Findings: clear lungs.\n\nImpression: No acute disease.", "/reports/bench_new.png")
+    data.close()
+    return details, history, stored, retriever_round_trips, data.round_trips
+
+
+def check_warm_hit(Session, patient_id) -> bool:
+    """A second scan of the same patient within the validation interval never touches the database"""
+    PipelineData(patient_id, session_factory=Session).get_history()
+    data = PipelineData(patient_id, session_factory=Session)
+    data.get_details()
+    data.get_history()
+    data.close()
+    print(f"warm hit: cache_hit={data.cache_hit}, retriever={data.round_trips} statements")
+    return data.cache_hit and data.round_trips == 0
+
+
+def check_cross_process_write(Session, patient_id) -> bool:
+    """A report written elsewhere, without invalidating this process's cache, must show up"""
+    data = PipelineData(patient_id, session_factory=Session)
+    before = data.get_history()
+    data.close()
+
+    db = Session()
+    patient = db.query(Patient).filter(Patient.mrn == patient_id).one()
+    scan = Scan(patient_id=patient.id, file_url="/reports/other_process.png", body_part="CHEST",
+                scan_date=datetime.utcnow() + timedelta(days=1))
+    db.add(scan)
+    db.flush()
+    db.add(Report(scan_id=scan.id, radiologist_name="Other Worker", full_text="Impression: New effusion.",
+                  impression="New effusion."))
+    db.commit()
+    db.close()
+
+    # Once the validation interval has passed (here: immediately) the entry is re-checked
+    validate_seconds, CACHE_CONFIG['validate_seconds'] = CACHE_CONFIG['validate_seconds'], 0
+    stale_before = PatientContextCache().stale
+    data = PipelineData(patient_id, session_factory=Session)
+    after = data.get_history()
+    trips = data.round_trips
+    data.close()
+    CACHE_CONFIG['validate_seconds'] = validate_seconds
+    fresh = "New effusion." in after and "New effusion." not in before
+    print(f"cross-process write: history refreshed={fresh}, stale entries dropped="
+          f"{PatientContextCache().stale - stale_before}, retriever={trips} round trips")
+    return fresh
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline database round trips per scan")
+    parser.add_argument("--history", type=int, default=12, help="Past reports for the seeded patient")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    patient_pk = seed(Session, args.history)
+
+    failed = False
+    for label, patient_id in (("by MRN", "BENCH.1"), ("by id", str(patient_pk)), ("new patient", "NEW.42")):
+        details, history, stored, retriever_trips, run_trips = run_pipeline(Session, patient_id)
+        print(f"{label:<12} patient={details['name']!r:<18} history lines={history.count('Findings:')} "
+              f"stored={stored} retriever={retriever_trips} round trips, whole run={run_trips}")
+        limit = MAX_RUN_ROUND_TRIPS + (1 if label == "new patient" else 0)  # + patient insert
+        if retriever_trips > MAX_RETRIEVER_ROUND_TRIPS or run_trips > limit or not stored:
+            failed = True
+
+    if failed:
+        raise SystemExit("❌ Pipeline issued more database round trips than expected")
+    if not check_warm_hit(Session, "BENCH.1"):
+        raise SystemExit("❌ Warm patient context cache hit still queried the database")
+    if not check_cross_process_write(Session, "BENCH.1"):
+        raise SystemExit("❌ Cached patient context served after another process wrote a report")
+    print("✅ Round trips per scan within bounds, warm hits skip the database, "
+          "cached context follows writes from other processes")
+
+
+if __name__ == "__main__":
+    main()
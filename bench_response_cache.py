@@ -0,0 +1,138 @@
+"""
+Report answer cache check (agent_graph/response_cache.py) through the chat routes,
+against the stub OpenAI-compatible server from bench_llm_client.py:
+replays a question mix with repeats and trivially different spellings, and
+compares LLM calls and latency with and without the cache. Also checks that
+editing the report (invalidate_report_answers or changed text) forces a fresh
+answer, and exercises the semantic tier for paraphrases.
+
+The semantic tier normally embeds questions with BiomedCLIP; here a bag-of-words
+embedder is plugged in so the check runs without the model.
+
+Usage:
+    python bench_response_cache.py --questions 200 --llm-delay 0.05
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+import zlib
+
+import numpy as np
+
+from agent_graph.response_cache import ReportAnswerCache, invalidate_report_answers
+from agent_graph.tools.llm_tools import answer_text_question_async, LLM_ERROR_MESSAGES
+from bench_llm_client import start_stub, fresh_client
+
+CONTEXT = "Findings: mild cardiomegaly.\nImpression: Enlarged cardiac silhouette."
+QUESTIONS = ["Is this normal?", "What is cardiomegaly?", "Should I be worried?",
+             "What does the impression mean?", "Do I need a follow-up scan?"]
+PARAPHRASES = {"Is this normal?": "is this really normal", "What is cardiomegaly?": "cardiomegaly - what is it?"}
+
+
+def spelling_variant(question, rng):
+    """Same question as users actually type it: case, spacing, punctuation"""
+    variant = question.lower() if rng.random() < 0.5 else question.upper()
+    return ("  " + variant.rstrip("?") + " ?? ") if rng.random() < 0.5 else variant
+
+
+def bag_of_words(questions):
+    vectors = np.zeros((len(questions), 256))
+    for row, question in enumerate(questions):
+        for word in re.findall(r"\w+", question.lower()):
+            vectors[row, zlib.crc32(word.encode()) % 256] += 1
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+async def ask(report_id, question, use_cache):
+    """What POST /api/chat does"""
+    cache = ReportAnswerCache()
+    if use_cache:
+        answer = cache.get(report_id, CONTEXT, question)
+        if answer is not None:
+            return answer
+    answer = await answer_text_question_async(CONTEXT, question)
+    if use_cache and answer not in LLM_ERROR_MESSAGES:
+        cache.set(report_id, CONTEXT, question, answer)
+    return answer
+
+
+def fresh_cache(semantic=False):
+    ReportAnswerCache._instance = None
+    cache = ReportAnswerCache()
+    if semantic:
+        from agent_graph.response_cache import SemanticIndex
+        cache.semantic = SemanticIndex(100, 16)
+        cache.embedder = bag_of_words
+        cache.similarity = 0.8
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report answer cache benchmark")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--llm-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stub = start_stub()
+    state = stub.state
+    fresh_client(f"http://127.0.0.1:{stub.server_address[1]}/v1")
+    rng = random.Random(0)
+    workload = [(rng.randint(1, 3), spelling_variant(rng.choice(QUESTIONS), rng)) for _ in range(args.questions)]
+    failures = []
+
+    def check(condition, message):
+        print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    async def replay(use_cache):
+        state.reset(delay=args.llm_delay)
+        start = time.perf_counter()
+        for report_id, question in workload:
+            await ask(report_id, question, use_cache)
+        return state.requests, time.perf_counter() - start
+
+    async def run():
+        fresh_cache()
+        baseline_calls, baseline_s = await replay(use_cache=False)
+        cached_calls, cached_s = await replay(use_cache=True)
+        stats = ReportAnswerCache().stats()
+        distinct = len({(report_id, q.lower().strip(" ?")) for report_id, q in workload})
+        print(f"Without cache: {baseline_calls} LLM calls, {baseline_s:.2f}s; "
+              f"with cache: {cached_calls} LLM calls, {cached_s:.2f}s, hit rate {stats['hit_rate']}")
+        check(cached_calls == distinct, f"one LLM call per distinct question and report ({distinct})")
+
+        # Editing the report text, or update_report's invalidation, must not serve the old answer
+        state.reset()
+        cache = ReportAnswerCache()
+        await ask(1, "Is this normal?", True)
+        cache_hit_before = state.requests == 0
+        invalidate_report_answers(1)
+        await ask(1, "Is this normal?", True)
+        edited = cache.get(1, CONTEXT + " Addendum: resolved.", "Is this normal?")
+        check(cache_hit_before and state.requests == 1 and edited is None,
+              "invalidation and edited text both force a fresh answer")
+
+        # Semantic tier
+        cache = fresh_cache(semantic=True)
+        for question in PARAPHRASES:
+            await ask(1, question, True)
+        state.reset()
+        for paraphrase in PARAPHRASES.values():
+            await ask(1, paraphrase, True)
+        unrelated = cache.get(1, CONTEXT, "When is my next appointment?")
+        stats = cache.stats()
+        check(state.requests == 0 and stats["semantic_hits"] == len(PARAPHRASES) and unrelated is None,
+              f"paraphrases answered by the semantic tier ({stats['semantic_hits']} hits), unrelated question missed")
+
+    asyncio.run(run())
+    stub.shutdown()
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print("✅ Report answer cache: repeat questions skip the LLM, edits invalidate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Checks for the pipeline result cache (agent_graph/result_cache.py), no models needed.
+Stores synthetic analysis/CAM/region entries keyed like the agent nodes do, then checks
+that identical inputs hit and any changed input (image bytes, model versions,
+label set) misses, that entries survive the round trip, and that eviction keeps
+the directory under its size budget (least recently used first) and drops
+expired entries. Also times lookups against the target.
+
+Usage:
+    python bench_result_cache.py --entries 200 --max-mb 2 --target-ms 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from agent_graph.result_cache import PipelineResultCache, make_key, file_sha256
+
+LABELS = ["normal chest x-ray", "pneumonia", "pleural effusion"]
+VERSIONS = {"chexnet": "densenet121-imagenet", "clip": "biomedclip", "xray_max_side": 2048}
+
+
+def fresh_cache(directory, max_bytes, ttl_seconds):
+    PipelineResultCache._instance = None
+    cache = PipelineResultCache()
+    cache.cache_dir = directory
+    cache.max_bytes = max_bytes
+    cache.ttl_seconds = ttl_seconds
+    cache.enabled = True
+    return cache
+
+
+def synthetic_entry(rng):
+    pathologies = {label: {"probability": float(p), "detected": bool(p > 0.5)}
+                   for label, p in zip(["Atelectasis", "Effusion"], rng.random(2))}
+    cams = {"Atelectasis": rng.random((7, 7)).astype(np.float32),
+            "Effusion": rng.random((7, 7)).astype(np.float32)}
+    regions = {"Atelectasis": [{"region_id": 1, "centroid": (np.float64(10.5), np.float64(20.0)),
+                                "area": np.int64(400), "bbox": (1, 2, 30, 40)}]}
+    return pathologies, cams, regions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline result cache checks")
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--max-mb", type=float, default=2.0)
+    parser.add_argument("--target-ms", type=float, default=5.0, help="Per-lookup latency target")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = fresh_cache(directory, int(args.max_mb * 1024 * 1024), ttl_seconds=3600)
+
+        image_path = os.path.join(directory, "film.png")
+        with open(image_path, "wb") as f:
+            f.write(rng.bytes(256 * 1024))
+        image_sha = file_sha256(image_path)
+        key = make_key(image=image_sha, models=VERSIONS, clip_labels=LABELS)
+
+        pathologies, cams, regions = synthetic_entry(rng)
+        if cache.get("analysis", key) is not None:
+            failures.append("empty cache returned a hit")
+        cache.set("analysis", key, {"pathologies": pathologies, "clip_scores": {"pneumonia": 0.3}})
+        cache.set("regions", key, regions, cams)
+
+        meta, _ = cache.get("analysis", key)
+        region_meta, cached_cams = cache.get("regions", key)
+        if meta["pathologies"] != pathologies:
+            failures.append("pathologies changed in the round trip")
+        if any(not np.array_equal(cached_cams[name], cams[name]) for name in cams):
+            failures.append("CAM maps changed in the round trip")
+        if region_meta["Atelectasis"][0]["bbox"] != [1, 2, 30, 40]:
+            failures.append("region analysis changed in the round trip")
+
+        with open(image_path, "ab") as f:
+            f.write(b"\0")
+        variants = {
+            "image bytes": make_key(image=file_sha256(image_path), models=VERSIONS, clip_labels=LABELS),
+            "model versions": make_key(image=image_sha, models={**VERSIONS, "chexnet": "finetuned"},
+                                       clip_labels=LABELS),
+            "label set": make_key(image=image_sha, models=VERSIONS, clip_labels=LABELS[:2]),
+        }
+        for name, variant in variants.items():
+            if cache.get("analysis", variant) is not None:
+                failures.append(f"changed {name} still hit the cache")
+
+        # Lookup latency
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.get("regions", key)
+        lookup_ms = (time.perf_counter() - start) * 10
+        print(f"Lookup: {lookup_ms:.2f} ms per entry with CAMs")
+        if lookup_ms > args.target_ms:
+            failures.append(f"lookup took {lookup_ms:.2f} ms (target {args.target_ms} ms)")
+
+        # Size eviction: keep touching the first entry so it stays most recently used
+        for i in range(args.entries):
+            cache.set("regions", make_key(image=i), regions, {"big": rng.random((128, 128))})
+            cache.get("regions", key)
+            time.sleep(0.001)
+        stats = cache.stats()
+        print(f"After {args.entries} writes: {stats['entries']} entries, "
+              f"{stats['size_bytes'] / 1024 / 1024:.2f} MB of {args.max_mb} MB, {stats['evictions']} evictions")
+        if stats["size_bytes"] > cache.max_bytes:
+            failures.append("cache directory over its size budget")
+        if not stats["evictions"]:
+            failures.append("nothing was evicted")
+        if cache.get("regions", key) is None:
+            failures.append("recently used entry was evicted")
+        if cache.get("regions", make_key(image=0)) is not None:
+            failures.append("least recently used entry survived eviction")
+
+        # Age eviction
+        cache.ttl_seconds = 0.05
+        time.sleep(0.1)
+        if cache.get("analysis", key) is not None:
+            failures.append("expired entry was returned")
+        cache.evict()
+        if cache.stats()["entries"]:
+            failures.append("expired entries survived eviction")
+
+        stats = cache.stats()
+        print(f"Counters: {stats['hits']} hits / {stats['misses']} misses, per stage {stats['stages']}")
+        if not stats["stages"].get("analysis", {}).get("hits") or not stats["stages"]["analysis"]["misses"]:
+            failures.append("per-stage hit/miss counters not recorded")
+
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print("✅ Result cache: hits on identical inputs, misses on changed ones, evicts by size and age")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+export default function LoadMoreButton({ nextCursor, onLoadMore }) {
+  if (!nextCursor) return null
+
+  return (
+    <div className="flex justify-center py-4">
+      <button
+        onClick={() => onLoadMore(nextCursor)}
+        className="px-4 py-2 bg-slate-200 text-slate-800 rounded-lg hover:bg-slate-300 transition text-sm font-medium"
+      >
+        Load more
+      </button>
+    </div>
+  )
+}
@@ -3,6 +3,8 @@ import { useNavigate } from 'react-router-dom'
 import { Search, Plus, Edit, Trash2, Users, ChevronDown, LogOut, Upload, FileText, Layout, Database, Activity, FileImage, Menu } from 'lucide-react'
 import { useAuth } from '../context/AuthContext'
 import toast from 'react-hot-toast'
+import LoadMoreButton from '../components/LoadMoreButton'
+import { fetchPage, mergePage } from '../utils/pagination'
 
 export default function LabAdminDashboard() {
   const navigate = useNavigate()
@@ -16,6 +18,8 @@ export default function LabAdminDashboard() {
   const [patients, setPatients] = useState([])
   const [scans, setScans] = useState([])
   const [reports, setReports] = useState([])
+  // X-Next-Cursor of each list; null once the last page is loaded
+  const [nextCursors, setNextCursors] = useState({ patients: null, scans: null, reports: null })
 
   // Patient CRUD State
   const [editingPatient, setEditingPatient] = useState(null)
@@ -34,30 +38,33 @@ export default function LabAdminDashboard() {
     if (activeTab === 'reports') fetchReports()
   }, [activeTab])
 
-  async function fetchPatients() {
+  async function fetchList(key, url, setItems, cursor) {
+    const { items, nextCursor } = await fetchPage(url, cursor)
+    setItems(current => mergePage(current, items, cursor))
+    setNextCursors(current => ({ ...current, [key]: nextCursor }))
+  }
+
+  async function fetchPatients(cursor) {
     try {
-      const response = await fetch('http://localhost:8000/api/patients')
-      if (response.ok) setPatients(await response.json())
+      await fetchList('patients', 'http://localhost:8000/api/patients', setPatients, cursor)
     } catch (error) {
       console.error('Error fetching patients:', error)
       toast.error('Failed to load patients')
     }
   }
 
-  async function fetchScans() {
+  async function fetchScans(cursor) {
     try {
-      const response = await fetch('http://localhost:8000/api/scans')
-      if (response.ok) setScans(await response.json())
+      await fetchList('scans', 'http://localhost:8000/api/scans', setScans, cursor)
     } catch (error) {
       console.error('Error fetching scans:', error)
       toast.error('Failed to load scans')
     }
   }
 
-  async function fetchReports() {
+  async function fetchReports(cursor) {
     try {
-      const response = await fetch('http://localhost:8000/api/reports')
-      if (response.ok) setReports(await response.json())
+      await fetchList('reports', 'http://localhost:8000/api/reports?fields=id,patientName,patientId,radiologist,status,date,pdf_url', setReports, cursor)
     } catch (error) {
       console.error('Error fetching reports:', error)
       toast.error('Failed to load reports')
@@ -151,7 +158,12 @@ export default function LabAdminDashboard() {
         body: formData
       })
       if (response.ok) {
-        toast.success('X-ray uploaded successfully. Analysis started.')
+        const result = await response.json()
+        if (result.status === 'duplicate') {
+          toast('This X-ray was already uploaded for the patient. Using the existing analysis.')
+        } else {
+          toast.success('X-ray uploaded successfully. Analysis started.')
+        }
         setUploadingPatient(null)
         fetchPatients()
       } else {
@@ -403,6 +415,7 @@ export default function LabAdminDashboard() {
                 </tbody>
               </table>
             )}
+            {activeTab === 'patients' && <LoadMoreButton nextCursor={nextCursors.patients} onLoadMore={fetchPatients} />}
 
             {activeTab === 'scans' && (
               <table className="w-full">
@@ -435,6 +448,7 @@ export default function LabAdminDashboard() {
                 </tbody>
               </table>
             )}
+            {activeTab === 'scans' && <LoadMoreButton nextCursor={nextCursors.scans} onLoadMore={fetchScans} />}
 
             {activeTab === 'reports' && (
               <table className="w-full">
@@ -476,6 +490,7 @@ export default function LabAdminDashboard() {
                 </tbody>
               </table>
             )}
+            {activeTab === 'reports' && <LoadMoreButton nextCursor={nextCursors.reports} onLoadMore={fetchReports} />}
           </div>
         </div>
       </main>
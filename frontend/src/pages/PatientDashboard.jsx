@@ -3,6 +3,8 @@ import { useNavigate } from 'react-router-dom'
 import { FileText, Calendar, User, Eye, ChevronRight, LogOut, ChevronDown, Edit, X } from 'lucide-react'
 import { useAuth } from '../context/AuthContext'
 import toast from 'react-hot-toast'
+import LoadMoreButton from '../components/LoadMoreButton'
+import { fetchPage, mergePage } from '../utils/pagination'
 
 // Sample patient reports data
 
@@ -23,6 +25,7 @@ export default function PatientDashboard() {
   })
 
   const [patientReports, setPatientReports] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
 
   useEffect(() => {
     if (user?.name) {
@@ -30,27 +33,27 @@ export default function PatientDashboard() {
     }
   }, [user])
 
-  async function fetchReports() {
+  async function fetchReports(cursor) {
     try {
-      const response = await fetch('http://localhost:8000/api/reports')
-      if (response.ok) {
-        const allReports = await response.json()
-        // Filter reports for the logged-in patient (by name)
-        const myReports = allReports.filter(r =>
-          r.patientName.toLowerCase() === user.name.toLowerCase()
-        ).map(r => ({
-          id: r.id,
-          reportNumber: `RPT-${r.id.toString().padStart(4, '0')}`,
-          title: `${r.scan?.body_part || 'Chest'} X-Ray Report`,
-          date: r.date,
-          time: r.time,
-          doctor: r.radiologist,
-          diagnosis: r.findings.substring(0, 50) + (r.findings.length > 50 ? '...' : ''),
-          status: r.status || 'Final',
-          pdf_url: r.pdf_url
-        }))
-        setPatientReports(myReports)
-      }
+      // Reports of the logged-in patient (matched by name on the server)
+      const params = new URLSearchParams({
+        patient_name: user.name,
+        fields: 'id,patientName,date,time,radiologist,findings,status,pdf_url'
+      })
+      const { items, nextCursor } = await fetchPage(`http://localhost:8000/api/reports?${params}`, cursor)
+      const myReports = items.map(r => ({
+        id: r.id,
+        reportNumber: `RPT-${r.id.toString().padStart(4, '0')}`,
+        title: `${r.scan?.body_part || 'Chest'} X-Ray Report`,
+        date: r.date,
+        time: r.time,
+        doctor: r.radiologist,
+        diagnosis: r.findings.substring(0, 50) + (r.findings.length > 50 ? '...' : ''),
+        status: r.status || 'Final',
+        pdf_url: r.pdf_url
+      }))
+      setPatientReports(current => mergePage(current, myReports, cursor))
+      setNextCursor(nextCursor)
     } catch (error) {
       console.error('Error fetching reports:', error)
       toast.error('Failed to load reports')
@@ -202,6 +205,7 @@ export default function PatientDashboard() {
             </div>
           ))}
         </div>
+        <LoadMoreButton nextCursor={nextCursor} onLoadMore={fetchReports} />
 
         {/* Empty State */}
         {patientReports.length === 0 && (
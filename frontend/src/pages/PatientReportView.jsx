@@ -133,9 +133,17 @@ export default function PatientReportView() {
     setChatInput('')
     setIsTyping(true)
 
-    // Call backend chat API
+    // Call backend chat API; tokens are streamed (server-sent events) into the reply as they arrive
+    const aiId = Date.now() + 1
+    const setAiText = (text) => setChatMessages(prev => {
+      const aiResponse = { id: aiId, role: 'ai', text, timestamp: new Date().toLocaleTimeString() }
+      return prev.some(m => m.id === aiId)
+        ? prev.map(m => (m.id === aiId ? aiResponse : m))
+        : [...prev, aiResponse]
+    })
+
     try {
-      const response = await fetch('http://localhost:8000/api/chat', {
+      const response = await fetch('http://localhost:8000/api/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -146,33 +154,45 @@ export default function PatientReportView() {
         }),
       })
 
-      let aiText = "I'm sorry, I couldn't process your request."
-
-      if (response.ok) {
-        const data = await response.json()
-        aiText = data.answer
-      } else {
+      if (!response.ok || !response.body) {
         // Fallback to local logic if backend fails
         console.warn("Backend chat failed, using local fallback")
-        aiText = generateAIResponse(chatInput, report)
+        setAiText(generateAIResponse(chatInput, report))
+        return
       }
 
-      const aiResponse = {
-        id: Date.now() + 1,
-        role: 'ai',
-        text: aiText,
-        timestamp: new Date().toLocaleTimeString()
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let aiText = ''
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const events = buffer.split('\n\n')
+        buffer = events.pop()
+        for (const rawEvent of events) {
+          const lines = rawEvent.split('\n')
+          const eventName = (lines.find(l => l.startsWith('event:')) || 'event: token').slice(6).trim()
+          const dataLine = lines.find(l => l.startsWith('data:'))
+          if (!dataLine) continue
+          const data = JSON.parse(dataLine.slice(5))
+          if (eventName === 'token') {
+            aiText += data.token
+            setIsTyping(false)
+            setAiText(aiText)
+          } else if (eventName === 'error') {
+            aiText = data.message
+            setAiText(aiText)
+          }
+        }
+      }
+      if (!aiText) {
+        setAiText("I'm sorry, I couldn't process your request.")
       }
-      setChatMessages(prev => [...prev, aiResponse])
     } catch (error) {
       console.error("Chat error:", error)
-      const aiResponse = {
-        id: Date.now() + 1,
-        role: 'ai',
-        text: "I'm having trouble connecting to the server. " + generateAIResponse(chatInput, report),
-        timestamp: new Date().toLocaleTimeString()
-      }
-      setChatMessages(prev => [...prev, aiResponse])
+      setAiText("I'm having trouble connecting to the server. " + generateAIResponse(chatInput, report))
     } finally {
       setIsTyping(false)
     }
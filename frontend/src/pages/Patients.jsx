@@ -2,10 +2,13 @@ import { useState, useEffect } from 'react'
 import { Search, Plus, Edit, Trash2, Eye, Users, FileText } from 'lucide-react'
 import toast from 'react-hot-toast'
 import { useNavigate } from 'react-router-dom'
+import LoadMoreButton from '../components/LoadMoreButton'
+import { fetchPage, mergePage } from '../utils/pagination'
 
 export default function Patients() {
   const navigate = useNavigate()
   const [patients, setPatients] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [searchTerm, setSearchTerm] = useState('')
   const [editingPatient, setEditingPatient] = useState(null)
   const [isAddingNew, setIsAddingNew] = useState(false)
@@ -14,13 +17,11 @@ export default function Patients() {
     fetchPatients()
   }, [])
 
-  async function fetchPatients() {
+  async function fetchPatients(cursor) {
     try {
-      const response = await fetch('http://localhost:8000/api/patients')
-      if (response.ok) {
-        const data = await response.json()
-        setPatients(data)
-      }
+      const { items, nextCursor } = await fetchPage('http://localhost:8000/api/patients', cursor)
+      setPatients(current => mergePage(current, items, cursor))
+      setNextCursor(nextCursor)
     } catch (error) {
       console.error('Error fetching patients:', error)
       toast.error('Failed to load patients')
@@ -73,7 +74,7 @@ export default function Patients() {
 
         if (response.ok) {
           const newPatient = await response.json()
-          setPatients([...patients, newPatient])
+          setPatients([newPatient, ...patients])
           toast.success('Patient added')
         } else {
           toast.error('Failed to add patient')
@@ -128,6 +129,8 @@ export default function Patients() {
     const colors = {
       'Ready': 'bg-green-100 text-green-800',
       'Processing': 'bg-blue-100 text-blue-800',
+      'Queued': 'bg-indigo-100 text-indigo-800',
+      'Failed': 'bg-red-100 text-red-800',
       'None': 'bg-gray-100 text-gray-500'
     }
     return colors[status] || 'bg-gray-100 text-gray-500'
@@ -139,7 +142,7 @@ export default function Patients() {
         <div className="mb-6 flex items-center justify-between">
           <div>
             <h2 className="text-2xl font-bold text-gray-800">Patient Database</h2>
-            <p className="text-sm text-gray-500 mt-1">{filteredPatients.length} patient records</p>
+            <p className="text-sm text-gray-500 mt-1">{filteredPatients.length} patient records{nextCursor ? ' loaded' : ''}</p>
           </div>
           <button
             onClick={handleAddNew}
@@ -226,6 +229,7 @@ export default function Patients() {
                   ))}
                 </tbody>
               </table>
+              <LoadMoreButton nextCursor={nextCursor} onLoadMore={fetchPatients} />
             </div>
           </div>
         </div>
@@ -2,22 +2,23 @@ import { useState, useEffect } from 'react'
 import { FileText, Download, Eye, Calendar, User } from 'lucide-react'
 import { useNavigate } from 'react-router-dom'
 import toast from 'react-hot-toast'
+import LoadMoreButton from '../components/LoadMoreButton'
+import { fetchPage, mergePage } from '../utils/pagination'
 
 export default function Reports() {
   const navigate = useNavigate()
   const [reports, setReports] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
 
   useEffect(() => {
     fetchReports()
   }, [])
 
-  async function fetchReports() {
+  async function fetchReports(cursor) {
     try {
-      const response = await fetch(`http://localhost:8000/api/reports?t=${Date.now()}`)
-      if (response.ok) {
-        const data = await response.json()
-        setReports(data)
-      }
+      const { items, nextCursor } = await fetchPage(`http://localhost:8000/api/reports?fields=id,patientName,patientId,status,date,time,radiologist,diagnosis,findings,confidence&t=${Date.now()}`, cursor)
+      setReports(current => mergePage(current, items, cursor))
+      setNextCursor(nextCursor)
     } catch (error) {
       console.error('Error fetching reports:', error)
       toast.error('Failed to load reports')
@@ -103,6 +104,7 @@ export default function Reports() {
               </div>
             </div>
           ))}
+          <LoadMoreButton nextCursor={nextCursor} onLoadMore={fetchReports} />
         </div>
       </div>
     </div>
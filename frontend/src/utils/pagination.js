@@ -0,0 +1,15 @@
+// List endpoints return one page at a time (server default LIST_DEFAULT_LIMIT);
+// the cursor for the next page comes back in the X-Next-Cursor header.
+export async function fetchPage(url, cursor) {
+  const pageUrl = new URL(url)
+  if (cursor) pageUrl.searchParams.set('cursor', cursor)
+  const response = await fetch(pageUrl)
+  if (!response.ok) throw new Error(`Request failed with status ${response.status}`)
+  return {
+    items: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor')
+  }
+}
+
+// Replaces the list for the first page, appends for later ones
+export const mergePage = (current, items, cursor) => (cursor ? [...current, ...items] : items)
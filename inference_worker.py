@@ -0,0 +1,255 @@
+"""
+Inference worker pool for scan analysis
+Each worker process holds its own ModelManager and pulls jobs from the durable
+analysis_jobs queue, so Torch inference never competes with the API process.
+
+Usage:
+    python inference_worker.py --workers 4 --jobs-per-worker 2
+
+server.py starts INFERENCE_WORKERS of these processes itself; set it to 0 to run
+the pool separately (e.g. on dedicated inference nodes). Either way each process
+keeps a heartbeat row in inference_workers, and the API reports ready
+(/api/health/ready) while at least one of them has its models loaded.
+"""
+import os
+import time
+import uuid
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.database import SessionLocal
+from backend.models import Scan, Report
+from agent_graph.real_database import close_pipeline_data
+from agent_graph.patient_cache import PatientContextCache, invalidate_patient
+from agent_graph.result_cache import PipelineResultCache
+from backend.job_queue import (
+    JOB_CONFIG, init_job_tables, claim_next_job, complete_job, fail_job, record_stage, requeue_stale_jobs,
+    worker_heartbeat, prune_workers
+)
+
+WORKER_CONFIG = {
+    'workers': int(os.getenv('INFERENCE_WORKERS', '2')),
+    # Jobs a single process runs concurrently; lets the ChexNet micro-batcher group scans
+    'jobs_per_worker': int(os.getenv('JOBS_PER_WORKER', '2')),
+    'poll_interval': float(os.getenv('WORKER_POLL_INTERVAL', '1.0')),
+    # How often an idle worker looks for jobs abandoned by crashed workers
+    'stale_check_interval': float(os.getenv('WORKER_STALE_CHECK_INTERVAL', '60')),
+}
+
+
+def run_scan_analysis(agent_app, db, scan_id: int, file_path: str, patient_mrn: str, on_stage=None):
+    """
+    Run the agent pipeline on an uploaded scan up to the review interrupt
+    and store the draft report. on_stage(node, seconds) is called after each node
+    with the time that node itself ran (nodes in parallel branches overlap).
+    """
+    thread_id = str(uuid.uuid4())
+    initial_state = {
+        "patient_id": patient_mrn,
+        "xray_image_path": os.path.abspath(file_path)
+    }
+    config = {"configurable": {"thread_id": thread_id}}
+
+    # The graph interrupts before pdf_generator; we only need the draft report
+    try:
+        for event in agent_app.stream(initial_state, config=config):
+            if on_stage:
+                for node, update in event.items():
+                    # "__interrupt__" and friends carry no update dict
+                    if not node.startswith("__") and isinstance(update, dict):
+                        on_stage(node, update["stage_timings"][node])
+    finally:
+        state = agent_app.get_state(config)
+        # Release the run's DB connection while the draft waits for review
+        close_pipeline_data(state.values.get("data_handle") if state.values else None)
+
+    current_report = state.values.get("current_report", "") if state.values else ""
+    if not current_report:
+        # Agents catch their own exceptions into state["error"]; surface it so the job is retried
+        error = state.values.get("error") if state.values else None
+        raise RuntimeError(error or "No report generated by the agent.")
+
+    scan = db.query(Scan).filter(Scan.id == scan_id).first()
+    if scan:
+        report = Report(
+            scan_id=scan.id,
+            radiologist_name="AI Agent", # Placeholder
+            full_text=current_report,
+            impression=current_report, # You might want to parse this out if possible
+            patient_history=state.values.get("patient_history"),
+            comparison_findings=state.values.get("comparison_result"),
+            ner_tags={"visualization_path": state.values.get("visualization_path")}
+        )
+        db.add(report)
+        db.commit()
+        invalidate_patient(patient_mrn, scan.patient_id)
+        print(f"Report saved for scan {scan_id}")
+
+
+def worker_thread_loop(agent_app, worker_name: str, poll_interval: float, stop_event, started_at: float):
+    first_report_logged = False
+    last_stale_check = 0.0
+    while not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db, worker_name)
+            if job is None:
+                if time.time() - last_stale_check > WORKER_CONFIG['stale_check_interval']:
+                    last_stale_check = time.time()
+                    requeued = requeue_stale_jobs(db)
+                    if requeued:
+                        print(f"[{worker_name}] Re-queued {requeued} jobs from unresponsive workers")
+                stop_event.wait(poll_interval)
+                continue
+
+            print(f"[{worker_name}] Starting analysis job {job.id} for scan {job.scan_id} "
+                  f"(attempt {job.attempts}/{job.max_attempts})...")
+            try:
+                run_scan_analysis(
+                    agent_app, db, job.scan_id, job.file_path, job.patient_mrn,
+                    on_stage=lambda node, seconds: record_stage(db, job, node, seconds)
+                )
+                complete_job(db, job)
+                cache_stats = PatientContextCache().stats()
+                result_stats = PipelineResultCache().stats()
+                print(f"[{worker_name}] Job {job.id} done; patient cache hit rate {cache_stats['hit_rate']} "
+                      f"({cache_stats['hits']} hits / {cache_stats['misses']} misses), "
+                      f"result cache hit rate {result_stats['hit_rate']} "
+                      f"({result_stats['hits']} hits / {result_stats['misses']} misses)")
+                if not first_report_logged:
+                    first_report_logged = True
+                    print(f"[{worker_name}] Cold start to first report: {time.time() - started_at:.1f}s")
+            except Exception as e:
+                print(f"[{worker_name}] Error in analysis job {job.id}: {e}")
+                db.rollback()
+                fail_job(db, job, str(e))
+        except Exception as e:
+            print(f"[{worker_name}] Queue error: {e}")
+            stop_event.wait(poll_interval)
+        finally:
+            db.close()
+
+
+def report_worker_state(worker_name: str, status=None, error=None):
+    """Write this process's inference_workers heartbeat row (read by /api/health/ready)."""
+    db = SessionLocal()
+    try:
+        if status == "loading":
+            prune_workers(db)
+        worker_heartbeat(db, worker_name, status, error)
+    except Exception as e:
+        print(f"[{worker_name}] Heartbeat failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def heartbeat_loop(worker_name: str, stop_event, interval: float):
+    while not stop_event.wait(interval):
+        report_worker_state(worker_name)
+
+
+def worker_main(worker_index: int, jobs_per_worker: int, poll_interval: float, torch_threads: int):
+    """Entry point of one worker process."""
+    started_at = time.time()
+    worker_name = f"worker-{worker_index}-pid{os.getpid()}"
+    stop_event = threading.Event()
+
+    # Heartbeats start before the models load, so a slow load reads as "loading", not dead
+    report_worker_state(worker_name, "loading")
+    threading.Thread(
+        target=heartbeat_loop,
+        args=(worker_name, stop_event, JOB_CONFIG['worker_heartbeat_seconds']),
+        name=f"{worker_name}-heartbeat",
+        daemon=True
+    ).start()
+
+    try:
+        # Heavy imports happen in the child, so importing this module to spawn the pool
+        # (server.py does) does not pull in torch
+        import torch
+        torch.set_num_threads(torch_threads)
+        from agent_graph.graph import create_graph
+        from agent_graph.tools.model_tools import ModelManager
+        from agent_graph.tools.ner_tools import NERManager
+
+        print(f"[{worker_name}] Loading models ({torch_threads} torch threads, {jobs_per_worker} concurrent jobs)...")
+        manager = ModelManager()
+        warm_ups = (manager.warm_up_chexnet, manager.warm_up_clip, NERManager().warm_up)
+        # In parallel, so cold start is bounded by the slowest model; result() re-raises a failed load
+        with ThreadPoolExecutor(max_workers=len(warm_ups), thread_name_prefix=f"{worker_name}-warm-up") as pool:
+            for future in [pool.submit(warm_up) for warm_up in warm_ups]:
+                future.result()
+
+        agent_app = create_graph()
+    except Exception as e:
+        print(f"[{worker_name}] Failed to load models: {e}")
+        report_worker_state(worker_name, "failed", str(e))
+        raise
+
+    threads = [
+        threading.Thread(
+            target=worker_thread_loop,
+            args=(agent_app, f"{worker_name}-t{i}", poll_interval, stop_event, started_at),
+            name=f"{worker_name}-t{i}",
+            daemon=True
+        )
+        for i in range(jobs_per_worker)
+    ]
+    for thread in threads:
+        thread.start()
+    report_worker_state(worker_name, "ready")
+    print(f"[{worker_name}] Ready in {time.time() - started_at:.1f}s")
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+
+
+def start_worker_pool(num_workers=None, jobs_per_worker=None, poll_interval=None):
+    """Spawn the worker processes and return them."""
+    num_workers = num_workers or WORKER_CONFIG['workers']
+    jobs_per_worker = jobs_per_worker or WORKER_CONFIG['jobs_per_worker']
+    poll_interval = poll_interval or WORKER_CONFIG['poll_interval']
+
+    # Split the cores between processes so they don't oversubscribe each other
+    torch_threads = max(1, (os.cpu_count() or 1) // num_workers)
+    ctx = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(num_workers):
+        process = ctx.Process(
+            target=worker_main,
+            args=(i, jobs_per_worker, poll_interval, torch_threads),
+            name=f"inference-worker-{i}",
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+    print(f"Started {num_workers} inference worker processes")
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan analysis inference worker pool")
+    parser.add_argument("--workers", type=int, default=WORKER_CONFIG['workers'])
+    parser.add_argument("--jobs-per-worker", type=int, default=WORKER_CONFIG['jobs_per_worker'])
+    parser.add_argument("--poll-interval", type=float, default=WORKER_CONFIG['poll_interval'])
+    args = parser.parse_args()
+
+    init_job_tables()
+    processes = start_worker_pool(max(1, args.workers), args.jobs_per_worker, args.poll_interval)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("Stopping inference workers...")
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
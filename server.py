@@ -2,31 +2,74 @@ import os
 import shutil
 import uuid
 import json
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Response, Request
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load .env before the agent_graph imports: its modules read their settings at import time
+load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
 
-# Import our agent graph
-from agent_graph.graph import create_graph
 from agent_graph.tools.feedback_tools import save_feedback_data
 
 app = FastAPI(title="Radiologist Copilot API")
 
+# Startup / readiness bookkeeping, reported by /api/health
+STARTUP_STATUS = {
+    "started_at": time.time(),
+    # Models loaded in the API process itself (see preload_models); queued scans run in the workers
+    "models": {"chexnet": "pending", "clip": "pending", "ner": "pending"},
+    "preload_seconds": None,
+    "first_report_seconds": None,
+    "workers": []
+}
+
+# Queued analyses beyond this are rejected with 503 instead of piling up
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "100"))
+
+# Page sizes for the list endpoints; the keyset cursor of the next page is returned in
+# X-Next-Cursor, so list views page through the archive instead of loading all of it
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "500"))
+
 # Database imports
-from backend.database import get_db
-from backend.models import Patient, Scan, Report
-from backend.storage import upload_to_cloud, upload_local_file
+from backend.database import get_db, get_async_db, get_db_session, engine
+from backend.models import Patient, Scan, Report, AnalysisJob
+from backend.job_queue import (
+    init_job_tables, enqueue_analysis, queue_depth, queue_stats,
+    latest_job_for_scan, job_to_dict, redrive_failed_jobs, worker_status
+)
+from backend.bulk_import import IMPORT_CONFIG, import_records, read_records, detect_format
+from backend.queries import list_patients, list_scans, list_reports
+from backend.migrate import upgrade_database
+from backend.storage import upload_local_file, stage_stream
+from backend.chat_stream import answer_events
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
 from fastapi import Depends
 
-# Import tools for report finalization
+# Import tools for report finalization. The agent graph, ModelManager and NER (torch,
+# open_clip, transformers) are imported where they are used, so the API starts without them.
 from agent_graph.tools.pdf_tools import generate_pdf_report
-from agent_graph.tools.ner_tools import NERManager, extract_ner_entities
-from agent_graph.tools.llm_tools import answer_text_question
+from agent_graph.tools.llm_tools import answer_text_question_async, LLM_ERROR_MESSAGES, MISSING_INPUT_MESSAGE
+from agent_graph.tools.llm_client import LLMClient
+from agent_graph.real_database import close_pipeline_data
+from agent_graph.patient_cache import PatientContextCache, invalidate_patient
+from agent_graph.result_cache import PipelineResultCache
+from agent_graph.response_cache import ReportAnswerCache, invalidate_report_answers
+from inference_worker import start_worker_pool
 
 # Pydantic models for Patient
 class PatientCreate(BaseModel):
@@ -45,47 +88,32 @@ class PatientUpdate(BaseModel):
     status: Optional[str] = None
     assignedTo: Optional[str] = None
 
+async def paged_response(response: Response, db: AsyncSession, list_fn, **params):
+    """Run a list query; the next keyset cursor goes in the X-Next-Cursor header"""
+    try:
+        # run_sync reuses the set-based sync queries on the async connection
+        rows, next_cursor = await db.run_sync(list_fn, **params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
 @app.get("/api/patients")
-def get_patients(db: Session = Depends(get_db)):
-    # Eager load scans to check status
-    patients = db.query(Patient).options(joinedload(Patient.scans)).all()
-    
-    result = []
-    for p in patients:
-        # Determine scan status
-        # Determine scan status
-        scan_status = "None"
-        report_id = None
-        if p.scans:
-            # Sort scans by ID (newest first) to avoid timezone issues
-            sorted_scans = sorted(p.scans, key=lambda s: s.id, reverse=True)
-            
-            # Find the latest scan that has a report
-            found_report = False
-            for scan in sorted_scans:
-                report = db.query(Report).filter(Report.scan_id == scan.id).first()
-                if report:
-                    scan_status = "Ready"
-                    report_id = report.id
-                    found_report = True
-                    break
-            
-            # If no report found but scans exist, check if the latest one is recent (Processing)
-            if not found_report:
-                scan_status = "Processing"
-
-        result.append({
-            "id": str(p.mrn), # Using MRN as ID for frontend
-            "name": p.name,
-            "age": p.age,
-            "diagnosis": "Unknown", # Placeholder
-            "status": "Active", # Placeholder
-            "assignedTo": "Unassigned", # Placeholder
-            "lastVisit": p.created_at.strftime("%b %d, %Y"),
-            "scanStatus": scan_status,
-            "reportId": report_id
-        })
-    return result
+async def get_patients(
+    response: Response,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    mrn: Optional[str] = None,
+    status: Optional[str] = Query(None, description="Scan status: Ready, Processing, Queued, Failed, None"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # One indexed range scan of patient_worklist per page; see backend/queries.py and backend/worklist.py
+    return await paged_response(response, db, list_patients, limit=limit, cursor=cursor, mrn=mrn,
+                          status=status, date_from=date_from, date_to=date_to, fields=fields)
 
 @app.post("/api/patients")
 def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
@@ -101,6 +129,8 @@ def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
     db.add(db_patient)
     db.commit()
     db.refresh(db_patient)
+    # Drop any cached "new patient" context for this MRN
+    invalidate_patient(db_patient.mrn, db_patient.id)
     
     return {
         "id": db_patient.mrn,
@@ -123,6 +153,7 @@ def update_patient(patient_id: str, patient: PatientUpdate, db: Session = Depend
         db_patient.age = patient.age
         
     db.commit()
+    invalidate_patient(db_patient.mrn, db_patient.id)
     return {"status": "success", "message": "Patient updated"}
 
 @app.delete("/api/patients/{patient_id}")
@@ -131,10 +162,46 @@ def delete_patient(patient_id: str, db: Session = Depends(get_db)):
     if not db_patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
+    invalidate_patient(db_patient.mrn, db_patient.id)
     db.delete(db_patient)
     db.commit()
     return {"status": "success", "message": "Patient deleted"}
 
+@app.post("/api/import/patients")
+def import_patients(
+    file: UploadFile = File(..., description="CSV or JSONL of patients (+ optional scan columns)"),
+    format: Optional[str] = Form(None),
+    method: str = Form("insert"),
+    analyze: bool = Form(False),
+    chunk_size: int = Form(IMPORT_CONFIG['chunk_size'])
+):
+    """
+    Bulk upsert patients by MRN. Progress is streamed as one JSON object per chunk
+    (application/x-ndjson); the last line has "done": true.
+    """
+    fmt = format or detect_format(file.filename or "")
+    if fmt not in ("csv", "jsonl") or method not in ("insert", "copy"):
+        raise HTTPException(status_code=400, detail="format must be csv/jsonl and method insert/copy")
+
+    # Spool the upload to disk so the import can outlive the request body
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{fmt}") as spool:
+        shutil.copyfileobj(file.file, spool)
+
+    def progress_stream():
+        db = get_db_session()
+        try:
+            with open(spool.name, encoding="utf-8-sig", newline="") as stream:
+                for progress in import_records(db, read_records(stream, fmt), max(1, chunk_size), method,
+                                               os.getenv("IMPORT_SCAN_ROOT") or None, analyze):
+                    yield json.dumps(progress) + "\n"
+        except Exception as e:
+            yield json.dumps({"done": True, "error": str(e)}) + "\n"
+        finally:
+            db.close()
+            os.remove(spool.name)
+
+    return StreamingResponse(progress_stream(), media_type="application/x-ndjson")
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -149,162 +216,289 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Mount reports directory to serve PDFs and images
 os.makedirs("reports", exist_ok=True)
 app.mount("/reports", StaticFiles(directory="reports"), name="reports")
 
-@app.get("/api/placeholder/{width}/{height}")
-def get_placeholder(width: int, height: int):
-    return RedirectResponse(f"https://placehold.co/{width}x{height}")
-
-# Initialize the graph
-agent_app = create_graph()
+def _preload_model(name, load, warm_up):
+    started = time.perf_counter()
+    try:
+        load()
+        warm_up()
+        STARTUP_STATUS["models"][name] = "ready"
+        print(f"{name} preloaded and warmed up in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        STARTUP_STATUS["models"][name] = f"failed: {e}"
+        print(f"Error preloading {name}: {e}")
+        raise
 
-def analyze_scan_background(scan_id: int, file_path: str, patient_mrn: str, db: Session):
+def preload_models():
     """
-    Background task to run the agent on the uploaded scan.
+    Loads and warms up, in parallel, the models the API process uses itself: NER
+    for report finalization, ChexNet and CLIP for the graph that /api/analyze and
+    /api/feedback run here. Uploaded scans are analyzed by the inference workers
+    (inference_worker.py), which warm up their own copies.
     """
-    print(f"Starting background analysis for scan {scan_id}...")
+    from agent_graph.tools.model_tools import ModelManager
+    from agent_graph.tools.ner_tools import NERManager
+
+    manager = ModelManager()
+    ner_manager = NERManager()
+    tasks = {
+        "chexnet": (manager.load_chexnet, manager.warm_up_chexnet),
+        "clip": (manager.load_clip, manager.warm_up_clip),
+        "ner": (ner_manager.load_pipeline, ner_manager.warm_up)
+    }
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="preload") as pool:
+        futures = [pool.submit(_preload_model, name, load, warm_up) for name, (load, warm_up) in tasks.items()]
+        succeeded = all(future.exception() is None for future in futures)
+
+    STARTUP_STATUS["preload_seconds"] = round(time.time() - STARTUP_STATUS["started_at"], 2)
+    print(f"Model preload finished in {STARTUP_STATUS['preload_seconds']}s (ready={succeeded})")
+
+@app.on_event("startup")
+def start_model_preload():
+    if os.getenv("PRELOAD_MODELS", "true").lower() in ("1", "true", "yes"):
+        # Run in the background so the API starts serving while models load
+        threading.Thread(target=preload_models, name="model-preload", daemon=True).start()
+
+@app.on_event("startup")
+def start_inference_workers():
     try:
-        # Create a new session for the background task if needed, 
-        # but here we might need to be careful with session handling in background tasks.
-        # Better to create a fresh session.
-        from backend.database import SessionLocal
-        db_bg = SessionLocal()
+        # Tables, columns and indexes (backend/migrations)
+        upgrade_database(engine)
+    except Exception as e:
+        print(f"❌ Database migration failed: {e}")
+    init_job_tables()
+    # 0 means the pool runs separately: python inference_worker.py --workers N
+    num_workers = int(os.getenv("INFERENCE_WORKERS", "2"))
+    if num_workers > 0:
+        STARTUP_STATUS["workers"] = start_worker_pool(num_workers)
+
+@app.on_event("shutdown")
+def stop_inference_workers():
+    for process in STARTUP_STATUS["workers"]:
+        process.terminate()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await LLMClient().aclose()
+    LLMClient().close()
+
+def first_report_seconds(db: Session):
+    """Seconds from API start to the first report finished by any worker"""
+    if STARTUP_STATUS["first_report_seconds"] is None:
+        started = datetime.utcfromtimestamp(STARTUP_STATUS["started_at"])
+        first_done = db.query(AnalysisJob.finished_at).filter(
+            AnalysisJob.status == "done",
+            AnalysisJob.finished_at >= started
+        ).order_by(AnalysisJob.finished_at).first()
+        if first_done:
+            STARTUP_STATUS["first_report_seconds"] = round((first_done.finished_at - started).total_seconds(), 2)
+    return STARTUP_STATUS["first_report_seconds"]
+
+@app.get("/api/health")
+def health(db: Session = Depends(get_db)):
+    workers = worker_status(db)
+    return {
+        "status": "ok",
+        "ready": workers["ready"] > 0,
+        "models": STARTUP_STATUS["models"],
+        "workers": workers,
+        "uptime_seconds": round(time.time() - STARTUP_STATUS["started_at"], 2),
+        "preload_seconds": STARTUP_STATUS["preload_seconds"],
+        "cold_start_to_first_report_seconds": first_report_seconds(db),
+        "workers_alive": sum(process.is_alive() for process in STARTUP_STATUS["workers"]),
+        "queue_depth": queue_depth(db)
+    }
 
-        thread_id = str(uuid.uuid4())
-        abs_file_path = os.path.abspath(file_path)
-        
-        initial_state = {
-            "patient_id": patient_mrn,
-            "xray_image_path": abs_file_path
-        }
-        
-        config = {"configurable": {"thread_id": thread_id}}
-        
-        # Run the agent
-        final_report_text = "Analysis failed or no report generated."
-        
-        # We need to stream/invoke until completion. 
-        # Since we want to run it fully, we iterate through the stream.
-        # Note: The graph might have interrupts. For this background task, 
-        # we assume we want to reach the 'pdf_generator' or a final state.
-        # If the graph requires human-in-the-loop, this might pause.
-        # For now, let's assume it runs to a point where we have a report.
-        
-        current_report = ""
-        
-        for event in agent_app.stream(initial_state, config=config):
-            # We can log progress here if we want
-            pass
-            
-        # Get final state
-        state = agent_app.get_state(config)
-        if state.values:
-            current_report = state.values.get("current_report", "")
-            
-        if not current_report:
-            current_report = "No report generated by the agent."
-
-        # Create Report entry in DB
-        # We need to find the scan again in this session
-        scan = db_bg.query(Scan).filter(Scan.id == scan_id).first()
-        if scan:
-            report = Report(
-                scan_id=scan.id,
-                radiologist_name="AI Agent", # Placeholder
-                full_text=current_report,
-                impression=current_report, # You might want to parse this out if possible
-                patient_history=state.values.get("patient_history"),
-                comparison_findings=state.values.get("comparison_result"),
-                ner_tags={"visualization_path": state.values.get("visualization_path")}
-            )
-            db_bg.add(report)
-            db_bg.commit()
-            print(f"Report saved for scan {scan_id}")
-        
-        db_bg.close()
-        
+@app.get("/api/health/ready")
+def readiness(db: Session = Depends(get_db)):
+    # Ready once a worker (spawned here or running separately) has its models loaded
+    # and is heartbeating, i.e. an uploaded scan will actually be analyzed
+    workers = worker_status(db)
+    if workers["ready"] == 0:
+        raise HTTPException(status_code=503, detail={"ready": False, "workers": workers})
+    return {"ready": True, "workers": workers}
+
+@app.get("/api/placeholder/{width}/{height}")
+def get_placeholder(width: int, height: int):
+    return RedirectResponse(f"https://placehold.co/{width}x{height}")
+
+# The graph for /api/analyze and /api/feedback, built on first use. One per process:
+# its MemorySaver holds the paused runs that /api/feedback resumes.
+_agent_app = None
+_agent_app_lock = threading.Lock()
+
+def get_agent_app():
+    global _agent_app
+    with _agent_app_lock:
+        if _agent_app is None:
+            from agent_graph.graph import create_graph
+            _agent_app = create_graph()
+    return _agent_app
+
+def publish_scan(file_path: str, filename: str) -> str:
+    """Push a saved scan to Cloudinary, streamed from disk. Returns the file URL."""
+    try:
+        return upload_local_file(file_path, folder="xrays", resource_type="image")
     except Exception as e:
-        print(f"Error in background analysis: {e}")
+        print(f"Cloudinary upload failed: {e}")
+        # Fallback to local URL if upload fails
+        return f"/reports/{filename}"
+
+async def duplicate_response(db: AsyncSession, scan_id: int) -> dict:
+    job = await db.run_sync(latest_job_for_scan, scan_id)
+    return {
+        "status": "duplicate",
+        "scan_id": scan_id,
+        "job_id": job.id if job else None,
+        "message": "This scan was already uploaded for the patient; using the existing analysis"
+    }
 
 @app.post("/api/scans")
 async def upload_scan(
-    background_tasks: BackgroundTasks,
     patient_id: str = Form(...),
     file: UploadFile = File(...),
     body_part: str = Form("CHEST"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verify patient exists
-    patient = db.query(Patient).filter(Patient.mrn == patient_id).first()
+    patient = (await db.execute(select(Patient).where(Patient.mrn == patient_id))).scalars().first()
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    # Save file
+    # Backpressure: shed load before saving anything if the workers are far behind
+    depth = await db.run_sync(queue_depth)
+    if depth >= MAX_QUEUE_DEPTH:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Analysis queue is full ({depth} scans waiting), try again later",
+            headers={"Retry-After": "30"}
+        )
+
+    # Stream to a private staging file (not under the /reports mount) in chunks while hashing;
+    # disk and Cloudinary I/O run in the thread pool
     file_ext = file.filename.split(".")[-1]
-    filename = f"scan_{patient_id}_{uuid.uuid4().hex[:8]}.{file_ext}"
-    file_path = f"reports/{filename}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # Upload to Cloudinary
+    staging_path, digest, _ = await run_in_threadpool(stage_stream, file.file, f".{file_ext}")
     try:
-        # Reset file pointer for Cloudinary upload
-        file.file.seek(0)
-        cloudinary_url = upload_to_cloud(file, folder="xrays", resource_type="image")
-    except Exception as e:
-        print(f"Cloudinary upload failed: {e}")
-        # Fallback to local URL if upload fails
-        cloudinary_url = f"/reports/{filename}"
+        # Same film for the same patient: no second copy, scan or inference
+        existing = (await db.execute(select(Scan.id).where(
+            Scan.patient_id == patient.id, Scan.content_sha256 == digest
+        ))).scalar()
+        if existing is not None:
+            return await duplicate_response(db, existing)
+
+        # Content-addressed name, so a concurrent identical upload writes the same file
+        filename = f"scan_{patient_id}_{digest[:16]}.{file_ext}"
+        file_path = f"reports/{filename}"
+        os.replace(staging_path, file_path)
+    finally:
+        # Duplicates and failed requests leave nothing behind; after the rename there is nothing to remove
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+    cloudinary_url = await run_in_threadpool(publish_scan, file_path, filename)
 
     scan = Scan(
         patient_id=patient.id,
         file_url=cloudinary_url,
         body_part=body_part,
         view_position="PA", # Default
-        modality="DX"
+        modality="DX",
+        content_sha256=digest
     )
     db.add(scan)
-    db.commit()
-    db.refresh(scan)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with an identical upload; the unique (patient_id, content_sha256) index decided
+        await db.rollback()
+        existing = (await db.execute(select(Scan.id).where(
+            Scan.patient_id == patient.id, Scan.content_sha256 == digest
+        ))).scalar()
+        return await duplicate_response(db, existing)
+    await db.refresh(scan)
     
-    # Trigger background analysis
-    background_tasks.add_task(analyze_scan_background, scan.id, file_path, patient.mrn, db)
+    # Hand off to the inference workers; the request returns as soon as the job is queued
+    job = await db.run_sync(enqueue_analysis, scan.id, os.path.abspath(file_path), patient.mrn)
     
     return {
         "status": "success", 
         "scan_id": scan.id,
-        "message": "Scan uploaded and analysis started"
+        "job_id": job.id,
+        "message": "Scan uploaded and queued for analysis"
     }
 
 @app.get("/api/scans")
-def get_scans(db: Session = Depends(get_db)):
-    scans = db.query(Scan).options(joinedload(Scan.patient)).order_by(Scan.id.desc()).all()
-    result = []
-    for s in scans:
-        result.append({
-            "id": s.id,
-            "patientName": s.patient.name,
-            "patientId": s.patient.mrn,
-            "bodyPart": s.body_part,
-            "modality": s.modality,
-            "date": s.scan_date.strftime("%b %d, %Y"),
-            "time": s.scan_date.strftime("%H:%M"),
-            "file_url": s.file_url
-        })
-    return result
+async def get_scans(
+    response: Response,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern="^(id|scan_date)$"),
+    mrn: Optional[str] = None,
+    body_part: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paged_response(response, db, list_scans, limit=limit, cursor=cursor, sort=sort, mrn=mrn,
+                          body_part=body_part, date_from=date_from, date_to=date_to, fields=fields)
+
+@app.get("/api/scans/{scan_id}/status")
+async def get_scan_status(scan_id: int, db: AsyncSession = Depends(get_async_db)):
+    scan_exists = (await db.execute(select(Scan.id).where(Scan.id == scan_id))).first()
+    if not scan_exists:
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    job = await db.run_sync(latest_job_for_scan, scan_id)
+    report = (await db.execute(
+        select(Report.id).where(Report.scan_id == scan_id).order_by(Report.id.desc())
+    )).first()
+    status = job_to_dict(job) if job else {"scan_id": scan_id, "status": "done" if report else "none"}
+    status["report_id"] = report.id if report else None
+    return status
+
+@app.post("/api/scans/{scan_id}/retry")
+def retry_scan_analysis(scan_id: int, db: Session = Depends(get_db)):
+    """Re-drive the failed analysis of a scan without re-uploading it"""
+    job = latest_job_for_scan(db, scan_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No analysis job for this scan")
+    if job.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, only failed jobs can be retried")
+
+    redrive_failed_jobs(db, [job.id])
+    return {"status": "success", "job_id": job.id, "message": "Analysis re-queued"}
+
+@app.post("/api/jobs/redrive")
+def redrive_all_failed_jobs(db: Session = Depends(get_db)):
+    count = redrive_failed_jobs(db)
+    return {"status": "success", "requeued": count}
+
+@app.get("/api/jobs/stats")
+def get_job_stats(db: Session = Depends(get_db)):
+    return queue_stats(db)
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    # Per process unless PATIENT_CACHE_REDIS_URL is set; workers log their own hit rate.
+    # Pipeline results live on disk, shared with workers; their hit counters are per process.
+    return {"patient_context": PatientContextCache().stats(),
+            "pipeline_results": PipelineResultCache().stats(),
+            "report_answers": ReportAnswerCache().stats()}
 
 class FeedbackRequest(BaseModel):
     thread_id: str
     action: str  # 'approve' or 'edit'
     new_report: Optional[str] = None
 
+# The graph runs are blocking, so these are sync handlers: FastAPI runs them in its thread pool
 @app.post("/api/analyze")
-async def analyze_xray(file: UploadFile = File(...)):
+def analyze_xray(file: UploadFile = File(...)):
     # Deprecated or used for direct demo without patient context
     try:
         thread_id = str(uuid.uuid4())
@@ -323,12 +517,15 @@ async def analyze_xray(file: UploadFile = File(...)):
         config = {"configurable": {"thread_id": thread_id}}
         
         print(f"Starting analysis for thread {thread_id}...")
+        agent_app = get_agent_app()
         
         events = []
         for event in agent_app.stream(initial_state, config=config):
             events.append(event)
             
         state = agent_app.get_state(config)
+        # Release the run's DB connection while the draft waits for review
+        close_pipeline_data(state.values.get("data_handle"))
         current_report = state.values.get("current_report", "No report generated.")
         
         return {
@@ -343,9 +540,10 @@ async def analyze_xray(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/feedback")
-async def submit_feedback(request: FeedbackRequest):
+def submit_feedback(request: FeedbackRequest):
     try:
         config = {"configurable": {"thread_id": request.thread_id}}
+        agent_app = get_agent_app()
         state = agent_app.get_state(config)
         
         if not state.values:
@@ -353,7 +551,8 @@ async def submit_feedback(request: FeedbackRequest):
             
         current_report = state.values.get("current_report")
         
-        if request.action == "edit" and request.new_report:
+        # An empty edit is still an edit; only a missing new_report keeps the draft
+        if request.action == "edit" and request.new_report is not None:
             if request.new_report != current_report:
                 image_path = state.values.get("xray_image_path")
                 patient_id = state.values.get("patient_id")
@@ -395,37 +594,32 @@ async def submit_feedback(request: FeedbackRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/reports")
-def get_reports(db: Session = Depends(get_db)):
-    # Fetch all reports with related scan and patient data
-    reports = db.query(Report).options(
-        joinedload(Report.scan).joinedload(Scan.patient)
-    ).all()
-    
-    result = []
-    for r in reports:
-        result.append({
-            "id": r.id,
-            "patientName": r.scan.patient.name,
-            "patientId": r.scan.patient.mrn,
-            "date": r.scan.scan_date.strftime("%b %d, %Y"),
-            "time": r.scan.scan_date.strftime("%H:%M"),
-            "diagnosis": "See Findings", # Placeholder or extract from impression
-            "findings": r.impression[:100] + "..." if len(r.impression) > 100 else r.impression,
-            "full_text": r.full_text,
-            "patient_history": r.patient_history,
-            "comparison_findings": r.comparison_findings,
-            "confidence": 95, # Placeholder
-            "status": r.status or "Draft",
-            "radiologist": r.radiologist_name,
-            "pdf_url": r.pdf_url
-        })
-    return result
+async def get_reports(
+    response: Response,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern="^(id|scan_date)$"),
+    status: Optional[str] = Query(None, description="Report status: Draft, Final"),
+    mrn: Optional[str] = None,
+    patient_name: Optional[str] = Query(None, description="Case-insensitive patient name"),
+    body_part: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. id,patientName,findings"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Large text columns are only loaded when requested via fields=
+    return await paged_response(response, db, list_reports, limit=limit, cursor=cursor, sort=sort,
+                          status=status, mrn=mrn, patient_name=patient_name, body_part=body_part,
+                          date_from=date_from, date_to=date_to, fields=fields)
 
 @app.get("/api/reports/{report_id}")
-def get_report(report_id: int, db: Session = Depends(get_db)):
-    report = db.query(Report).options(
-        joinedload(Report.scan).joinedload(Scan.patient)
-    ).filter(Report.id == report_id).first()
+async def get_report(report_id: int, db: AsyncSession = Depends(get_async_db)):
+    report = (await db.execute(
+        select(Report).options(
+            joinedload(Report.scan).joinedload(Scan.patient)
+        ).where(Report.id == report_id)
+    )).scalars().first()
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
@@ -477,6 +671,7 @@ def update_report(report_id: int, report_update: ReportUpdate, db: Session = Dep
             try:
                 # 1. Extract NER
                 print(f"Extracting NER for report {report_id}...")
+                from agent_graph.tools.ner_tools import NERManager, extract_ner_entities
                 ner_manager = NERManager()
                 ner_pipeline = ner_manager.load_pipeline()
                 entities = extract_ner_entities(report.full_text, ner_pipeline)
@@ -527,6 +722,10 @@ def update_report(report_id: int, report_update: ReportUpdate, db: Session = Dep
         
     db.commit()
     db.refresh(report)
+    # Report impressions feed the patient history used by the pipeline
+    invalidate_patient(report.scan.patient.mrn, report.scan.patient.id)
+    # Cached chat answers were given about the previous text
+    invalidate_report_answers(report_id)
     
     return {"status": "success", "message": "Report updated", "pdf_url": report.pdf_url}
 
@@ -534,19 +733,52 @@ class ChatRequest(BaseModel):
     report_id: int
     question: str
 
-@app.post("/api/chat")
-def chat_with_report(request: ChatRequest, db: Session = Depends(get_db)):
-    report = db.query(Report).filter(Report.id == request.report_id).first()
+def require_question(question: str):
+    # Before the cache lookup: a blank question has no answer worth caching
+    if not question.strip():
+        raise HTTPException(status_code=422, detail="question must not be empty")
+
+async def report_chat_context(db: AsyncSession, report_id: int) -> str:
+    report = (await db.execute(select(Report).where(Report.id == report_id))).scalars().first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
     # Construct context from report
-    context = f"Findings: {report.full_text}\nImpression: {report.impression}\nPatient History: {report.patient_history}"
+    return f"Findings: {report.full_text}\nImpression: {report.impression}\nPatient History: {report.patient_history}"
+
+@app.post("/api/chat")
+async def chat_with_report(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    require_question(request.question)
+    context = await report_chat_context(db, request.report_id)
+    
+    # Repeat (or, with QA_CACHE_SEMANTIC, paraphrased) questions about an unchanged report
+    cache = ReportAnswerCache()
+    answer = await run_in_threadpool(cache.get, request.report_id, context, request.question)
+    if answer is not None:
+        return {"answer": answer, "cached": True}
     
-    # Get answer from LLM
-    answer = answer_text_question(context, request.question)
+    # Get answer from LLM (pooled async client; waiting on generation holds no worker thread)
+    answer = await answer_text_question_async(context, request.question)
+    if answer not in LLM_ERROR_MESSAGES and answer != MISSING_INPUT_MESSAGE:
+        await run_in_threadpool(cache.set, request.report_id, context, request.question, answer)
     
-    return {"answer": answer}
+    return {"answer": answer, "cached": False}
+
+@app.post("/api/chat/stream")
+async def stream_chat_with_report(request: ChatRequest, http_request: Request,
+                                  db: AsyncSession = Depends(get_async_db)):
+    """Like /api/chat, but tokens arrive as server-sent events while the model generates (backend/chat_stream.py)"""
+    require_question(request.question)
+    context = await report_chat_context(db, request.report_id)
+    events = answer_events(context, request.question, http_request, label=f"Chat stream for report {request.report_id}",
+                           report_id=request.report_id)
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/chat/stats")
+def get_chat_stats():
+    # Streamed chat requests of this process: time to first token and outcomes
+    return LLMClient().stream_stats()
 
 if __name__ == "__main__":
     import uvicorn